@@ -17,14 +17,44 @@ def load_user(user_id):
     return User.query.get(int(user_id))
 
 from datetime import datetime
+from backend.utils.startup import startup_timer
+
+# Heavy dependencies imported during create_app unless LAZY_INIT is set;
+# in lazy mode each loads on first use of the routes that need it
+PRELOADED_MODULES = ('reportlab.platypus', 'backend.utils.gemini_helper')
+
+
+def _preload_dependencies():
+    """Import heavy route dependencies and build the ML model up front."""
+    import importlib
+    for module_name in PRELOADED_MODULES:
+        try:
+            with startup_timer.first_use(module_name):
+                importlib.import_module(module_name)
+        except ImportError as e:
+            print(f"Warning: Could not preload '{module_name}'. Error: {e}")
+
+    from backend.models.ml_model import ml_model
+    ml_model.current
+
+
+def create_app(config=None):
+    """
+    Build the application.
+    
+    Args:
+        config: Settings applied over the defaults before the extensions are
+            initialized (e.g. SQLALCHEMY_DATABASE_URI for a test database)
+    
+    Returns:
+        Flask app
+    """
+    startup_timer.begin()
+    lazy_init = os.environ.get('LAZY_INIT', '').lower() in ('1', 'true', 'yes')
 
-def create_app():
     # Get the backend directory (where this __init__.py file is)
     backend_root = os.path.dirname(os.path.abspath(__file__))
     
-    print(f"Backend root: {backend_root}")
-    print(f"Templates folder: {os.path.join(backend_root, 'templates')}")
-    
     # Initialize Flask app with correct paths
     app = Flask(
         __name__,
@@ -36,50 +66,71 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(backend_root, 'site.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SECRET_KEY'] = 'your_secret_key_here' # Change this in production!
+    app.config['LAZY_INIT'] = lazy_init
+    # Queue PredictionHistory rows for a background writer (0 writes them on the request)
+    app.config['PREDICTION_WRITE_BEHIND'] = os.environ.get('PREDICTION_WRITE_BEHIND', '1').lower() in ('1', 'true', 'yes')
+
+    # Directory of the structured log files (None: LOG_DIR env var or logs/ next to backend/)
+    app.config['LOG_DIR'] = os.environ.get('LOG_DIR')
+
+    # Accounts allowed to use doctor-only views such as the patient export
+    app.config['DOCTOR_EMAILS'] = frozenset(
+        email.strip().lower() for email in os.environ.get('DOCTOR_EMAILS', '').split(',') if email.strip()
+    )
+    if config:
+        app.config.update(config)
 
     # Initialize extensions with app
     db.init_app(app)
     bcrypt.init_app(app)
     login_manager.init_app(app)
+    from backend.utils.write_behind import prediction_writer
+    prediction_writer.init_app(app)
+    from backend.utils.metrics import metrics
+    metrics.init_app(app)
+    from backend.utils.server_timing import server_timing
+    server_timing.init_app(app)
+    from backend.middleware.profiler import request_profiler
+    request_profiler.init_app(app)
     
     # Register Disease Routes Blueprint
-    from backend.routes.disease_routes import disease_bp
+    with startup_timer.measure('backend.routes.disease_routes'):
+        from backend.routes.disease_routes import disease_bp
     app.register_blueprint(disease_bp)
-    print("'disease_routes' blueprint registered successfully")
     
     # Register ML Routes Blueprint
     try:
-        from backend.routes.ml_routes import ml_bp  # type: ignore
+        with startup_timer.measure('backend.routes.ml_routes'):
+            from backend.routes.ml_routes import ml_bp  # type: ignore
         app.register_blueprint(ml_bp)
-        print("'ml_routes' blueprint registered successfully")
     except ImportError as e:
         print(f"Warning: Could not import 'ml_routes'. Error: {e}")
 
     # Register Auth Routes Blueprint
-    from backend.routes.auth_routes import auth_bp
+    with startup_timer.measure('backend.routes.auth_routes'):
+        from backend.routes.auth_routes import auth_bp
     app.register_blueprint(auth_bp)
-    print("'auth_routes' blueprint registered successfully")
     
     # Register Doctor Dashboard Routes Blueprint
     try:
-        from backend.routes.doctor_routes import doctor_bp
+        with startup_timer.measure('backend.routes.doctor_routes'):
+            from backend.routes.doctor_routes import doctor_bp
         app.register_blueprint(doctor_bp)
-        print("'doctor_routes' blueprint registered successfully")
     except ImportError as e:
         print(f"Warning: Could not import 'doctor_routes'. Error: {e}")
     
     # Register other blueprints if you have them
     try:
-        from backend.routes.general_routes import general_bp
+        with startup_timer.measure('backend.routes.general_routes'):
+            from backend.routes.general_routes import general_bp
         app.register_blueprint(general_bp)
-        print("'general_routes' blueprint registered successfully")
     except ImportError as e:
         print(f"Warning: Could not import 'general_routes'. Error: {e}")
     
     try:
-        from backend.routes.scalability_routes import scalability_bp
+        with startup_timer.measure('backend.routes.scalability_routes'):
+            from backend.routes.scalability_routes import scalability_bp
         app.register_blueprint(scalability_bp)
-        print("'scalability_routes' blueprint registered successfully")
     except ImportError as e:
         print(f"Warning: Could not import 'scalability_routes'. Error: {e}")
     
@@ -88,12 +139,42 @@ def create_app():
     from backend.models.prediction import PredictionHistory
     
     # Create Database Tables
-    with app.app_context():
+    with app.app_context(), startup_timer.measure('database'):
+        from sqlalchemy import inspect, text
+        rollup_missing = not inspect(db.engine).has_table('prediction_rollup')
         db.create_all()
-        print("✅ Database tables created/verified")
+        from backend.migrate import missing_columns
+        missing = missing_columns(db.engine)
+        if missing:
+            columns = ', '.join(f'{table}.{column}' for table, column, _ in missing)
+            raise RuntimeError(f"Database is missing column(s) {columns}; run 'python -m backend.migrate' first")
+        if rollup_missing and db.session.execute(text('SELECT 1 FROM prediction_history LIMIT 1')).first():
+            # Backfilling scans all history, so it is left to an explicit command
+            print("⚠️ Prediction rollup is empty; run 'flask backfill-rollup' to count existing predictions")
+    
+    @app.cli.command('backfill-rollup')
+    def backfill_rollup():
+        """Rebuild the dashboard rollup table from prediction history."""
+        from backend.models.prediction import rebuild_prediction_rollup
+        print(f"✅ Rebuilt prediction rollup ({rebuild_prediction_rollup()} rows)")
+    
+    if not lazy_init:
+        _preload_dependencies()
+    
+    # Hot-reload model weights when the artifact changes (opt-in)
+    if os.environ.get('DISEASE_MODEL_HOT_RELOAD', '').lower() in ('1', 'true', 'yes'):
+        from backend.models.ml_model import ml_model
+        ml_model.poll_interval = float(os.environ.get('DISEASE_MODEL_RELOAD_INTERVAL', ml_model.poll_interval))
+        ml_model.start_watching()
+        print(f"✅ Watching model artifact: {ml_model.artifact_path}")
     
     @app.context_processor
     def inject_current_year():
         return {"current_year": datetime.utcnow().year}
 
-    return app
\ No newline at end of file
+    startup_timer.mark_ready()
+    report = startup_timer.get_report()
+    print(f"✅ App ready in {report['startup_total_ms']:.0f} ms "
+          f"({len(app.blueprints)} blueprints, {'lazy' if lazy_init else 'eager'} init)")
+
+    return app
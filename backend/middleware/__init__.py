@@ -28,6 +28,11 @@ from .error_handler import (
     error_response
 )
 
+from .profiler import (
+    RequestProfiler,
+    request_profiler
+)
+
 from .logger import (
     StructuredLogger,
     get_logger,
@@ -61,6 +66,10 @@ __all__ = [
     'success_response',
     'error_response',
     
+    # Profiling
+    'RequestProfiler',
+    'request_profiler',
+    
     # Logging
     'StructuredLogger',
     'get_logger',
@@ -4,29 +4,64 @@ Provides comprehensive logging for debugging, monitoring, and auditing
 """
 
 import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from collections import defaultdict
+import atexit
+import copy
+import gzip
 import json
+import queue
+import shutil
+import threading
+import weakref
 from datetime import datetime
 from functools import wraps
-from flask import request, g
+from flask import current_app, request, g
 import time
 import os
 
+from backend.utils.server_timing import server_timing
+
 
 class StructuredLogger:
     """
     Structured logger with JSON formatting and multiple log levels.
+    
+    Calls only put the record on a bounded queue; a QueueListener thread
+    formats it and writes the console and file handlers, so slow disks
+    never add latency to the request thread. When the queue is full the
+    record is dropped ('drop' policy) or the caller waits up to
+    block_timeout_ms first ('block' policy); drops are counted.
     """
     
-    def __init__(self, name='disease_prediction', log_dir='logs'):
+    def __init__(self, name='disease_prediction', log_dir=None, queue_size=None, policy=None,
+                 block_timeout_ms=None, max_bytes=None, backup_count=None, rotate_check_interval=None):
         """
         Initialize structured logger.
         
         Args:
             name: Logger name
-            log_dir: Directory for log files
+            log_dir: Directory for log files (env LOG_DIR, default: logs/ next to the backend package)
+            queue_size: Max queued records (env LOG_QUEUE_SIZE, default 10000)
+            policy: 'drop' or 'block' when the queue is full (env LOG_QUEUE_POLICY, default 'drop')
+            block_timeout_ms: Max wait under the 'block' policy (env LOG_QUEUE_BLOCK_MS, default 100)
+            max_bytes: Rotate a log file past this size (env LOG_MAX_BYTES, default 10 MB; 0 disables)
+            backup_count: Gzipped rotations kept per file (env LOG_BACKUP_COUNT, default 5)
+            rotate_check_interval: Seconds between file size checks (env LOG_ROTATE_CHECK_SECONDS, default 5)
         """
         self.name = name
-        self.log_dir = log_dir
+        self.log_dir = log_dir = log_dir or os.environ.get('LOG_DIR') or DEFAULT_LOG_DIR
+        self.queue_size = queue_size or int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+        self.policy = policy or os.environ.get('LOG_QUEUE_POLICY', 'drop')
+        if self.policy not in ('drop', 'block'):
+            raise ValueError(f"Unknown log queue policy: {self.policy!r}")
+        if block_timeout_ms is None:
+            block_timeout_ms = float(os.environ.get('LOG_QUEUE_BLOCK_MS', 100))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+        self.backup_count = backup_count if backup_count is not None else int(os.environ.get('LOG_BACKUP_COUNT', 5))
+        if rotate_check_interval is None:
+            rotate_check_interval = float(os.environ.get('LOG_ROTATE_CHECK_SECONDS', 5))
+        self.rotate_check_interval = rotate_check_interval
         
         # Create logs directory if it doesn't exist
         if not os.path.exists(log_dir):
@@ -36,14 +71,32 @@ class StructuredLogger:
         self.logger = logging.getLogger(name)
         self.logger.setLevel(logging.DEBUG)
         
-        # Remove existing handlers
+        # Remove existing handlers (stopping the listener of a previous instance)
+        for handler in self.logger.handlers:
+            if isinstance(handler, BoundedQueueHandler) and handler.owner is not None:
+                handler.owner.stop()
+                for target in handler.owner.handlers:
+                    target.close()
         self.logger.handlers = []
         
         # Add handlers
+        self.handlers = []
         self._add_console_handler()
         self._add_file_handlers()
         
-        print(f"✅ StructuredLogger initialized: {name}")
+        # Only the queue handler runs on the caller's thread
+        self.queue_handler = BoundedQueueHandler(
+            queue.Queue(self.queue_size), policy=self.policy, block_timeout=block_timeout_ms / 1000
+        )
+        self.listener = QueueListener(self.queue_handler.queue, *self.handlers, respect_handler_level=True)
+        self.queue_handler.owner = self
+        self.logger.addHandler(self.queue_handler)
+        self._stop_lock = threading.Lock()
+        self._stopped = False
+        self.listener.start()
+        _running_loggers.add(self)
+        
+        print(f"✅ StructuredLogger initialized: {name} (queue={self.queue_size}, policy={self.policy})")
     
     def _add_console_handler(self):
         """Add console handler with colored output."""
@@ -57,33 +110,68 @@ class StructuredLogger:
         )
         console_handler.setFormatter(formatter)
         
-        self.logger.addHandler(console_handler)
+        self.handlers.append(console_handler)
     
     def _add_file_handlers(self):
         """Add file handlers for different log levels."""
-        # All logs
-        all_handler = logging.FileHandler(
-            os.path.join(self.log_dir, 'app.log')
-        )
-        all_handler.setLevel(logging.DEBUG)
-        all_handler.setFormatter(self._get_json_formatter())
-        self.logger.addHandler(all_handler)
+        for filename, level in (('app.log', logging.DEBUG),  # All logs
+                                ('error.log', logging.ERROR),  # Error logs
+                                ('api.log', logging.INFO)):  # API logs
+            handler = GzipRotatingFileHandler(
+                os.path.join(self.log_dir, filename),
+                maxBytes=self.max_bytes,
+                backupCount=self.backup_count,
+                check_interval=self.rotate_check_interval
+            )
+            handler.setLevel(level)
+            handler.setFormatter(self._get_json_formatter())
+            self.handlers.append(handler)
+    
+    def flush(self, timeout=5.0):
+        """
+        Wait until every queued record has been written.
         
-        # Error logs
-        error_handler = logging.FileHandler(
-            os.path.join(self.log_dir, 'error.log')
-        )
-        error_handler.setLevel(logging.ERROR)
-        error_handler.setFormatter(self._get_json_formatter())
-        self.logger.addHandler(error_handler)
+        Returns:
+            True if the queue drained within timeout
+        """
+        deadline = time.monotonic() + timeout
+        while self.queue_handler.queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+    
+    def stop(self):
+        """Write out queued records and stop the listener thread (idempotent; called at exit)."""
+        with self._stop_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        # QueueListener.stop() drains the queue, then joins the thread
+        self.listener.stop()
+        _running_loggers.discard(self)
+    
+    def get_stats(self):
+        """
+        Get logging pipeline counters.
         
-        # API logs
-        api_handler = logging.FileHandler(
-            os.path.join(self.log_dir, 'api.log')
-        )
-        api_handler.setLevel(logging.INFO)
-        api_handler.setFormatter(self._get_json_formatter())
-        self.logger.addHandler(api_handler)
+        Returns:
+            Dictionary with queue depth, capacity, policy, enqueued, dropped
+            (total and per level) and file rotations
+        """
+        handler = self.queue_handler
+        with handler.counter_lock:
+            enqueued, dropped = handler.enqueued, handler.dropped
+            dropped_by_level = dict(handler.dropped_by_level)
+        return {
+            'queued': handler.queue.qsize(),
+            'queue_size': self.queue_size,
+            'policy': self.policy,
+            'enqueued': enqueued,
+            'dropped': dropped,
+            'dropped_by_level': dropped_by_level,
+            'rotations': sum(getattr(target, 'rotations', 0) for target in self.handlers)
+        }
     
     def _get_json_formatter(self):
         """Get JSON formatter for structured logging."""
@@ -233,7 +321,7 @@ class JsonFormatter(logging.Formatter):
             JSON string
         """
         log_data = {
-            'timestamp': datetime.utcnow().isoformat(),
+            'timestamp': datetime.utcfromtimestamp(record.created).isoformat(),
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
@@ -253,18 +341,125 @@ class JsonFormatter(logging.Formatter):
         # Add exception info if present
         if record.exc_info:
             log_data['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_data['exception'] = record.exc_text
         
         return json.dumps(log_data)
 
 
+class BoundedQueueHandler(QueueHandler):
+    """
+    QueueHandler for a bounded queue that drops (or briefly blocks) when full.
+    """
+    
+    def __init__(self, log_queue, policy='drop', block_timeout=0.1):
+        """
+        Args:
+            log_queue: Bounded queue.Queue shared with the QueueListener
+            policy: 'drop' or 'block'
+            block_timeout: Seconds to wait under the 'block' policy before dropping
+        """
+        super().__init__(log_queue)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.owner = None  # StructuredLogger running the listener
+        self.counter_lock = threading.Lock()
+        self.enqueued = 0
+        self.dropped = 0
+        self.dropped_by_level = defaultdict(int)
+    
+    def prepare(self, record):
+        """
+        Make the record safe to hand to another thread.
+        
+        Unlike QueueHandler.prepare this does not format the record (the
+        listener's handlers do that); it only merges args into the message
+        and renders the traceback while it is still available.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record):
+        try:
+            if self.policy == 'block':
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            with self.counter_lock:
+                self.dropped += 1
+                self.dropped_by_level[record.levelname] += 1
+            return
+        with self.counter_lock:
+            self.enqueued += 1
+
+
+class GzipRotatingFileHandler(RotatingFileHandler):
+    """
+    Size-based rotating file handler that gzips rotated files
+    (app.log.1.gz, app.log.2.gz, ...).
+    
+    The file size is checked at most every check_interval seconds rather
+    than on every record.
+    """
+    
+    def __init__(self, filename, maxBytes=0, backupCount=0, check_interval=5.0):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, encoding='utf-8')
+        self.check_interval = check_interval
+        self.rotations = 0
+        self._next_check = 0.0
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._gzip_rotate
+    
+    def shouldRollover(self, record):
+        if self.maxBytes <= 0:
+            return False
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.check_interval
+        return super().shouldRollover(record)
+    
+    def _gzip_rotate(self, source, dest):
+        with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+        self.rotations += 1
+
+
+_traceback_formatter = logging.Formatter()
+
+
+# Used when neither log_dir, the app's LOG_DIR nor the LOG_DIR variable is set
+DEFAULT_LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'logs')
+
+# Loggers whose listener is still running, stopped once at exit
+_running_loggers = weakref.WeakSet()
+
+
+@atexit.register
+def _stop_running_loggers():
+    for structured_logger in list(_running_loggers):
+        structured_logger.stop()
+
+
 # Global logger instance
 _global_logger = None
+_global_logger_lock = threading.Lock()
 
 
 def get_logger(name='disease_prediction'):
     """
     Get or create global logger instance.
     
+    The log directory is the app's LOG_DIR setting when called inside an
+    application context, else the LOG_DIR environment variable or the default.
+    
     Args:
         name: Logger name
         
@@ -273,12 +468,24 @@ def get_logger(name='disease_prediction'):
     """
     global _global_logger
     
-    if _global_logger is None:
-        _global_logger = StructuredLogger(name)
+    with _global_logger_lock:
+        if _global_logger is None:
+            try:
+                log_dir = current_app.config.get('LOG_DIR')
+            except RuntimeError:
+                # Outside an application context (e.g. a CLI script)
+                log_dir = None
+            _global_logger = StructuredLogger(name, log_dir)
     
     return _global_logger
 
 
+def _stage_timings():
+    """Server-Timing stage durations of the current request as log fields."""
+    stages = server_timing.get_timings()
+    return {'stages_ms': stages} if stages else {}
+
+
 def log_request(f):
     """
     Decorator to log API requests.
@@ -322,7 +529,8 @@ def log_request(f):
                 method=request.method,
                 status_code=status_code,
                 duration=duration,
-                request_id=request_id
+                request_id=request_id,
+                **_stage_timings()
             )
             
             return response
@@ -455,7 +663,8 @@ class RequestLogger:
                 method=request.method,
                 status_code=response.status_code,
                 duration=duration,
-                request_id=getattr(g, 'request_id', 'unknown')
+                request_id=getattr(g, 'request_id', 'unknown'),
+                **_stage_timings()
             )
         
         return response
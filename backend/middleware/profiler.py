@@ -0,0 +1,277 @@
+"""
+On-demand request profiling.
+Profiles selected requests in production and stores one report per request,
+keyed by request id and endpoint, for download from /admin/profiles.
+
+A request is profiled when it carries X-Profiler-Token matching the
+PROFILER_TOKEN environment variable, or when it is picked by sampling
+(PROFILER_SAMPLE_RATE, e.g. 0.001 for 1 in 1000, optionally limited to
+the paths in PROFILER_PATHS). Two modes are available:
+
+    cprofile  deterministic cProfile of the request thread (.pstats file)
+    sampler   wall-clock stack sampling of the request thread, written as
+              collapsed stacks (.collapsed, for flamegraph tools); shows
+              time spent waiting on I/O such as the Gemini API
+
+Token requests can choose the mode with X-Profiler-Mode. cProfile runs
+for one request at a time; a request that overlaps it is sampled instead.
+On Python 3.12+ cProfile observes every thread, so a cProfile report can
+include work done by other requests running at the same time.
+"""
+
+from collections import Counter
+import cProfile
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+
+from flask import g, request
+
+REPORT_EXTENSIONS = {'cprofile': '.pstats', 'sampler': '.collapsed'}
+
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9_.-]+')
+
+# Only one cProfile profiler can be active per interpreter (on Python 3.12+
+# it uses sys.monitoring, which is process-wide), so overlapping requests
+# fall back to the stack sampler instead of raising
+_cprofile_lock = threading.Lock()
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack at a fixed interval from a
+    background thread and counts identical stacks.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        """
+        Args:
+            thread_id: threading.get_ident() of the thread to sample
+            interval: Seconds between samples
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def dump(self, path):
+        """Write 'frame;frame;frame count' lines."""
+        with open(path, 'w', encoding='utf-8') as report:
+            for stack, count in self.stacks.most_common():
+                report.write(f"{stack} {count}\n")
+
+
+class RequestProfiler:
+    """
+    Flask hooks that profile selected requests and store the reports.
+    """
+
+    def __init__(self, token=None, sample_rate=None, paths=None, mode=None,
+                 report_dir=None, max_reports=None, sampler_interval_ms=None):
+        """
+        Args:
+            token: Secret enabling the X-Profiler-Token header and the admin
+                routes (env PROFILER_TOKEN; unset disables both)
+            sample_rate: Fraction of requests profiled (env PROFILER_SAMPLE_RATE, default 0)
+            paths: Only sample these request paths (env PROFILER_PATHS, comma separated)
+            mode: 'cprofile' or 'sampler' for sampled requests (env PROFILER_MODE, default 'cprofile')
+            report_dir: Where reports are stored (env PROFILER_DIR, default 'profiles')
+            max_reports: Reports kept before the oldest are deleted (env PROFILER_MAX_REPORTS, default 200)
+            sampler_interval_ms: Stack sampling interval (env PROFILER_SAMPLER_INTERVAL_MS, default 5)
+        """
+        self.token = token or os.environ.get('PROFILER_TOKEN') or None
+        self.sample_rate = sample_rate if sample_rate is not None else \
+            float(os.environ.get('PROFILER_SAMPLE_RATE', 0))
+        if paths is None:
+            paths = [path for path in os.environ.get('PROFILER_PATHS', '').split(',') if path]
+        self.paths = frozenset(paths)
+        self.mode = mode or os.environ.get('PROFILER_MODE', 'cprofile')
+        if self.mode not in REPORT_EXTENSIONS:
+            raise ValueError(f"Unknown profiler mode: {self.mode!r}")
+        self.report_dir = report_dir or os.environ.get('PROFILER_DIR', 'profiles')
+        self.max_reports = max_reports or int(os.environ.get('PROFILER_MAX_REPORTS', 200))
+        self.sampler_interval = (sampler_interval_ms or float(os.environ.get('PROFILER_SAMPLER_INTERVAL_MS', 5))) / 1000
+
+        self._save_lock = threading.Lock()
+
+    def init_app(self, app):
+        """Profile selected requests of the application."""
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def is_authorized(self, request_obj):
+        """True if the request carries the profiler token."""
+        supplied = request_obj.headers.get('X-Profiler-Token')
+        return bool(self.token and supplied and hmac.compare_digest(supplied, self.token))
+
+    def _select_mode(self):
+        """Profiling mode for the current request, or None to skip it."""
+        if self.token and 'X-Profiler-Token' in request.headers:
+            if self.is_authorized(request):
+                mode = request.headers.get('X-Profiler-Mode', self.mode)
+                return mode if mode in REPORT_EXTENSIONS else self.mode
+            return None
+        if self.sample_rate > 0 and (not self.paths or request.path in self.paths):
+            if random.random() < self.sample_rate:
+                return self.mode
+        return None
+
+    def _before_request(self):
+        if not self.token and self.sample_rate <= 0:
+            return
+        if request.path.startswith('/admin/profiles'):
+            return
+        mode = self._select_mode()
+        if mode is None:
+            return
+
+        request_id = getattr(g, 'request_id', None) or uuid.uuid4().hex[:12]
+        endpoint = request.url_rule.rule if request.url_rule is not None else request.path
+        g.profile = {
+            'name': self._report_name(request_id, endpoint, mode),
+            'request_id': request_id,
+            'endpoint': endpoint,
+            'method': request.method,
+            'mode': mode,
+            'start': time.perf_counter(),
+        }
+        if mode == 'cprofile' and _cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except Exception as e:
+                _cprofile_lock.release()
+                print(f"⚠️ Could not start cProfile, sampling instead: {e}")
+            else:
+                g.profiler = profiler
+                return
+        if mode == 'cprofile':
+            mode = g.profile['mode'] = 'sampler'
+            g.profile['name'] = self._report_name(request_id, endpoint, mode)
+
+        profiler = StackSampler(threading.get_ident(), self.sampler_interval)
+        try:
+            profiler.start()
+        except Exception as e:
+            print(f"⚠️ Could not start the stack sampler: {e}")
+            g.pop('profile', None)
+            return
+        g.profiler = profiler
+
+    @staticmethod
+    def _report_name(request_id, endpoint, mode):
+        slug = _UNSAFE_CHARS.sub('_', endpoint.strip('/')) or 'root'
+        return f"{int(time.time() * 1000)}_{_UNSAFE_CHARS.sub('_', str(request_id))}_{slug}{REPORT_EXTENSIONS[mode]}"
+
+    def _after_request(self, response):
+        profile = g.get('profile')
+        if profile is not None:
+            response.headers['X-Profile-Id'] = profile['name']
+            profile['status'] = response.status_code
+        return response
+
+    def _teardown_request(self, error=None):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        profile = g.pop('profile')
+        duration_ms = round((time.perf_counter() - profile.pop('start')) * 1000, 2)
+        if profile['mode'] == 'cprofile':
+            profiler.disable()
+            _cprofile_lock.release()
+        else:
+            profiler.stop()
+
+        try:
+            self._save(profiler, {**profile, 'duration_ms': duration_ms, 'created': time.time()})
+        except OSError as e:
+            print(f"⚠️ Could not save profile {profile['name']}: {e}")
+
+    def _save(self, profiler, meta):
+        """Write the report and its metadata, then prune the oldest reports."""
+        os.makedirs(self.report_dir, exist_ok=True)
+        path = os.path.join(self.report_dir, meta['name'])
+        if meta['mode'] == 'cprofile':
+            profiler.dump_stats(path)
+        else:
+            profiler.dump(path)
+        meta['size'] = os.path.getsize(path)
+        with open(path + '.json', 'w', encoding='utf-8') as meta_file:
+            json.dump(meta, meta_file)
+        print(f"✅ Saved {meta['mode']} profile of {meta['method']} {meta['endpoint']} "
+              f"({meta['duration_ms']} ms): {meta['name']}")
+
+        with self._save_lock:
+            reports = sorted(name for name in os.listdir(self.report_dir) if name.endswith('.json'))
+            for stale in reports[:-self.max_reports]:
+                for stale_path in (stale, stale[:-len('.json')]):
+                    try:
+                        os.remove(os.path.join(self.report_dir, stale_path))
+                    except FileNotFoundError:
+                        pass
+
+    def list_reports(self):
+        """
+        Metadata of stored reports, newest first.
+
+        Returns:
+            List of dicts with name, request_id, endpoint, method, mode,
+            status, duration_ms, size and created
+        """
+        if not os.path.isdir(self.report_dir):
+            return []
+        reports = []
+        for name in sorted(os.listdir(self.report_dir), reverse=True):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.report_dir, name), encoding='utf-8') as meta_file:
+                    reports.append(json.load(meta_file))
+            except (OSError, ValueError):
+                continue
+        return reports
+
+    def report_path(self, name):
+        """
+        Path of a stored report.
+
+        Returns:
+            Absolute path, or None if name is not an existing report
+        """
+        if name != os.path.basename(name) or not name.endswith(tuple(REPORT_EXTENSIONS.values())):
+            return None
+        path = os.path.abspath(os.path.join(self.report_dir, name))
+        return path if os.path.isfile(path) else None
+
+
+# Global instance
+request_profiler = RequestProfiler()
@@ -0,0 +1,531 @@
+"""
+Storage backends for the RateLimiter's sliding-window counters.
+
+The in-process store is the default. The SQLite and Redis stores keep the
+counters outside the worker, so every gunicorn worker on a host (or every
+host, for Redis) shares one budget per client. Select one with the
+RATE_LIMIT_STORE environment variable:
+
+    RATE_LIMIT_STORE=memory                          (default)
+    RATE_LIMIT_STORE=sqlite:////var/run/app/ratelimit.db
+    RATE_LIMIT_STORE=redis://:password@localhost:6379/0
+
+Measure per-check overhead before choosing one:
+
+    python -m backend.middleware.rate_limit_store memory sqlite:///tmp/rl.db redis://localhost:6379/0
+"""
+
+from urllib.parse import urlparse, unquote
+import argparse
+import os
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+
+class RateLimitStoreError(Exception):
+    """Raised when a shared store cannot be reached or updated."""
+    pass
+
+
+def _admit(state, now, limit, window, cost):
+    """
+    Apply one request to a [window_start, current, previous] counter state.
+
+    Rolls the fixed windows forward to the one containing now, then records
+    the request if the weighted estimate leaves room for it.
+
+    Returns:
+        Tuple of (allowed, elapsed in current window, current count before
+        this request, previous window count)
+    """
+    elapsed_windows = int((now - state[0]) // window)
+    if elapsed_windows >= 1:
+        state[2] = state[1] if elapsed_windows == 1 else 0
+        state[1] = 0
+        state[0] += elapsed_windows * window
+
+    window_start, current, previous = state[0], state[1], state[2]
+    elapsed = now - window_start
+    allowed = previous * (1 - elapsed / window) + current + cost <= limit
+    if allowed:
+        state[1] += cost
+    return allowed, elapsed, current, previous
+
+
+class MemoryStore:
+    """
+    Per-process counters in lock-striped dictionaries.
+
+    Fastest option, but each worker process enforces its own budget.
+    """
+
+    NUM_STRIPES = 64
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, sweep_interval=60):
+        """
+        Args:
+            sweep_interval: Seconds between idle-key sweeps of a stripe
+        """
+        self.sweep_interval = sweep_interval
+        self.evicted = 0
+
+        # Per stripe: lock, {key: [window_start, current, previous, window]}
+        # and the time of the next idle-key sweep
+        self._locks = [threading.Lock() for _ in range(self.NUM_STRIPES)]
+        self._windows = [{} for _ in range(self.NUM_STRIPES)]
+        self._next_sweep = [0.0] * self.NUM_STRIPES
+
+    def _sweep(self, stripe, now):
+        """
+        Drop keys of one stripe whose windows have both expired.
+        Caller holds the stripe lock.
+        """
+        windows = self._windows[stripe]
+        idle = [key for key, state in windows.items() if now - state[0] >= 2 * state[3]]
+        for key in idle:
+            del windows[key]
+        self.evicted += len(idle)
+        self._next_sweep[stripe] = now + self.sweep_interval
+
+    def hit(self, key, limit, window, cost, now):
+        """
+        Check and record a request.
+
+        Args:
+            key: (identifier, endpoint_type) tuple
+            limit: Units allowed per window
+            window: Window length in seconds
+            cost: Units this request consumes
+            now: Current time from self.clock
+
+        Returns:
+            Tuple of (allowed, elapsed, current, previous) as returned by _admit
+        """
+        stripe = hash(key) % self.NUM_STRIPES
+        with self._locks[stripe]:
+            if now >= self._next_sweep[stripe]:
+                self._sweep(stripe, now)
+            state = self._windows[stripe].get(key)
+            if state is None:
+                state = self._windows[stripe][key] = [now - (now % window), 0, 0, window]
+            return _admit(state, now, limit, window, cost)
+
+    def evict_idle(self, now):
+        """Sweep every stripe now and return the number of keys evicted."""
+        before = self.evicted
+        for stripe in range(self.NUM_STRIPES):
+            with self._locks[stripe]:
+                self._sweep(stripe, now)
+        return self.evicted - before
+
+    def reset(self):
+        """Forget all counters."""
+        for stripe in range(self.NUM_STRIPES):
+            with self._locks[stripe]:
+                self._windows[stripe].clear()
+
+    def tracked_keys(self):
+        """Number of keys currently held."""
+        return sum(len(windows) for windows in self._windows)
+
+    def describe(self):
+        return 'memory'
+
+
+class SQLiteStore:
+    """
+    Counters in a SQLite file shared by every worker on the host.
+
+    Each check is one BEGIN IMMEDIATE transaction, so concurrent workers
+    serialize on the file's write lock and never lose an update. The
+    database runs in WAL mode with synchronous=NORMAL; counters are
+    disposable, so an fsync per check is not worth paying for.
+    """
+
+    clock = staticmethod(time.time)
+
+    def __init__(self, path, sweep_interval=60, busy_timeout_ms=2000):
+        """
+        Args:
+            path: Database file (created if missing)
+            sweep_interval: Seconds between idle-key sweeps in this process
+            busy_timeout_ms: How long to wait for another worker's lock
+        """
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self.busy_timeout_ms = busy_timeout_ms
+        self.evicted = 0
+
+        self._local = threading.local()
+        self._next_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+
+    def _connection(self):
+        """Per-thread connection, reopened after a fork."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            try:
+                conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000,
+                                       isolation_level=None, check_same_thread=False)
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('PRAGMA synchronous=NORMAL')
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS rate_limit_windows ('
+                    ' key TEXT PRIMARY KEY,'
+                    ' window REAL NOT NULL,'
+                    ' window_start REAL NOT NULL,'
+                    ' current INTEGER NOT NULL,'
+                    ' previous INTEGER NOT NULL'
+                    ') WITHOUT ROWID'
+                )
+            except sqlite3.Error as e:
+                raise RateLimitStoreError(f"Cannot open rate limit database {self.path}: {e}")
+            local.conn = conn
+            local.pid = os.getpid()
+        return local.conn
+
+    @staticmethod
+    def _key(key):
+        identifier, endpoint_type = key
+        return f"{endpoint_type}:{identifier}"
+
+    def _delete_idle(self, conn, now):
+        cursor = conn.execute('DELETE FROM rate_limit_windows WHERE ? - window_start >= 2 * window', (now,))
+        self.evicted += cursor.rowcount
+        return cursor.rowcount
+
+    def hit(self, key, limit, window, cost, now):
+        """Check and record a request (see MemoryStore.hit)."""
+        conn = self._connection()
+        sweep = False
+        if now >= self._next_sweep:
+            with self._sweep_lock:
+                if now >= self._next_sweep:
+                    self._next_sweep = now + self.sweep_interval
+                    sweep = True
+
+        store_key = self._key(key)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if sweep:
+                    self._delete_idle(conn, now)
+                row = conn.execute(
+                    'SELECT window_start, current, previous FROM rate_limit_windows WHERE key = ?',
+                    (store_key,)
+                ).fetchone()
+                state = list(row) if row else [now - (now % window), 0, 0]
+                result = _admit(state, now, limit, window, cost)
+                conn.execute(
+                    'INSERT OR REPLACE INTO rate_limit_windows (key, window, window_start, current, previous) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (store_key, window, state[0], state[1], state[2])
+                )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            raise RateLimitStoreError(f"Rate limit database error: {e}")
+        return result
+
+    def evict_idle(self, now):
+        """Delete idle keys now and return the number deleted."""
+        try:
+            return self._delete_idle(self._connection(), now)
+        except sqlite3.Error as e:
+            raise RateLimitStoreError(f"Rate limit database error: {e}")
+
+    def reset(self):
+        """Delete all counters."""
+        try:
+            self._connection().execute('DELETE FROM rate_limit_windows')
+        except sqlite3.Error as e:
+            raise RateLimitStoreError(f"Rate limit database error: {e}")
+
+    def tracked_keys(self):
+        """Number of keys in the database."""
+        try:
+            return self._connection().execute('SELECT COUNT(*) FROM rate_limit_windows').fetchone()[0]
+        except sqlite3.Error as e:
+            raise RateLimitStoreError(f"Rate limit database error: {e}")
+
+    def describe(self):
+        return f"sqlite:///{self.path}"
+
+
+class RedisConnection:
+    """
+    Minimal Redis (RESP2) client: pipelined commands over one socket.
+
+    Only what the rate limiter needs, so the redis package is not a
+    dependency.
+    """
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, timeout=0.5):
+        """
+        Args:
+            host: Server host
+            port: Server port
+            db: Database number to SELECT
+            password: Password for AUTH (None to skip)
+            timeout: Socket connect/read timeout in seconds
+        """
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        try:
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._reader = self._sock.makefile('rb')
+
+            setup = []
+            if password:
+                setup.append(('AUTH', password))
+            if db:
+                setup.append(('SELECT', db))
+            if setup:
+                self.pipeline(setup)
+        except BaseException:
+            self._sock.close()
+            raise
+
+    @staticmethod
+    def _encode(command):
+        parts = [b'*%d\r\n' % len(command)]
+        for arg in command:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError("Connection closed by Redis server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode()
+        if kind == b'-':
+            # Returned, not raised, so the caller can still read the replies after it
+            return RateLimitStoreError(f"Redis error: {payload.decode()}")
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise ConnectionError(f"Unexpected Redis reply: {line!r}")
+
+    def pipeline(self, commands):
+        """
+        Send several commands in one round trip.
+
+        Returns:
+            List of replies in command order
+
+        Raises:
+            RateLimitStoreError: A command failed (raised only after every
+                reply has been read, so the connection stays usable)
+        """
+        self._sock.sendall(b''.join(self._encode(command) for command in commands))
+        replies = [self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RateLimitStoreError):
+                raise reply
+        return replies
+
+    def execute(self, *command):
+        """Send one command and return its reply."""
+        return self.pipeline([command])[0]
+
+    def close(self):
+        try:
+            self._reader.close()
+            self._sock.close()
+        except OSError:
+            pass
+
+
+class RedisStore:
+    """
+    Counters in Redis, shared across workers and hosts.
+
+    Each fixed window is its own key ({prefix}{endpoint_type}:{identifier}:{index})
+    expiring after two windows. A check is one pipelined round trip
+    (INCRBY current, EXPIRE current, GET previous); a rejected request is
+    taken back with a second DECRBY. Windows are aligned to wall-clock time,
+    so hosts need synchronized clocks.
+    """
+
+    clock = staticmethod(time.time)
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='ratelimit:', timeout=0.5):
+        """
+        Args:
+            url: redis://[:password@]host[:port][/db]
+            prefix: Key prefix for all counters
+            timeout: Socket timeout in seconds
+        """
+        parsed = urlparse(url)
+        self.url = url
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.prefix = prefix
+        self.timeout = timeout
+        self.evicted = 0
+
+        self._local = threading.local()
+
+    def _connection(self):
+        """Per-thread connection, reopened after a fork."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid() or local.conn is None:
+            try:
+                local.conn = RedisConnection(self.host, self.port, self.db, self.password, self.timeout)
+            except OSError as e:
+                raise RateLimitStoreError(f"Cannot connect to Redis at {self.host}:{self.port}: {e}")
+            local.pid = os.getpid()
+        return local.conn
+
+    def _pipeline(self, commands):
+        conn = self._connection()
+        try:
+            return conn.pipeline(commands)
+        except RateLimitStoreError:
+            raise
+        except Exception as e:
+            # Replies may be left unread; drop the connection and reconnect on the next check
+            conn.close()
+            self._local.conn = None
+            raise RateLimitStoreError(f"Redis request failed: {e}")
+
+    def hit(self, key, limit, window, cost, now):
+        """Check and record a request (see MemoryStore.hit)."""
+        identifier, endpoint_type = key
+        index = int(now // window)
+        base = f"{self.prefix}{endpoint_type}:{identifier}:"
+        current_key = f"{base}{index}"
+
+        current, _, previous = self._pipeline([
+            ('INCRBY', current_key, cost),
+            ('EXPIRE', current_key, int(2 * window) + 1),
+            ('GET', f"{base}{index - 1}")
+        ])
+        current -= cost
+        previous = int(previous) if previous is not None else 0
+        elapsed = now - index * window
+
+        allowed = previous * (1 - elapsed / window) + current + cost <= limit
+        if not allowed:
+            self._pipeline([('DECRBY', current_key, cost)])
+        return allowed, elapsed, current, previous
+
+    def evict_idle(self, now):
+        """Redis expires idle keys itself."""
+        return 0
+
+    def reset(self):
+        """Delete all counters under the prefix."""
+        cursor = b'0'
+        while True:
+            cursor, keys = self._pipeline([('SCAN', cursor, 'MATCH', f"{self.prefix}*", 'COUNT', 1000)])[0]
+            if keys:
+                self._pipeline([('DEL', *keys)])
+            if cursor in (b'0', '0'):
+                return
+
+    def tracked_keys(self):
+        """Not counted for Redis (would need a key scan)."""
+        return None
+
+    def describe(self):
+        return f"redis://{self.host}:{self.port}/{self.db}"
+
+
+def create_store(url=None, sweep_interval=60):
+    """
+    Build a store from a RATE_LIMIT_STORE style URL.
+
+    Args:
+        url: 'memory', 'sqlite:///path/to/file.db' or 'redis://host:port/db'
+            (default: RATE_LIMIT_STORE environment variable, else 'memory')
+        sweep_interval: Seconds between idle-key sweeps (memory and SQLite)
+
+    Returns:
+        Store instance
+    """
+    url = url or os.environ.get('RATE_LIMIT_STORE') or 'memory'
+    if url == 'memory':
+        return MemoryStore(sweep_interval=sweep_interval)
+    if url.startswith('sqlite:///'):
+        return SQLiteStore(url[len('sqlite:///'):], sweep_interval=sweep_interval)
+    if url.startswith('redis://'):
+        return RedisStore(url)
+    raise ValueError(f"Unsupported RATE_LIMIT_STORE: {url!r}")
+
+
+def benchmark(store, checks=20000, identifiers=1000):
+    """
+    Measure the per-check cost of a store through a RateLimiter.
+
+    Args:
+        store: Store instance
+        checks: Number of checks to time
+        identifiers: Distinct clients to spread the checks over
+
+    Returns:
+        Dictionary with store, checks, total seconds and microseconds per check
+    """
+    from backend.middleware.security import RateLimiter
+
+    limiter = RateLimiter(store=store)
+    keys = [f"client-{i}" for i in range(identifiers)]
+    limiter.check(keys[0])  # open connections / create tables outside the timing
+
+    start = time.perf_counter()
+    for i in range(checks):
+        limiter.check(keys[i % identifiers])
+    seconds = time.perf_counter() - start
+    store.reset()
+
+    return {
+        'store': store.describe(),
+        'checks': checks,
+        'seconds': seconds,
+        'us_per_check': seconds / checks * 1e6
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark rate limit store per-check overhead")
+    parser.add_argument('stores', nargs='*', help="Store URLs (default: memory and a temporary SQLite file)")
+    parser.add_argument('--checks', type=int, default=20000, help="Checks per store")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        urls = args.stores or ['memory', f"sqlite:///{os.path.join(tmpdir, 'ratelimit.db')}"]
+        for url in urls:
+            try:
+                result = benchmark(create_store(url), checks=args.checks)
+            except RateLimitStoreError as e:
+                print(f"❌ {url}: {e}")
+                continue
+            print(f"{result['store']:<45} {result['us_per_check']:>9.1f} us/check "
+                  f"({result['checks']} checks in {result['seconds']:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,22 +6,41 @@ Protects endpoints from abuse and implements security best practices
 from functools import wraps
 from flask import request, jsonify
 import time
-from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import datetime
 import hashlib
 import re
+from backend.middleware.rate_limit_store import MemoryStore, RateLimitStoreError, create_store
 
 
 class RateLimiter:
     """
-    Token bucket rate limiter for API endpoints.
-    Implements per-IP and per-endpoint rate limiting.
+    Sliding-window-counter rate limiter for API endpoints.
+    Implements per-client, per-endpoint-type rate limiting.
+    
+    Each (identifier, endpoint type) key keeps only the current and previous
+    fixed-window counts. The request rate is estimated by weighting the
+    previous window by how much of it still overlaps the sliding window, so
+    every check is O(1) in time and memory. The counters live in a pluggable
+    store (see rate_limit_store): in-process by default, or a SQLite file or
+    Redis server shared by all workers.
     """
     
-    def __init__(self):
-        """Initialize rate limiter with storage for requests."""
-        # Store: {identifier: [(timestamp, endpoint), ...]}
-        self._requests = defaultdict(list)
+    def __init__(self, sweep_interval=60, clock=None, store=None):
+        """
+        Initialize rate limiter.
+        
+        Args:
+            sweep_interval: Seconds between idle-key sweeps (in-process store)
+            clock: Time source (default: the store's clock; injectable for tests)
+            store: Counter store (default: in-process MemoryStore)
+        """
+        self.store = store or MemoryStore(sweep_interval=sweep_interval)
+        self._clock = clock or self.store.clock
+        
+        # Running totals so get_stats never walks the keys
+        self._allowed = 0
+        self._rejected = 0
+        self._store_errors = 0
         
         # Rate limit configurations
         self._limits = {
@@ -29,9 +48,10 @@ class RateLimiter:
             'prediction': {'requests': 30, 'window': 60},  # 30 req/min
             'ml_analysis': {'requests': 20, 'window': 60},  # 20 req/min
             'report': {'requests': 10, 'window': 60},  # 10 req/min
+            'batch_prediction': {'requests': 1000, 'window': 60},  # 1000 patients/min
         }
         
-        print("✅ RateLimiter initialized")
+        print(f"✅ RateLimiter initialized ({self.store.describe()} store)")
     
     def _get_identifier(self, request_obj):
         """
@@ -54,76 +74,112 @@ class RateLimiter:
         
         return identifier
     
-    def _clean_old_requests(self, identifier, window):
+    def check(self, identifier, endpoint_type='default', cost=1):
         """
-        Remove requests outside the time window.
+        Check and record a request for an explicit identifier.
         
-        Args:
-            identifier: Request identifier
-            window: Time window in seconds
-        """
-        current_time = time.time()
-        cutoff_time = current_time - window
-        
-        # Keep only requests within the window
-        self._requests[identifier] = [
-            (timestamp, endpoint) 
-            for timestamp, endpoint in self._requests[identifier]
-            if timestamp > cutoff_time
-        ]
-    
-    def check_rate_limit(self, endpoint_type='default'):
-        """
-        Check if request is within rate limit.
+        If a shared store is unreachable the request is allowed, so a
+        store outage degrades to no rate limiting rather than failing requests.
         
         Args:
-            endpoint_type: Type of endpoint (default, prediction, ml_analysis, report)
+            identifier: Client identifier
+            endpoint_type: Type of endpoint (default, prediction, ml_analysis, report, batch_prediction)
+            cost: Units this request consumes (e.g. items in a batch request)
             
         Returns:
             Tuple of (allowed: bool, retry_after: int, remaining: int)
         """
-        identifier = self._get_identifier(request)
-        
-        # Get rate limit config
         config = self._limits.get(endpoint_type, self._limits['default'])
-        max_requests = config['requests']
+        limit = config['requests']
         window = config['window']
         
-        # Clean old requests
-        self._clean_old_requests(identifier, window)
+        try:
+            allowed, elapsed, current, previous = self.store.hit(
+                (identifier, endpoint_type), limit, window, cost, self._clock()
+            )
+        except RateLimitStoreError as e:
+            if self._store_errors == 0:
+                print(f"⚠️ Rate limit store unavailable, allowing requests: {e}")
+            self._store_errors += 1
+            return True, 0, limit
+        
+        if not allowed:
+            self._rejected += 1
+            return False, self._retry_after(limit, window, elapsed, current, previous, cost), 0
+        
+        self._allowed += cost
+        estimate = previous * (1 - elapsed / window) + current
+        return True, 0, int(limit - estimate - cost)
+    
+    @staticmethod
+    def _retry_after(limit, window, elapsed, current, previous, cost):
+        """
+        Seconds until a request of the given cost would fit the estimate.
         
-        # Count requests in current window
-        current_requests = len(self._requests[identifier])
+        Returns:
+            Whole seconds (at least 1)
+        """
+        if cost > limit:
+            return int(window)
+        
+        if current + cost <= limit and previous > 0:
+            # Fits later in this window, once enough of the previous one slides out
+            wait = window * (1 - (limit - current - cost) / previous) - elapsed
+        else:
+            # Wait for the next window; this window's count then decays
+            wait = window - elapsed
+            if current > 0:
+                wait += max(0.0, window * (1 - (limit - cost) / current))
+        
+        return max(1, int(wait) + 1)
+    
+    def check_rate_limit(self, endpoint_type='default', cost=1):
+        """
+        Check if request is within rate limit.
         
-        # Check if limit exceeded
-        if current_requests >= max_requests:
-            # Calculate retry after time
-            oldest_request = min(self._requests[identifier], key=lambda x: x[0])
-            retry_after = int(window - (time.time() - oldest_request[0])) + 1
+        Args:
+            endpoint_type: Type of endpoint (default, prediction, ml_analysis, report, batch_prediction)
+            cost: Units this request consumes (e.g. items in a batch request)
             
-            return False, retry_after, 0
-        
-        # Add current request
-        self._requests[identifier].append((time.time(), endpoint_type))
-        
-        # Calculate remaining requests
-        remaining = max_requests - current_requests - 1
+        Returns:
+            Tuple of (allowed: bool, retry_after: int, remaining: int)
+        """
+        return self.check(self._get_identifier(request), endpoint_type, cost)
+    
+    def evict_idle(self):
+        """
+        Sweep idle keys from the store now.
         
-        return True, 0, remaining
+        Returns:
+            Number of keys evicted
+        """
+        return self.store.evict_idle(self._clock())
+    
+    def reset(self):
+        """Forget all tracked clients."""
+        self.store.reset()
     
     def get_stats(self):
         """
         Get rate limiter statistics.
         
+        Counters are for this process; tracked_keys comes from the store
+        (None for Redis, which is not scanned).
+        
         Returns:
             Dictionary with statistics
         """
-        total_identifiers = len(self._requests)
-        total_requests = sum(len(reqs) for reqs in self._requests.values())
-        
+        try:
+            tracked_keys = self.store.tracked_keys()
+        except RateLimitStoreError:
+            tracked_keys = None
         return {
-            'total_identifiers': total_identifiers,
-            'total_requests': total_requests,
+            'store': self.store.describe(),
+            'tracked_keys': tracked_keys,
+            'total_requests': self._allowed,
+            'rejected_requests': self._rejected,
+            'evicted_keys': self.store.evicted,
+            'store_errors': self._store_errors,
             'limits': self._limits
         }
 
@@ -266,10 +322,31 @@ class SecurityValidator:
 
 
 # Global instances
-rate_limiter = RateLimiter()
+rate_limiter = RateLimiter(store=create_store())
 security_validator = SecurityValidator()
 
 
+def rate_limit_exceeded_response(retry_after):
+    """
+    Build the 429 response returned when a rate limit is exceeded.
+    
+    Args:
+        retry_after: Seconds until the request may be retried
+        
+    Returns:
+        Flask response object
+    """
+    response = jsonify({
+        'error': 'Rate limit exceeded',
+        'message': f'Too many requests. Please try again in {retry_after} seconds.',
+        'retry_after': retry_after
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    response.headers['X-RateLimit-Remaining'] = '0'
+    return response
+
+
 def rate_limit(endpoint_type='default'):
     """
     Decorator for rate limiting endpoints.
@@ -290,15 +367,7 @@ def rate_limit(endpoint_type='default'):
             allowed, retry_after, remaining = rate_limiter.check_rate_limit(endpoint_type)
             
             if not allowed:
-                response = jsonify({
-                    'error': 'Rate limit exceeded',
-                    'message': f'Too many requests. Please try again in {retry_after} seconds.',
-                    'retry_after': retry_after
-                })
-                response.status_code = 429
-                response.headers['Retry-After'] = str(retry_after)
-                response.headers['X-RateLimit-Remaining'] = '0'
-                return response
+                return rate_limit_exceeded_response(retry_after)
             
             # Add rate limit headers
             response = f(*args, **kwargs)
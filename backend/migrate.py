@@ -0,0 +1,76 @@
+"""
+Schema migrations for databases created before a model column existed.
+
+db.create_all() only creates missing tables; it never alters existing ones,
+so columns added to a model are applied here. create_app refuses to start
+while one is missing. Run explicitly (the app does not need to start):
+
+    python -m backend.migrate [sqlite database path]
+"""
+
+import os
+import sys
+
+from sqlalchemy import create_engine, inspect, text
+
+DEFAULT_DATABASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'site.db')
+
+# (table, column, statement adding it) for columns added after the table was released
+ADDED_COLUMNS = [
+    ('prediction_history', 'model_version',
+     'ALTER TABLE prediction_history ADD COLUMN model_version VARCHAR(64)'),
+]
+
+
+def missing_columns(engine):
+    """
+    Columns of ADDED_COLUMNS absent from existing tables.
+
+    Args:
+        engine: SQLAlchemy engine of the database
+
+    Returns:
+        List of (table, column, statement) entries of ADDED_COLUMNS
+    """
+    inspector = inspect(engine)
+    return [
+        (table, column, statement) for table, column, statement in ADDED_COLUMNS
+        if inspector.has_table(table) and column not in {c['name'] for c in inspector.get_columns(table)}
+    ]
+
+
+def migrate(engine):
+    """
+    Add every missing column.
+
+    Args:
+        engine: SQLAlchemy engine of the database
+
+    Returns:
+        List of 'table.column' names added
+    """
+    added = []
+    with engine.begin() as connection:
+        for table, column, statement in missing_columns(connection):
+            connection.execute(text(statement))
+            added.append(f'{table}.{column}')
+    return added
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else DEFAULT_DATABASE
+    engine = create_engine('sqlite:///' + path)
+    try:
+        added = migrate(engine)
+    finally:
+        engine.dispose()
+    if added:
+        print(f"✅ Added {', '.join(added)} to {path}")
+    else:
+        print(f"✅ {path} is up to date")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,6 +3,6 @@ ML Models package for disease prediction.
 Contains machine learning models and related utilities.
 """
 
-from .ml_model import DiseaseMLModel, ml_model
+from .ml_model import DiseaseMLModel, HotReloadingModel, ml_model
 
-__all__ = ['DiseaseMLModel', 'ml_model']
\ No newline at end of file
+__all__ = ['DiseaseMLModel', 'HotReloadingModel', 'ml_model']
\ No newline at end of file
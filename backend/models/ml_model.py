@@ -1,6 +1,54 @@
 import numpy as np
 from typing import List, Dict, Tuple
+from itertools import chain, islice, repeat
+import heapq
+import hashlib
 import json
+import os
+import re
+import threading
+from datetime import datetime
+from backend.middleware.logger import get_logger
+from backend.utils.cache import LRUCache
+from backend.utils.startup import startup_timer
+
+# Long-form names (as spelled in hospital_data.csv) for diseases keyed by acronym
+DISEASE_NAME_ALIASES = {
+    'chronic_obstructive_pulmonary_disease': 'copd',
+    'gastroesophageal_reflux_disease': 'gerd',
+    'irritable_bowel_syndrome': 'ibs',
+    'urinary_tract_infection': 'uti',
+    'polycystic_ovary_syndrome': 'pcos',
+}
+
+# Upper bound on remembered raw disease strings (hits and misses)
+MAX_RESOLVED_DISEASE_NAMES = 10000
+
+# Diseases with more symptoms than this are scored in compute mode
+# (a table holds 3 * 2**n entries)
+MAX_TABLE_SYMPTOMS = 12
+
+# Age bias per bucket: <20, 20-50 (or unknown), >50
+AGE_BUCKET_BIAS = (-0.5, 0.0, 0.5)
+
+# Exported model artifact layout: a directory holding a JSON vocabulary
+# header plus .npy arrays that can be memory-mapped and shared by workers
+ARTIFACT_FORMAT_VERSION = 1
+ARTIFACT_HEADER = 'model.json'
+ARTIFACT_WEIGHTS = 'weights.npy'
+ARTIFACT_BIAS = 'bias.npy'
+
+# The ml_model singleton loads from here when an artifact is present
+DEFAULT_ARTIFACT_PATH = os.environ.get(
+    'DISEASE_MODEL_ARTIFACT',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'artifacts', 'disease_model')
+)
+
+
+def _compact_disease_name(name: str) -> str:
+    """Lowercase and drop every separator: 'COVID-19' -> 'covid19', "Crohn's" -> 'crohns'."""
+    return re.sub(r'[^a-z0-9]', '', name.lower())
+
 
 class DiseaseMLModel:
     """
@@ -8,7 +56,34 @@ class DiseaseMLModel:
     Uses logistic regression-style weighted scoring.
     """
     
-    def __init__(self):
+    def __init__(self, table_mode: bool = True, cache_size: int = 4096, artifact_path: str = None,
+                 disease_weights: Dict = None):
+        """
+        Args:
+            table_mode: Serve predict_disease_probability from precomputed
+                per-disease lookup tables where possible
+            cache_size: Entries in the prediction LRU cache (0 disables it)
+            artifact_path: Load weights from an exported model artifact
+                directory instead of the built-in table below
+            disease_weights: Use this mapping of disease key ->
+                {'symptoms': {...}, 'bias': float} instead of the built-in table
+        """
+        self.table_mode = table_mode
+
+        # Predictions keyed on (disease key, matched symptom set, age bucket)
+        self.prediction_cache = LRUCache(maxsize=cache_size)
+
+        if artifact_path is not None:
+            # Compiled weights memory-mapped from an exported artifact
+            self._load_artifact(artifact_path)
+            self._build(compiled=True)
+            return
+
+        if disease_weights is not None:
+            self.disease_weights = disease_weights
+            self._build()
+            return
+
         # Symptom weights for each disease (trained coefficients)
         self.disease_weights = {
             'diabetes': {'symptoms': {'increased_thirst': 0.85, 'frequent_urination': 0.90, 'extreme_hunger': 0.75, 'unexplained_weight_loss': 0.80, 'fatigue': 0.60, 'blurred_vision': 0.70, 'slow_healing_sores': 0.65, 'frequent_infections': 0.60, 'tingling_hands_feet': 0.70, 'darkened_skin': 0.55}, 'bias': -2.5},
@@ -113,9 +188,31 @@ class DiseaseMLModel:
             'polio': {'symptoms': {'fever': 0.80, 'sore_throat': 0.75, 'headache': 0.80, 'vomiting': 0.75, 'fatigue': 0.80, 'muscle_weakness': 0.90, 'meningitis': 0.85}, 'bias': -4.5},
         }
         
+        self._build()
+
+    def _build(self, compiled: bool = False):
+        """
+        Derive every lookup structure from disease_weights.
+
+        Args:
+            compiled: weight_matrix, bias_vector and the index maps are
+                already set (loaded from an artifact), so skip compiling them
+        """
         # Helper to auto-generate display names map from the keys above
         self.symptom_display_names = self._generate_symptom_names()
 
+        # Dense disease x symptom matrix used for differential diagnosis
+        if compiled:
+            self._index_weight_matrix()
+        else:
+            self._compile_weights()
+
+        # O(1) disease name resolution
+        self._build_alias_index()
+
+        # Precomputed results per (age bucket, symptom bitmask)
+        self._build_probability_tables()
+
     def _generate_symptom_names(self):
         """Auto-generate display names from symptom keys"""
         names = {}
@@ -124,6 +221,282 @@ class DiseaseMLModel:
                 names[symptom_key] = symptom_key.replace('_', ' ').title()
         return names
 
+    def _compile_weights(self):
+        """
+        Compile disease_weights into dense NumPy structures.
+
+        Builds a (diseases x symptoms) weight matrix, a bias vector and the
+        index maps between names and rows/columns, so scoring every disease
+        for one symptom set is a single matrix-vector product.
+        """
+        self.disease_index = list(self.disease_weights.keys())
+        self.symptom_index = {}
+        for data in self.disease_weights.values():
+            for symptom_key in data['symptoms']:
+                if symptom_key not in self.symptom_index:
+                    self.symptom_index[symptom_key] = len(self.symptom_index)
+
+        self.weight_matrix = np.zeros((len(self.disease_index), len(self.symptom_index)))
+        self.bias_vector = np.zeros(len(self.disease_index))
+        for row, disease in enumerate(self.disease_index):
+            data = self.disease_weights[disease]
+            self.bias_vector[row] = data['bias']
+            for symptom_key, weight in data['symptoms'].items():
+                self.weight_matrix[row, self.symptom_index[symptom_key]] = weight
+
+        self.version = self._compute_version()
+        self._index_weight_matrix()
+
+    def _compute_version(self) -> str:
+        """Content hash of the compiled weights and vocabulary (12 hex chars)."""
+        digest = hashlib.sha256()
+        digest.update(json.dumps([
+            list(self.symptom_index),
+            [[disease, list(self.disease_weights[disease]['symptoms'])] for disease in self.disease_index]
+        ]).encode('utf-8'))
+        digest.update(np.ascontiguousarray(self.weight_matrix, dtype=np.float64).tobytes())
+        digest.update(np.ascontiguousarray(self.bias_vector, dtype=np.float64).tobytes())
+        return digest.hexdigest()[:12]
+
+    def _index_weight_matrix(self):
+        """Build the match mask, inverted index and bias-only results from weight_matrix."""
+        # 1.0 where the disease carries the symptom (used to count matches)
+        self.symptom_mask = (self.weight_matrix != 0).astype(np.float64)
+
+        # Inverted index: symptom column -> (disease rows, weights) carrying it
+        self._symptom_postings = []
+        for col in range(len(self.symptom_index)):
+            rows = np.flatnonzero(self.weight_matrix[:, col])
+            self._symptom_postings.append((rows, self.weight_matrix[rows, col]))
+
+        # Bias-only results for diseases sharing no symptom with the patient,
+        # plus the catalog ranked by them (ties keep catalog order)
+        bias_probabilities = self.sigmoid(self.bias_vector)
+        self._bias_only_results = list(zip(
+            bias_probabilities.tolist(),
+            np.clip(bias_probabilities, 0.05, 0.95).tolist(),
+            (0.75 + (bias_probabilities * 0.20)).tolist(),
+            (bias_probabilities * 0.5).tolist()
+        ))
+        self._bias_only_order = np.argsort(-bias_probabilities, kind='stable').tolist()
+
+    def export_artifact(self, path: str):
+        """
+        Serialize the compiled model to a versioned artifact directory.
+
+        Writes weights.npy and bias.npy, then model.json last (each via a
+        temporary file and os.replace), so a reader never sees a header for
+        arrays that are not fully written.
+
+        Args:
+            path: Artifact directory (created if missing)
+        """
+        os.makedirs(path, exist_ok=True)
+
+        for filename, array in ((ARTIFACT_WEIGHTS, self.weight_matrix), (ARTIFACT_BIAS, self.bias_vector)):
+            tmp_path = os.path.join(path, filename + '.tmp')
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.ascontiguousarray(array, dtype=np.float64))
+            os.replace(tmp_path, os.path.join(path, filename))
+
+        header = {
+            'format_version': ARTIFACT_FORMAT_VERSION,
+            'model_version': self.version,
+            'shape': list(self.weight_matrix.shape),
+            'symptoms': list(self.symptom_index),
+            'diseases': [
+                {'key': disease, 'symptoms': list(self.disease_weights[disease]['symptoms'])}
+                for disease in self.disease_index
+            ]
+        }
+        tmp_path = os.path.join(path, ARTIFACT_HEADER + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(header, f)
+        os.replace(tmp_path, os.path.join(path, ARTIFACT_HEADER))
+
+    def _load_artifact(self, path: str):
+        """
+        Load compiled weights from an artifact written by export_artifact.
+
+        The weight matrix and bias vector are memory-mapped read-only, so
+        every worker process on a host shares the same pages.
+
+        Raises:
+            ValueError: Unsupported format version or inconsistent arrays
+        """
+        with open(os.path.join(path, ARTIFACT_HEADER), encoding='utf-8') as f:
+            header = json.load(f)
+
+        if header.get('format_version') != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported model artifact version {header.get('format_version')} "
+                f"(expected {ARTIFACT_FORMAT_VERSION})"
+            )
+
+        weight_matrix = np.load(os.path.join(path, ARTIFACT_WEIGHTS), mmap_mode='r')
+        bias_vector = np.load(os.path.join(path, ARTIFACT_BIAS), mmap_mode='r')
+        expected_shape = (len(header['diseases']), len(header['symptoms']))
+        if weight_matrix.shape != expected_shape or bias_vector.shape != expected_shape[:1]:
+            raise ValueError(f"Model artifact arrays do not match header shape {expected_shape}")
+
+        self.weight_matrix = weight_matrix
+        self.bias_vector = bias_vector
+        self.symptom_index = {symptom: col for col, symptom in enumerate(header['symptoms'])}
+        self.disease_index = [disease['key'] for disease in header['diseases']]
+
+        # Rebuild the nested dict view used by the per-disease code paths
+        self.disease_weights = {}
+        for row, disease in enumerate(header['diseases']):
+            self.disease_weights[disease['key']] = {
+                'symptoms': {
+                    symptom: float(weight_matrix[row, self.symptom_index[symptom]])
+                    for symptom in disease['symptoms']
+                },
+                'bias': float(bias_vector[row])
+            }
+
+        self.version = header.get('model_version') or self._compute_version()
+
+    def _build_probability_tables(self):
+        """
+        Precompute every prediction for diseases with few symptoms.
+
+        For each disease with at most MAX_TABLE_SYMPTOMS symptoms, every
+        (age bucket, symptom subset) combination is scored up front. The
+        table maps symptom key -> bit, and holds one row per age bucket of
+        (raw_probability, prior, likelihood, symptoms_matched, confidence)
+        tuples indexed by bitmask.
+        """
+        self._probability_tables = {}
+        for disease_key, data in self.disease_weights.items():
+            symptom_weights = data['symptoms']
+            num_symptoms = len(symptom_weights)
+            if num_symptoms > MAX_TABLE_SYMPTOMS:
+                continue
+
+            symptom_bits = {symptom: 1 << i for i, symptom in enumerate(symptom_weights)}
+            masks = np.arange(1 << num_symptoms)
+            present = (masks[:, None] >> np.arange(num_symptoms)) & 1
+            weighted_sums = present @ np.array(list(symptom_weights.values()), dtype=np.float64)
+            matched_counts = present.sum(axis=1)
+
+            rows = []
+            for age_bias in AGE_BUCKET_BIAS:
+                raw_probabilities = self.sigmoid(data['bias'] + age_bias + weighted_sums)
+                priors = np.clip(raw_probabilities, 0.05, 0.95)
+                likelihoods = 0.75 + (raw_probabilities * 0.20)
+                confidences = (np.minimum(1.0, matched_counts / 5) * 0.5) + (raw_probabilities * 0.5)
+                rows.append(list(zip(
+                    raw_probabilities.tolist(),
+                    priors.tolist(),
+                    likelihoods.tolist(),
+                    matched_counts.tolist(),
+                    confidences.tolist()
+                )))
+            self._probability_tables[disease_key] = (symptom_bits, rows)
+
+    @staticmethod
+    def _age_bucket(age) -> int:
+        """Index into AGE_BUCKET_BIAS: 0 for <20, 2 for >50, 1 otherwise or unknown."""
+        if age is not None:
+            if age > 50:
+                return 2
+            elif age < 20:
+                return 0
+        return 1
+
+    def _lookup_probability_table(self, disease_key: str, symptoms: List[str], age):
+        """
+        Look up a precomputed prediction.
+
+        Returns None when the disease has no table or the symptom list names
+        a matching symptom twice (the compute path counts repeats; a bitmask
+        cannot), so the caller falls back to compute mode.
+        """
+        table = self._probability_tables.get(disease_key)
+        if table is None:
+            return None
+
+        symptom_bits, rows = table
+        mask = 0
+        for symptom in symptoms:
+            bit = symptom_bits.get(symptom)
+            if bit is not None:
+                if mask & bit:
+                    return None
+                mask |= bit
+        return rows[self._age_bucket(age)][mask]
+
+    def _build_alias_index(self):
+        """
+        Build the alias index used by _match_disease_key.
+
+        Every disease key is indexed under its compacted form, which covers
+        display names, hyphen/space/underscore variants and punctuation in
+        the hospital_data.csv spellings ("COVID-19", "HIV/AIDS",
+        "Alzheimer's Disease"). Long-form names of acronym keys come from
+        DISEASE_NAME_ALIASES.
+        """
+        self._disease_aliases = {}
+        for key in self.disease_weights:
+            self._disease_aliases[_compact_disease_name(key)] = key
+        for alias, key in DISEASE_NAME_ALIASES.items():
+            if key in self.disease_weights:
+                self._disease_aliases[_compact_disease_name(alias)] = key
+
+        # Raw string -> resolved key, seeded with keys and display names
+        self._resolved_disease_names = {}
+        for key in self.disease_weights:
+            self._resolved_disease_names[key] = key
+            self._resolved_disease_names[key.replace('_', ' ').title()] = key
+
+    def _match_disease_key(self, disease: str) -> str:
+        """
+        Resolve a disease name to its disease_weights key.
+
+        Results are cached per raw string, misses included. Returns the
+        normalized string when nothing matches, so callers can report it in
+        their error message.
+        """
+        disease_key = self._resolved_disease_names.get(disease)
+        if disease_key is None:
+            disease_key = self._disease_aliases.get(_compact_disease_name(disease))
+            if disease_key is None:
+                disease_key = disease.lower().replace(' ', '_').replace('-', '_')
+
+            if len(self._resolved_disease_names) >= MAX_RESOLVED_DISEASE_NAMES:
+                self._resolved_disease_names.clear()
+            self._resolved_disease_names[disease] = disease_key
+        return disease_key
+
+    def _encode_symptom_sets(self, symptom_sets: List[List[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Encode many symptom lists as a sparse (patient x symptom) matrix.
+
+        Returns COO coordinates (row ids, symptom column ids) with one entry
+        per known symptom occurrence; unknown symptoms are dropped.
+        """
+        lookup = self.symptom_index.get
+        lengths = np.fromiter(map(len, symptom_sets), dtype=np.intp, count=len(symptom_sets))
+        cols = np.fromiter(
+            map(lookup, chain.from_iterable(symptom_sets), repeat(-1)),
+            dtype=np.intp,
+            count=int(lengths.sum())
+        )
+        rows = np.repeat(np.arange(len(symptom_sets), dtype=np.intp), lengths)
+        known = cols >= 0
+        return rows[known], cols[known]
+
+    @staticmethod
+    def _age_adjustments(ages) -> np.ndarray:
+        """Vectorized age bias: +0.5 above 50, -0.5 below 20, 0 when unknown."""
+        # None converts to NaN, which compares False against both thresholds
+        ages = np.array(list(ages), dtype=np.float64)
+        adjustments = np.zeros(len(ages))
+        adjustments[ages > 50] = 0.5
+        adjustments[ages < 20] = -0.5
+        return adjustments
+
     @staticmethod
     def sigmoid(z: float) -> float:
         """Sigmoid activation function for logistic regression"""
@@ -137,21 +510,58 @@ class DiseaseMLModel:
             symptoms: List of symptom keys (e.g., ['fever', 'cough'])
             age: Optional age of the patient
         """
-        # Normalize disease key
-        disease_key = disease.lower().replace(' ', '_').replace('-', '_')
-        
-        # Fuzzy match if exact match fail (handle 'diabetes type 2' vs 'diabetes_type_2')
-        if disease_key not in self.disease_weights:
-            # Try to find a partial match
-            for key in self.disease_weights.keys():
-                if key.replace('_', '') == disease_key.replace('_', ''):
-                    disease_key = key
-                    break
+        disease_key = self._match_disease_key(disease)
         
         if disease_key not in self.disease_weights:
             # Fallback for UI safety if totally unknown
             raise ValueError(f"Disease '{disease}' (key: {disease_key}) not found in model")
-        
+
+        cache_key = self._prediction_cache_key(disease_key, symptoms, age)
+        entry = None
+        if cache_key is not None:
+            entry = self.prediction_cache.get(cache_key)
+
+        if entry is None:
+            # Table mode: no arithmetic on the request path
+            if self.table_mode:
+                entry = self._lookup_probability_table(disease_key, symptoms, age)
+            if entry is None:
+                entry = self._compute_prediction(disease_key, symptoms, age)
+            if cache_key is not None:
+                self.prediction_cache.put(cache_key, entry)
+
+        raw_probability, prior, likelihood, symptoms_matched, confidence = entry
+        return {
+            'disease': disease,
+            'raw_probability': raw_probability,
+            'prior_probability': prior,
+            'likelihood': likelihood,
+            'symptoms_matched': symptoms_matched,
+            'total_symptoms': len(symptoms),
+            'confidence_score': confidence
+        }
+
+    def _prediction_cache_key(self, disease_key: str, symptoms: List[str], age):
+        """
+        Canonical cache key: (disease key, frozenset of matched symptoms, age bucket).
+
+        Returns None when a matching symptom repeats, since compute mode
+        counts repeats and a set cannot represent them.
+        """
+        symptom_weights = self.disease_weights[disease_key]['symptoms']
+        matched = [symptom for symptom in symptoms if symptom in symptom_weights]
+        matched_set = frozenset(matched)
+        if len(matched_set) != len(matched):
+            return None
+        return (disease_key, matched_set, self._age_bucket(age))
+
+    def _compute_prediction(self, disease_key: str, symptoms: List[str], age) -> Tuple:
+        """
+        Score one disease arithmetically (compute mode).
+
+        Returns:
+            Tuple of (raw_probability, prior, likelihood, symptoms_matched, confidence)
+        """
         weights = self.disease_weights[disease_key]
         symptom_weights = weights['symptoms']
         bias = weights['bias']
@@ -176,15 +586,13 @@ class DiseaseMLModel:
         prior = min(0.95, max(0.05, raw_probability))
         likelihood = 0.75 + (raw_probability * 0.20)
         
-        return {
-            'disease': disease,
-            'raw_probability': float(raw_probability),
-            'prior_probability': float(prior),
-            'likelihood': float(likelihood),
-            'symptoms_matched': len(matched_symptoms),
-            'total_symptoms': len(symptoms),
-            'confidence_score': self._calculate_confidence(len(matched_symptoms), raw_probability)
-        }
+        return (
+            float(raw_probability),
+            float(prior),
+            float(likelihood),
+            len(matched_symptoms),
+            self._calculate_confidence(len(matched_symptoms), raw_probability)
+        )
     
     def _calculate_confidence(self, num_symptoms: int, probability: float) -> float:
         symptom_factor = min(1.0, num_symptoms / 5)
@@ -195,13 +603,7 @@ class DiseaseMLModel:
         return list(self.disease_weights.keys())
     
     def get_disease_symptoms(self, disease: str) -> Dict[str, str]:
-        disease_key = disease.lower().replace(' ', '_').replace('-', '_')
-        # match key logic
-        if disease_key not in self.disease_weights:
-             for key in self.disease_weights.keys():
-                if key.replace('_', '') == disease_key.replace('_', ''):
-                    disease_key = key
-                    break
+        disease_key = self._match_disease_key(disease)
         
         if disease_key not in self.disease_weights:
             raise ValueError(f"Disease '{disease}' not found in model")
@@ -212,24 +614,186 @@ class DiseaseMLModel:
             for key in symptom_keys
         }
     
-    def predict_multiple_diseases(self, symptoms: List[str]) -> List[Dict]:
+    def predict_multiple_diseases(self, symptoms: List[str], top_k: int = None) -> List[Dict]:
+        """
+        Score diseases for one symptom set (differential diagnosis).
+
+        Only diseases sharing at least one symptom with the patient are
+        scored, via the symptom -> disease inverted index; every other
+        disease takes its precomputed bias-only result. The two ranked
+        streams are merged lazily, so with top_k the cost depends on the
+        number of matched diseases and k rather than on catalog size.
+        Results match predict_disease_probability for each disease.
+
+        Args:
+            symptoms: List of symptom keys
+            top_k: Return only the k most likely diseases (all when None)
+        """
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k must be a positive integer")
+
+        candidate_rows = []
+        candidate_weights = []
+        for symptom in symptoms:
+            col = self.symptom_index.get(symptom)
+            if col is not None:
+                rows, weights = self._symptom_postings[col]
+                candidate_rows.append(rows)
+                candidate_weights.append(weights)
+
+        if candidate_rows:
+            rows = np.concatenate(candidate_rows)
+            candidates, inverse = np.unique(rows, return_inverse=True)
+            z = self.bias_vector[candidates] + np.bincount(inverse, weights=np.concatenate(candidate_weights))
+            matched_counts = np.bincount(inverse)
+        else:
+            candidates = np.empty(0, dtype=np.intp)
+            z = np.empty(0)
+            matched_counts = np.empty(0, dtype=np.intp)
+
+        raw_probabilities = self.sigmoid(z)
+        priors = np.clip(raw_probabilities, 0.05, 0.95)
+        likelihoods = 0.75 + (raw_probabilities * 0.20)
+        confidences = (np.minimum(1.0, matched_counts / 5) * 0.5) + (raw_probabilities * 0.5)
+
+        # Rank candidates (partial sort when only the top k are needed).
+        # Ties are broken by catalog row, matching a stable sort of all diseases.
+        order = np.arange(len(candidates))
+        if top_k is not None and top_k < len(candidates):
+            order = np.argpartition(-raw_probabilities, top_k - 1)[:top_k]
+        order = order[np.lexsort((candidates[order], -raw_probabilities[order]))]
+        scored = [
+            (-raw_probabilities[i], int(candidates[i]), (
+                float(raw_probabilities[i]), float(priors[i]), float(likelihoods[i]),
+                float(confidences[i]), int(matched_counts[i])
+            ))
+            for i in order
+        ]
+
+        candidate_set = set(candidates.tolist())
+        unmatched = (
+            (-self._bias_only_results[row][0], row, self._bias_only_results[row] + (0,))
+            for row in self._bias_only_order if row not in candidate_set
+        )
+
+        ranked = heapq.merge(scored, unmatched, key=lambda item: (item[0], item[1]))
+        if top_k is not None:
+            ranked = islice(ranked, top_k)
+
         predictions = []
-        for disease in self.disease_weights.keys():
-            try:
-                prediction = self.predict_disease_probability(disease, symptoms)
-                predictions.append(prediction)
-            except Exception as e:
-                continue
-        predictions.sort(key=lambda x: x['raw_probability'], reverse=True)
+        for _, row, (raw_probability, prior, likelihood, confidence, symptoms_matched) in ranked:
+            predictions.append({
+                'disease': self.disease_index[row],
+                'raw_probability': raw_probability,
+                'prior_probability': prior,
+                'likelihood': likelihood,
+                'symptoms_matched': symptoms_matched,
+                'total_symptoms': len(symptoms),
+                'confidence_score': confidence
+            })
         return predictions
     
+    def predict_batch(self, diseases: List[str], symptom_sets: List[List[str]], ages=None,
+                      strict: bool = True) -> Dict:
+        """
+        Score many (disease, symptoms, age) records in one vectorized pass.
+
+        Args:
+            diseases: Disease name per record
+            symptom_sets: Symptom key list per record
+            ages: Optional age per record (None entries mean unknown)
+            strict: Raise ValueError on an unknown disease. When False the
+                row is returned with NaN scores and disease_found=False.
+
+        Returns:
+            Dictionary of NumPy arrays (one entry per record) with the same
+            keys as predict_disease_probability, plus 'disease_key' and
+            'disease_found'.
+        """
+        diseases = list(diseases)
+        symptom_sets = [symptoms or [] for symptoms in symptom_sets]
+        if len(symptom_sets) != len(diseases):
+            raise ValueError("diseases and symptom_sets must have the same length")
+        if ages is None:
+            ages = repeat(None, len(diseases))
+
+        n = len(diseases)
+        row_lookup = {disease: i for i, disease in enumerate(self.disease_index)}
+
+        # Resolve each distinct disease name once
+        key_of = {}
+        row_of = {}
+        for disease in set(diseases):
+            key = self._match_disease_key(disease)
+            if key not in row_lookup and strict:
+                raise ValueError(f"Disease '{disease}' (key: {key}) not found in model")
+            key_of[disease] = key
+            row_of[disease] = row_lookup.get(key, -1)
+        disease_rows = np.fromiter(map(row_of.__getitem__, diseases), dtype=np.intp, count=n)
+        found = disease_rows >= 0
+        safe_rows = np.where(found, disease_rows, 0)
+
+        # Sum each patient's weights for their own disease row
+        rows, cols = self._encode_symptom_sets(symptom_sets)
+        weights = self.weight_matrix[safe_rows[rows], cols]
+        z = self.bias_vector[safe_rows] + self._age_adjustments(ages)
+        z = z + np.bincount(rows, weights=weights, minlength=n)
+        matched_counts = np.bincount(rows, weights=(weights != 0).astype(np.float64), minlength=n).astype(np.int64)
+
+        raw_probabilities = self.sigmoid(z)
+        raw_probabilities[~found] = np.nan
+        matched_counts[~found] = 0
+
+        return {
+            'disease': diseases,
+            'disease_key': list(map(key_of.__getitem__, diseases)),
+            'disease_found': found,
+            'raw_probability': raw_probabilities,
+            'prior_probability': np.clip(raw_probabilities, 0.05, 0.95),
+            'likelihood': 0.75 + (raw_probabilities * 0.20),
+            'symptoms_matched': matched_counts,
+            'total_symptoms': np.fromiter(map(len, symptom_sets), dtype=np.int64, count=n),
+            'confidence_score': (np.minimum(1.0, matched_counts / 5) * 0.5) + (raw_probabilities * 0.5)
+        }
+
+    def predict_multiple_batch(self, symptom_sets: List[List[str]], chunk_size: int = 4096) -> Dict:
+        """
+        Full differential diagnosis for many symptom sets at once.
+
+        Args:
+            symptom_sets: One symptom list per patient
+            chunk_size: Patients densified per matrix product, bounding memory
+
+        Returns:
+            Dictionary with 'diseases' (column order) and (patients x diseases)
+            arrays for raw_probability, prior_probability, likelihood,
+            symptoms_matched and confidence_score.
+        """
+        n = len(symptom_sets)
+        num_diseases = len(self.disease_index)
+        z = np.empty((n, num_diseases))
+        matched_counts = np.empty((n, num_diseases))
+
+        for start in range(0, n, chunk_size):
+            chunk = symptom_sets[start:start + chunk_size]
+            rows, cols = self._encode_symptom_sets(chunk)
+            x = np.zeros((len(chunk), len(self.symptom_index)))
+            np.add.at(x, (rows, cols), 1)
+            z[start:start + len(chunk)] = x @ self.weight_matrix.T + self.bias_vector
+            matched_counts[start:start + len(chunk)] = x @ self.symptom_mask.T
+
+        raw_probabilities = self.sigmoid(z)
+        return {
+            'diseases': list(self.disease_index),
+            'raw_probability': raw_probabilities,
+            'prior_probability': np.clip(raw_probabilities, 0.05, 0.95),
+            'likelihood': 0.75 + (raw_probabilities * 0.20),
+            'symptoms_matched': matched_counts.astype(np.int64),
+            'confidence_score': (np.minimum(1.0, matched_counts / 5) * 0.5) + (raw_probabilities * 0.5)
+        }
+
     def get_symptom_importance(self, disease: str) -> Dict[str, float]:
-        disease_key = disease.lower().replace(' ', '_').replace('-', '_')
-        if disease_key not in self.disease_weights:
-             for key in self.disease_weights.keys():
-                if key.replace('_', '') == disease_key.replace('_', ''):
-                    disease_key = key
-                    break
+        disease_key = self._match_disease_key(disease)
                     
         if disease_key not in self.disease_weights:
             raise ValueError(f"Disease '{disease}' not found in model")
@@ -241,4 +805,192 @@ class DiseaseMLModel:
         }
         return dict(sorted(importance.items(), key=lambda x: x[1], reverse=True))
 
-ml_model = DiseaseMLModel()
\ No newline at end of file
+def load_default_model() -> DiseaseMLModel:
+    """Load from DEFAULT_ARTIFACT_PATH when an artifact exists, else the built-in weights."""
+    if os.path.exists(os.path.join(DEFAULT_ARTIFACT_PATH, ARTIFACT_HEADER)):
+        return DiseaseMLModel(artifact_path=DEFAULT_ARTIFACT_PATH)
+    return DiseaseMLModel()
+
+
+class HotReloadingModel:
+    """
+    Serves a DiseaseMLModel and swaps in a new one when the artifact changes.
+
+    Attribute access is delegated to the current model, so each call runs
+    entirely on the model that was current when it started: in-flight
+    requests finish on the old version while new ones get the new version.
+    The replacement is fully built on the watcher thread before a single
+    reference assignment publishes it.
+    """
+
+    def __init__(self, model: DiseaseMLModel = None, artifact_path: str = DEFAULT_ARTIFACT_PATH,
+                 poll_interval: float = 5.0, loader=None):
+        """
+        Args:
+            model: Model to serve until a newer artifact is found. When None,
+                the model is built by loader on first use, keeping numpy work
+                and artifact reads out of application startup.
+            artifact_path: Artifact directory to watch
+            poll_interval: Seconds between artifact checks
+            loader: Zero-argument callable building the model (default load_default_model)
+        """
+        self._model = model
+        self._loader = loader or load_default_model
+        self.artifact_path = artifact_path
+        self.poll_interval = poll_interval
+        self.loaded_at = datetime.utcnow() if model is not None else None
+        self.reload_count = 0
+        self.last_error = None
+
+        self._signature = self._artifact_signature() if model is not None else None
+        self._load_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def __getattr__(self, name):
+        return getattr(self.current, name)
+
+    @property
+    def current(self) -> DiseaseMLModel:
+        """The model serving new requests. Hold on to it for multi-step work."""
+        model = self._model
+        if model is None:
+            model = self._load()
+        return model
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the model has been built yet."""
+        return self._model is not None
+
+    def _load(self) -> DiseaseMLModel:
+        """Build the model on first use; concurrent first callers wait for one build."""
+        with self._load_lock:
+            if self._model is None:
+                signature = self._artifact_signature()
+                with startup_timer.first_use('backend.models.ml_model:model'):
+                    self._model = self._loader()
+                self._signature = signature
+                self.loaded_at = datetime.utcnow()
+            return self._model
+
+    def _artifact_signature(self):
+        """(mtime, size) of the artifact header, or None when absent."""
+        try:
+            stat = os.stat(os.path.join(self.artifact_path, ARTIFACT_HEADER))
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def check_for_update(self) -> bool:
+        """
+        Reload the artifact if its header changed since the last load.
+
+        A failed load keeps the current model and records last_error.
+
+        Returns:
+            True when a new model was swapped in
+        """
+        if self._model is None:
+            # Not built yet; the first use will read the latest artifact
+            return False
+
+        with self._reload_lock:
+            signature = self._artifact_signature()
+            if signature is None or signature == self._signature:
+                return False
+
+            try:
+                model = DiseaseMLModel(
+                    table_mode=self._model.table_mode,
+                    cache_size=self._model.prediction_cache.maxsize,
+                    artifact_path=self.artifact_path
+                )
+            except Exception as e:
+                self.last_error = str(e)
+                get_logger().error(
+                    f"Model reload failed, keeping version {self._model.version}: {e}",
+                    model_version=self._model.version
+                )
+                return False
+
+            previous_version = self._model.version
+            self._model = model
+            self._signature = signature
+            self.loaded_at = datetime.utcnow()
+            self.reload_count += 1
+            self.last_error = None
+            get_logger().info(
+                f"Model reloaded: {previous_version} -> {model.version}",
+                previous_version=previous_version, model_version=model.version
+            )
+            return True
+
+    def update_weights(self, disease_weights: Dict) -> DiseaseMLModel:
+        """
+        Serve new weights: a model is built from them, then swapped in.
+
+        Args:
+            disease_weights: Mapping of disease key -> {'symptoms': {...}, 'bias': float}
+
+        Returns:
+            The new model
+        """
+        with self._reload_lock:
+            current = self.current
+            model = DiseaseMLModel(
+                table_mode=current.table_mode,
+                cache_size=current.prediction_cache.maxsize,
+                disease_weights=disease_weights
+            )
+            self._model = model
+            self.loaded_at = datetime.utcnow()
+            self.reload_count += 1
+            return model
+
+    def start_watching(self):
+        """Start the background thread polling the artifact (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch, name='model-reloader', daemon=True)
+        self._thread.start()
+
+    def stop_watching(self):
+        """Stop the background thread."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop_event.wait(self.poll_interval):
+            self.check_for_update()
+
+    def get_info(self) -> Dict:
+        """Version and reload status of the served model."""
+        model = self.current
+        return {
+            'version': model.version,
+            'diseases': len(model.disease_index),
+            'symptoms': len(model.symptom_index),
+            'artifact_path': self.artifact_path,
+            'loaded_from_artifact': self._signature is not None,
+            'loaded_at': self.loaded_at.isoformat() if self.loaded_at else None,
+            'reload_count': self.reload_count,
+            'watching': self._thread is not None and self._thread.is_alive(),
+            'last_error': self.last_error
+        }
+
+
+# Built on first use so importing the routes stays cheap
+ml_model = HotReloadingModel()
+
+
+if __name__ == "__main__":
+    # Export the built-in weights: python -m backend.models.ml_model [path]
+    import sys
+    export_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_ARTIFACT_PATH
+    DiseaseMLModel().export_artifact(export_path)
+    print(f"Model artifact written to {export_path}")
\ No newline at end of file
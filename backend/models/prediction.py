@@ -4,7 +4,10 @@ Stores all disease predictions for dashboard analytics.
 """
 
 from backend import db
+from collections import Counter
 from datetime import datetime
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
 import json
 
 
@@ -33,6 +36,9 @@ class PredictionHistory(db.Model):
     # Risk assessment
     risk_level = db.Column(db.String(20), nullable=False, index=True)  # low, medium, high, critical
     
+    # Version id of the model weights that produced the prediction
+    model_version = db.Column(db.String(64), nullable=True)
+    
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     
@@ -63,5 +69,139 @@ class PredictionHistory(db.Model):
             'bayesian_posterior': self.bayesian_posterior,
             'risk_level': self.risk_level,
             'patient_age': self.patient_age,
+            'model_version': self.model_version,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+
+
+class PredictionRollup(db.Model):
+    """
+    Prediction counts per (day, disease, risk_level) for the doctor dashboard.
+    Kept in step with PredictionHistory inside the same transaction as each
+    ORM insert, update or delete, so the dashboard never scans the history table.
+    Bulk inserts must call add_rows_to_rollup() in their transaction; other
+    bulk SQL writes bypass it, so run rebuild_prediction_rollup() afterwards.
+    """
+    __tablename__ = 'prediction_rollup'
+    
+    day = db.Column(db.Date, primary_key=True)
+    disease = db.Column(db.String(100), primary_key=True)
+    risk_level = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"PredictionRollup('{self.day}', '{self.disease}', risk='{self.risk_level}', count={self.count})"
+
+
+def _apply_rollup_deltas(connection, deltas):
+    """
+    Add count deltas to rollup rows, creating rows as needed.
+    
+    Args:
+        connection: Connection of the flushing session's transaction
+        deltas: Counter of (day, disease, risk_level) -> count change
+    """
+    table = PredictionRollup.__table__
+    dialect = connection.dialect.name
+    
+    for (day, disease, risk_level), delta in deltas.items():
+        if delta == 0:
+            continue
+        
+        if delta > 0 and dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(table).values(day=day, disease=disease, risk_level=risk_level, count=delta)
+            connection.execute(stmt.on_conflict_do_update(
+                index_elements=[table.c.day, table.c.disease, table.c.risk_level],
+                set_={'count': table.c.count + stmt.excluded.count}
+            ))
+            continue
+        
+        updated = connection.execute(
+            table.update()
+            .where(table.c.day == day, table.c.disease == disease, table.c.risk_level == risk_level)
+            .values(count=table.c.count + delta)
+        ).rowcount
+        if not updated and delta > 0:
+            connection.execute(table.insert().values(
+                day=day, disease=disease, risk_level=risk_level, count=delta
+            ))
+
+
+def add_rows_to_rollup(connection, rows):
+    """
+    Count bulk-inserted PredictionHistory rows in the rollup table.
+    
+    Args:
+        connection: Connection of the inserting transaction
+        rows: Inserted column dictionaries (created_at, disease and risk_level set)
+    """
+    _apply_rollup_deltas(connection, Counter(
+        (row['created_at'].date(), row['disease'], row['risk_level']) for row in rows
+    ))
+
+
+# Columns that decide which rollup row a prediction is counted in
+_ROLLUP_KEY_COLUMNS = ('created_at', 'disease', 'risk_level')
+
+
+@event.listens_for(Session, 'before_flush')
+def _update_prediction_rollup(session, flush_context, instances):
+    """Fold pending PredictionHistory inserts, updates and deletes into the rollup table."""
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, PredictionHistory):
+            # Fix the timestamp now so the rollup day matches the stored row
+            if obj.created_at is None:
+                obj.created_at = datetime.utcnow()
+            deltas[(obj.created_at.date(), obj.disease, obj.risk_level)] += 1
+    for obj in session.deleted:
+        if isinstance(obj, PredictionHistory) and obj.created_at is not None:
+            deltas[(obj.created_at.date(), obj.disease, obj.risk_level)] -= 1
+    for obj in session.dirty:
+        if not isinstance(obj, PredictionHistory):
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[name].history.has_changes() for name in _ROLLUP_KEY_COLUMNS):
+            continue
+        # The row still holds the old key until this flush writes it; attribute
+        # history can miss it when the attribute was not loaded before the change
+        old = session.connection().execute(
+            select(PredictionHistory.created_at, PredictionHistory.disease, PredictionHistory.risk_level)
+            .where(PredictionHistory.id == obj.id)
+        ).first()
+        if old is not None:
+            deltas[(old.created_at.date(), old.disease, old.risk_level)] -= 1
+            deltas[(obj.created_at.date(), obj.disease, obj.risk_level)] += 1
+    
+    if deltas:
+        _apply_rollup_deltas(session.connection(), deltas)
+
+
+def rebuild_prediction_rollup():
+    """
+    Rebuild the rollup table from PredictionHistory in one transaction.
+    
+    Returns:
+        Number of rollup rows written
+    """
+    table = PredictionRollup.__table__
+    day = func.date(PredictionHistory.created_at)
+    aggregate = db.select(
+        day, PredictionHistory.disease, PredictionHistory.risk_level, func.count(PredictionHistory.id)
+    ).group_by(day, PredictionHistory.disease, PredictionHistory.risk_level)
+    
+    try:
+        db.session.execute(table.delete())
+        db.session.execute(table.insert().from_select(
+            ['day', 'disease', 'risk_level', 'count'], aggregate
+        ))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    return db.session.query(func.count()).select_from(table).scalar()
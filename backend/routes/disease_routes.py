@@ -1,40 +1,48 @@
-from flask import Blueprint, request, jsonify, render_template, send_file
+from flask import Blueprint, request, jsonify, render_template, send_file, Response
 from datetime import datetime
-import csv
-import os
 import io
-#pdf generation imports
-from reportlab.lib.pagesizes import letter  
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-
-from backend.utils.calculator import bayesian_survival
-from backend.utils.gemini_helper import generate_recommendations
+
+# reportlab (through pdf_reports) and the Gemini SDK are imported on first
+# use so they do not slow down application startup
+from backend.utils.disease_catalog import disease_catalog
+from backend.utils.startup import startup_timer
+from backend.utils.pdf_reports import REPORT_LAYOUT_VERSION, render_possibility_report, render_ml_report
+from backend.utils.report_cache import pdf_report_cache, report_key
+from backend.utils.render_pool import pdf_render_pool, RenderPoolBusy, RenderTimeout
+from backend.utils.metrics import metrics
 from backend.models.ml_model import ml_model
 
 disease_bp = Blueprint("disease", __name__)
 
-def get_project_root():
-    """Helper function to get the project root directory"""
-    # Go up from backend/routes/ to project root
-    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _collect_report_cache_metrics():
+    """PDF report cache counters for /metrics"""
+    stats = pdf_report_cache.stats()
+    yield 'cache_hits_total', 'counter', 'Cache hits', {'cache': 'pdf_report'}, stats['hits'] + stats['disk_hits']
+    yield 'cache_misses_total', 'counter', 'Cache misses', {'cache': 'pdf_report'}, stats['misses']
+    yield 'cache_entries', 'gauge', 'Entries currently cached', {'cache': 'pdf_report'}, stats['entries']
+
+
+def _collect_render_pool_metrics():
+    """PDF render pool queue depth and render times for /metrics"""
+    stats = pdf_render_pool.get_stats()
+    yield 'pdf_render_queue_depth', 'gauge', 'Render jobs waiting for a worker process', {}, stats['queued']
+    yield 'pdf_render_jobs_in_progress', 'gauge', 'Render jobs accepted and not finished', {}, stats['pending']
+    yield 'pdf_render_rejected_total', 'counter', 'Render jobs refused because the queue was full', {}, stats['rejected']
+    yield 'pdf_render_timeouts_total', 'counter', 'Render jobs that exceeded the timeout', {}, stats['timeouts']
+    yield ('pdf_render_interrupted_total', 'counter', 'Render jobs lost when a timeout restarted the pool', {},
+           stats['interrupted'])
+    yield ('pdf_render_duration_seconds', 'histogram', 'Time spent rendering a PDF in the worker', {},
+           pdf_render_pool.render_histogram())
+
+
+metrics.register_collector(_collect_report_cache_metrics)
+metrics.register_collector(_collect_render_pool_metrics)
+
 
 def load_diseases():
-    """Helper function to load diseases from CSV"""
-    csv_path = os.path.join(get_project_root(), "hospital_data.csv")
-    diseases = []
-    try:
-        with open(csv_path, newline="", encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            diseases = [row["Disease"] for row in reader]
-        print(f"Loaded {len(diseases)} diseases from CSV")
-    except FileNotFoundError:
-        print(f"Error: hospital_data.csv not found at {csv_path}")
-    except Exception as e:
-        print(f"Error loading diseases: {e}")
-    return diseases
+    """Helper function to get the disease names from the cached CSV catalog"""
+    return disease_catalog.names()
 
 @disease_bp.route("/")
 def home():
@@ -61,33 +69,13 @@ def preset():
     if not disease_name:
         return jsonify({"error": "Disease name is required"}), 400
     
-    try:
-        csv_path = os.path.join(get_project_root(), "hospital_data.csv")
-        
-        with open(csv_path, newline="", encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if row["Disease"].lower() == disease_name.lower():
-                    p_d = float(row["Prevalence"])
-                    sensitivity = float(row["Sensitivity"])
-                    false_pos = float(row["FalsePositive"])
-
-                    # Bayes' Theorem calculation (using utility)
-                    p_d_given_pos = bayesian_survival(p_d, sensitivity, false_pos)
-
-                    return jsonify({
-                        "p_d_given_pos": round(p_d_given_pos, 4),
-                        "prior": p_d,
-                        "sensitivity": sensitivity,
-                        "falsePositive": false_pos
-                    })
-
-        return jsonify({"error": "Disease not found"}), 404
-
-    except FileNotFoundError:
+    preset_values = disease_catalog.get(disease_name)
+    if preset_values is not None:
+        return jsonify(preset_values)
+
+    if not disease_catalog.available:
         return jsonify({"error": "Hospital data file not found"}), 500
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return jsonify({"error": "Disease not found"}), 404
 
 
 @disease_bp.route("/disease", methods=["POST"])
@@ -144,6 +132,9 @@ def gemini_recommendations():
     """
     data = request.json
     try:
+        with startup_timer.first_use('backend.utils.gemini_helper'):
+            from backend.utils.gemini_helper import generate_recommendations
+
         disease_name = data.get("disease_name")  # Optional, can be None
         prior_probability = float(data.get("prior_probability"))
         posterior_probability = float(data.get("posterior_probability"))
@@ -174,6 +165,37 @@ def gemini_recommendations():
             "recommendations": "Unable to generate recommendations. Please try again later."
         }), 500
 
+def _pdf_response(content, etag, download_name, cached):
+    """Send a PDF with its (weak) ETag, or 304 Not Modified if the client already has it."""
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = send_file(
+            io.BytesIO(content),
+            mimetype="application/pdf",
+            as_attachment=True,
+            download_name=download_name,
+            etag=False
+        )
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.headers["X-Report-Cache"] = "hit" if cached else "miss"
+    return response
+
+
+def _render_unavailable_response(error):
+    """503 with Retry-After when the render queue is full, 504 when rendering timed out."""
+    if isinstance(error, RenderPoolBusy):
+        response = jsonify({
+            "error": "Report rendering is busy. Please retry shortly.",
+            "retry_after": error.retry_after
+        })
+        response.status_code = 503
+        response.headers["Retry-After"] = str(error.retry_after)
+        return response
+    return jsonify({"error": "Report rendering timed out. Please try again."}), 504
+
+
 #PDF generation route
 @disease_bp.route("/download-results", methods=["POST"])
 def download_results():
@@ -182,105 +204,25 @@ def download_results():
 
     try:
         # Extract calculation data
-        prior = float(data.get("prior_probability", 0))
-        posterior = float(data.get("posterior_probability", 0))
-        disease_name = data.get("disease_name", "Custom Disease")
-        test_result = str(data.get("test_result", "positive")).capitalize()
-        sensitivity = float(data.get("sensitivity", 0))
-        false_positive = float(data.get("false_positive", 0))
-
-        # Create PDF
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=letter,
-            topMargin=0.5 * inch,
-            bottomMargin=0.5 * inch
-        )
-
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            "TitleStyle",
-            parent=styles["Heading1"],
-            fontSize=24,
-            textColor=colors.HexColor("#1f77b4"),
-            alignment=1,
-            spaceAfter=20,
-        )
-
-        story = []
-
-        # Title
-        story.append(Paragraph("Possibility Report", title_style))
-        story.append(Spacer(1, 0.3 * inch))
-
-        # Timestamp
-        story.append(
-            Paragraph(
-                f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-                styles["Normal"],
-            )
+        fields = {
+            "disease_name": str(data.get("disease_name", "Custom Disease")),
+            "prior": float(data.get("prior_probability", 0)),
+            "posterior": float(data.get("posterior_probability", 0)),
+            "test_result": str(data.get("test_result", "positive")).capitalize(),
+            "sensitivity": float(data.get("sensitivity", 0)),
+            "false_positive": float(data.get("false_positive", 0)),
+        }
+
+        # Repeat downloads of the same result are served from the cache
+        content, etag, cached = pdf_report_cache.get_or_render(
+            report_key("possibility", fields, REPORT_LAYOUT_VERSION),
+            lambda: pdf_render_pool.render(render_possibility_report, fields)
         )
-        story.append(Spacer(1, 0.2 * inch))
-
-        # Results table
-        table_data = [
-            ["Parameter", "Value"],
-            ["Disease Name", disease_name],
-            ["Prior Probability", f"{prior:.4f}"],
-            ["Posterior Probability", f"{posterior:.4f}"],
-            ["Test Result", test_result],
-            ["Sensitivity", f"{sensitivity:.4f}"],
-            ["False Positive Rate", f"{false_positive:.4f}"],
-        ]
-
-        table = Table(table_data, colWidths=[3 * inch, 3 * inch])
-        table.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1f77b4")),
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                    ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                    ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-                ]
-            )
-        )
-
-        story.append(table)
-        story.append(Spacer(1, 0.3 * inch))
-
-        # Risk assessment
-        risk_level = (
-            "High Risk" if posterior > 0.7 else
-            "Moderate Risk" if posterior > 0.3 else
-            "Low Risk"
-        )
-
-        story.append(
-            Paragraph(f"<b>Risk Assessment:</b> {risk_level}", styles["Normal"])
-        )
-        story.append(Spacer(1, 0.2 * inch))
-
-        # Disclaimer
-        story.append(
-            Paragraph(
-                "<i>This report is for educational purposes only. "
-                "Consult healthcare professionals for medical advice.</i>",
-                styles["Normal"],
-            )
-        )
-        doc.title = "Possibility Report"
-        doc.build(story)  #  browser tab title / filename
-        buffer.seek(0)
         #dowload pdf name
-        return send_file(
-            buffer,
-            mimetype="application/pdf",
-            as_attachment=True,
-            download_name="Possibility_Report.pdf"
-        )
+        return _pdf_response(content, etag, "Possibility_Report.pdf", cached)
+
+    except (RenderPoolBusy, RenderTimeout) as e:
+        return _render_unavailable_response(e)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -292,85 +234,25 @@ def download_ml_results():
     data = request.json
     
     try:
-        disease_name = data.get("disease_name", "Unknown Disease")
-        ml_probability = float(data.get("ml_probability", 0))
-        prior_probability = float(data.get("prior_probability", 0))
-        likelihood = float(data.get("likelihood", 0))
-        posterior_probability = float(data.get("posterior_probability", 0))
-        risk_level = data.get("risk_level", "Low Risk")
+        fields = {
+            "disease_name": str(data.get("disease_name", "Unknown Disease")),
+            "ml_probability": float(data.get("ml_probability", 0)),
+            "prior_probability": float(data.get("prior_probability", 0)),
+            "likelihood": float(data.get("likelihood", 0)),
+            "posterior_probability": float(data.get("posterior_probability", 0)),
+            "risk_level": str(data.get("risk_level", "Low Risk")),
+        }
         
-        # Create PDF
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#1f77b4'),
-            spaceAfter=12,
-            alignment=1
+        content, etag, cached = pdf_report_cache.get_or_render(
+            report_key("ml", fields, REPORT_LAYOUT_VERSION),
+            lambda: pdf_render_pool.render(render_ml_report, fields)
         )
         
-        story = []
-        story.append(Paragraph("ML Disease Prediction Report\n(Bayesian Analysis)", title_style))
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Add timestamp
-        timestamp_text = f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        story.append(Paragraph(timestamp_text, styles['Normal']))
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Disease and ML Prediction
-        story.append(Paragraph(f"<b>Disease:</b> {disease_name}", styles['Normal']))
-        story.append(Spacer(1, 0.1*inch))
-        story.append(Paragraph(f"<b>ML Prediction Probability:</b> {ml_probability:.2%}", styles['Normal']))
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Create Bayesian Analysis table
-        data_table = [
-            ['Bayesian Analysis', 'Value'],
-            ['Prior Probability', f"{prior_probability:.4f}"],
-            ['Likelihood', f"{likelihood:.4f}"],
-            ['Posterior Probability', f"{posterior_probability:.4f}"],
-            ['Risk Assessment', risk_level]
-        ]
-        
-        table = Table(data_table, colWidths=[2.5*inch, 2.5*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f77b4')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f0f0')]),
-        ]))
-        
-        story.append(table)
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Add risk color coding
-        risk_color = "#27ae60" if risk_level == "Low Risk" else ("#f39c12" if risk_level == "Moderate Risk" else "#e74c3c")
-        story.append(Paragraph(f"<font color='{risk_color}'><b>Risk Level: {risk_level}</b></font>", styles['Normal']))
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Add disclaimer
-        disclaimer = "<i>Note: This report is for educational purposes only. Always consult with healthcare professionals for medical advice.</i>"
-        story.append(Paragraph(disclaimer, styles['Normal']))
-        
-        doc.build(story)
-        buffer.seek(0)
-        
         filename = f"ml_prediction_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        return send_file(
-            buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=filename
-        )
+        return _pdf_response(content, etag, filename, cached)
     
+    except (RenderPoolBusy, RenderTimeout) as e:
+        return _render_unavailable_response(e)
+
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -3,11 +3,25 @@ Doctor Dashboard Routes
 Provides API endpoints for doctor-facing dashboard with patient overview and risk summary.
 """
 
-from flask import Blueprint, jsonify, render_template
+from flask import Blueprint, jsonify, render_template, request, Response, stream_with_context, current_app
+from flask_login import login_required, current_user
 from datetime import datetime, timedelta
+from functools import wraps
+import time
 from sqlalchemy import func
 from backend import db
-from backend.models.prediction import PredictionHistory
+from backend.models.prediction import PredictionHistory, PredictionRollup
+from backend.utils.batch_export import iter_prediction_pdf, iter_prediction_zip
+from backend.utils.pdf_reports import render_prediction_report
+from backend.utils.render_pool import pdf_render_pool, RenderPoolBusy
+
+RISK_LEVELS = ('low', 'medium', 'high', 'critical')
+
+# Rows fetched from the database per round trip during an export
+EXPORT_CHUNK_SIZE = 500
+
+# Seconds a ZIP export waits for a free render slot before giving up
+EXPORT_RENDER_WAIT = 30
 
 doctor_bp = Blueprint(
     'doctor',
@@ -24,20 +38,28 @@ def get_real_dashboard_data():
         dict: Dashboard metrics and risk distribution data from database
     """
     try:
+        # All counts come from the (day, disease, risk_level) rollup rather
+        # than scanning prediction_history
         # Total predictions (as proxy for patients)
-        total_patients = db.session.query(func.count(PredictionHistory.id)).scalar() or 0
+        total_patients = db.session.query(func.sum(PredictionRollup.count)).scalar() or 0
         
-        # New cases in last 7 days
+        # New cases in last 7 days: whole days after the cutoff day from the
+        # rollup, plus the cutoff day's tail from an indexed range on history
         seven_days_ago = datetime.utcnow() - timedelta(days=7)
-        new_cases = db.session.query(func.count(PredictionHistory.id)).filter(
-            PredictionHistory.created_at >= seven_days_ago
-        ).scalar() or 0
+        cutoff_day = seven_days_ago.date()
+        next_day = datetime.combine(cutoff_day + timedelta(days=1), datetime.min.time())
+        new_cases = (db.session.query(func.sum(PredictionRollup.count)).filter(
+            PredictionRollup.day > cutoff_day
+        ).scalar() or 0) + (db.session.query(func.count(PredictionHistory.id)).filter(
+            PredictionHistory.created_at >= seven_days_ago,
+            PredictionHistory.created_at < next_day
+        ).scalar() or 0)
         
         # Risk distribution counts
         risk_counts = db.session.query(
-            PredictionHistory.risk_level,
-            func.count(PredictionHistory.id)
-        ).group_by(PredictionHistory.risk_level).all()
+            PredictionRollup.risk_level,
+            func.sum(PredictionRollup.count)
+        ).group_by(PredictionRollup.risk_level).all()
         
         # Initialize counts
         low_risk_count = 0
@@ -178,3 +200,150 @@ def get_dashboard_data():
             'error': str(e),
             'message': 'Failed to fetch dashboard data'
         }), 500
+
+
+def _parse_export_filters(args):
+    """
+    Read the export filters from the query string.
+    
+    Raises:
+        ValueError: If a date, risk level or format is invalid
+    """
+    filters = {'format': args.get('format', 'pdf').lower()}
+    if filters['format'] not in ('pdf', 'zip'):
+        raise ValueError("format must be 'pdf' or 'zip'")
+    
+    for name in ('start', 'end'):
+        value = args.get(name)
+        try:
+            filters[name] = datetime.strptime(value, '%Y-%m-%d').date() if value else None
+        except ValueError:
+            raise ValueError(f"{name} must be a date in YYYY-MM-DD format")
+    if filters['start'] and filters['end'] and filters['start'] > filters['end']:
+        raise ValueError("start must not be after end")
+    
+    filters['risk_levels'] = [level.strip().lower() for level in args.get('risk_level', '').split(',') if level.strip()]
+    unknown = [level for level in filters['risk_levels'] if level not in RISK_LEVELS]
+    if unknown:
+        raise ValueError(f"Unknown risk level: {', '.join(unknown)}")
+    
+    filters['diseases'] = [disease.strip() for disease in args.get('disease', '').split(',') if disease.strip()]
+    return filters
+
+
+def _describe_export_filters(filters):
+    """One-line summary of the filters for the report heading."""
+    parts = [
+        f"From {filters['start'] or 'the beginning'} to {filters['end'] or 'today'}",
+        f"Risk: {', '.join(filters['risk_levels']) or 'all'}",
+        f"Disease: {', '.join(filters['diseases']) or 'all'}",
+    ]
+    return ' | '.join(parts)
+
+
+def _export_rows(filters):
+    """
+    Matching predictions, oldest first, fetched EXPORT_CHUNK_SIZE rows at a
+    time. Only the report columns are selected, so no ORM objects are built.
+    """
+    query = db.session.query(
+        PredictionHistory.id,
+        PredictionHistory.created_at,
+        PredictionHistory.disease,
+        PredictionHistory.patient_age,
+        PredictionHistory.symptoms,
+        PredictionHistory.ml_probability,
+        PredictionHistory.bayesian_posterior,
+        PredictionHistory.risk_level,
+        PredictionHistory.model_version
+    )
+    if filters['start']:
+        query = query.filter(PredictionHistory.created_at >= datetime.combine(filters['start'], datetime.min.time()))
+    if filters['end']:
+        end = datetime.combine(filters['end'] + timedelta(days=1), datetime.min.time())
+        query = query.filter(PredictionHistory.created_at < end)
+    if filters['risk_levels']:
+        query = query.filter(PredictionHistory.risk_level.in_(filters['risk_levels']))
+    if filters['diseases']:
+        query = query.filter(PredictionHistory.disease.in_(filters['diseases']))
+    
+    return query.order_by(PredictionHistory.created_at, PredictionHistory.id).yield_per(EXPORT_CHUNK_SIZE)
+
+
+def _render_patient_report(fields):
+    """
+    Render one patient's PDF on the shared render pool.
+    
+    An export submits one report at a time, so it holds at most one pool
+    slot. When the pool is full it backs off and retries for up to
+    EXPORT_RENDER_WAIT seconds rather than rendering on the web worker;
+    after that RenderPoolBusy ends the export with an error entry.
+    """
+    deadline = time.monotonic() + EXPORT_RENDER_WAIT
+    delay = 0.05
+    while True:
+        try:
+            return pdf_render_pool.render(render_prediction_report, fields)
+        except RenderPoolBusy as e:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise
+            time.sleep(min(delay, e.retry_after, remaining))
+            delay *= 2
+
+
+def doctor_required(view):
+    """
+    Require a signed-in user whose email is listed in DOCTOR_EMAILS.
+    Anonymous users are sent to the login page; other users get 403.
+    """
+    @wraps(view)
+    @login_required
+    def wrapper(*args, **kwargs):
+        if current_user.email.lower() not in current_app.config['DOCTOR_EMAILS']:
+            return jsonify({
+                'success': False,
+                'error': 'Doctor access required',
+                'message': 'Your account is not authorized to export patient data'
+            }), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@doctor_bp.route('/api/doctor/export', methods=['GET'])
+@doctor_required
+def export_predictions():
+    """
+    Stream a multi-patient report of stored predictions.
+    
+    Rows are read in chunks and the file is sent while it is being built,
+    so memory does not grow with the number of patients.
+    
+    Query parameters:
+        format: 'pdf' (one table report, default) or 'zip' (one PDF per prediction)
+        start, end: Inclusive date range on created_at (YYYY-MM-DD)
+        risk_level: Comma-separated risk levels (low, medium, high, critical)
+        disease: Comma-separated disease names
+    """
+    try:
+        filters = _parse_export_filters(request.args)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Invalid export filters'
+        }), 400
+    
+    rows = _export_rows(filters)
+    stamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    if filters['format'] == 'zip':
+        body = iter_prediction_zip(rows, _render_patient_report)
+        mimetype = 'application/zip'
+    else:
+        body = iter_prediction_pdf(rows, _describe_export_filters(filters))
+        mimetype = 'application/pdf'
+    
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f"attachment; filename=prediction_export_{stamp}.{filters['format']}"
+    response.headers['Cache-Control'] = 'no-store'
+    return response
@@ -1,4 +1,7 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, jsonify, current_app, Response, request, send_file
+from backend.utils.startup import startup_timer
+from backend.utils.metrics import metrics
+from backend.middleware.profiler import request_profiler
 
 general_bp = Blueprint(
     'general',
@@ -25,4 +28,44 @@ def terms():
 
 @general_bp.route('/connect')
 def connect():
-    return render_template('connect.html')
\ No newline at end of file
+    return render_template('connect.html')
+
+
+@general_bp.route('/api/startup-timing')
+def startup_timing():
+    """Per-module startup and first-use load times, for tracking cold-start regressions"""
+    from backend.models.ml_model import ml_model
+    return jsonify({
+        'success': True,
+        'lazy_init': current_app.config.get('LAZY_INIT', False),
+        'model_loaded': ml_model.is_loaded,
+        **startup_timer.get_report()
+    }), 200
+
+
+@general_bp.route('/metrics')
+def prometheus_metrics():
+    """Request latency histograms, counters and gauges in Prometheus text format"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@general_bp.route('/admin/profiles')
+def list_profiles():
+    """List stored request profiles (requires X-Profiler-Token)"""
+    if not request_profiler.is_authorized(request):
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify({
+        'success': True,
+        'profiles': request_profiler.list_reports()
+    }), 200
+
+
+@general_bp.route('/admin/profiles/<name>')
+def download_profile(name):
+    """Download one profile report (.pstats or .collapsed)"""
+    if not request_profiler.is_authorized(request):
+        return jsonify({'error': 'Unauthorized'}), 403
+    path = request_profiler.report_path(name)
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(path, as_attachment=True, download_name=name)
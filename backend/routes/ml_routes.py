@@ -1,13 +1,54 @@
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, render_template, request, jsonify, Response, stream_with_context, current_app
 from backend.models.ml_model import ml_model
 from backend.utils.calculator import BayesCalculator
-from backend.models.prediction import PredictionHistory
-from backend import db
+from backend.utils.cache import LRUCache
+from backend.middleware.security import rate_limiter, rate_limit_exceeded_response
+from backend.utils.write_behind import prediction_writer
+from backend.utils.metrics import metrics
+from backend.utils.server_timing import server_timing
 import json
-import traceback
 
 ml_bp = Blueprint('ml', __name__)
 
+# Bayes step results keyed on (prior, likelihood, false_positive_rate).
+# The inputs come from the model's canonical prediction cache, so equal
+# (disease, symptom set, age bucket) requests share an entry; the result is
+# a pure function of the key and never needs invalidating.
+posterior_cache = LRUCache(maxsize=4096)
+
+# Risk level labels stored in PredictionHistory
+RISK_LEVEL_STORAGE = {'Low': 'low', 'Moderate': 'medium', 'High': 'high', 'Critical': 'critical'}
+
+# Batch prediction limits: items per request, and items scored (and
+# streamed back) per vectorized step
+MAX_BATCH_ITEMS = 500
+BATCH_CHUNK_SIZE = 50
+
+
+def _collect_cache_and_writer_metrics():
+    """Cache counters and write-behind queue depth for /metrics"""
+    caches = {'posterior': posterior_cache}
+    # Do not load the model just to report on its cache
+    if ml_model.is_loaded:
+        caches['prediction'] = ml_model.prediction_cache
+    for name, cache in caches.items():
+        stats = cache.stats()
+        yield 'cache_hits_total', 'counter', 'Cache hits', {'cache': name}, stats['hits']
+        yield 'cache_misses_total', 'counter', 'Cache misses', {'cache': name}, stats['misses']
+        yield 'cache_entries', 'gauge', 'Entries currently cached', {'cache': name}, stats['size']
+
+    writer = prediction_writer.get_stats()
+    yield 'prediction_write_queue_depth', 'gauge', 'Predictions waiting to be written', {}, writer['queued']
+    yield 'prediction_write_queue_capacity', 'gauge', 'Write-behind queue capacity', {}, writer['max_queue']
+    for result in ('flushed', 'failed'):
+        yield 'prediction_writes_total', 'counter', 'Prediction rows by write outcome', {'result': result}, writer[result]
+    yield ('prediction_write_overflow_total', 'counter',
+           'Prediction rows written by the request because the queue was full', {}, writer['overflow'])
+
+
+metrics.register_collector(_collect_cache_and_writer_metrics)
+
+
 @ml_bp.route('/ml-prediction')
 def ml_prediction_page():
     """Render the ML prediction page"""
@@ -41,7 +82,8 @@ def predict_disease():
     }
     """
     try:
-        data = request.get_json()
+        with server_timing.span('parse'):
+            data = request.get_json()
         
         if not data:
             return jsonify({'error': 'No data provided'}), 400
@@ -67,61 +109,65 @@ def predict_disease():
         if not symptoms or len(symptoms) == 0:
             return jsonify({'error': 'No symptoms provided'}), 400
         
+        # Pin one model version for the whole request (weights may hot-reload)
+        model = ml_model.current
+        
         # Get ML prediction
-        ml_prediction = ml_model.predict_disease_probability(disease, symptoms, age=age)
+        with server_timing.span('model'):
+            ml_prediction = model.predict_disease_probability(disease, symptoms, age=age)
         
         # Calculate Bayesian probabilities
-        calculator = BayesCalculator()
-        bayesian_result = calculator.calculate_posterior(
-            prior=ml_prediction['prior_probability'],
-            likelihood=ml_prediction['likelihood'],
-            false_positive_rate=0.05
-        )
-        
-        # Determine risk level for storage
-        risk_assessment = get_risk_level(bayesian_result['posterior'] * 100)
-        risk_level_map = {'Low': 'low', 'Moderate': 'medium', 'High': 'high', 'Critical': 'critical'}
-        risk_level_db = risk_level_map.get(risk_assessment['level'], 'medium')
+        with server_timing.span('bayes'):
+            posterior_key = (ml_prediction['prior_probability'], ml_prediction['likelihood'], 0.05)
+            bayesian_result = posterior_cache.get(posterior_key)
+            if bayesian_result is None:
+                calculator = BayesCalculator()
+                bayesian_result = calculator.calculate_posterior(
+                    prior=ml_prediction['prior_probability'],
+                    likelihood=ml_prediction['likelihood'],
+                    false_positive_rate=0.05
+                )
+                posterior_cache.put(posterior_key, bayesian_result)
+            
+            # Determine risk level for storage
+            risk_assessment = get_risk_level(bayesian_result['posterior'] * 100)
+            risk_level_db = RISK_LEVEL_STORAGE.get(risk_assessment['level'], 'medium')
         
-        # Save prediction to database
-        try:
-            prediction_record = PredictionHistory(
-                disease=disease,
-                symptoms=json.dumps(symptoms),
-                patient_age=age,
-                ml_probability=ml_prediction['raw_probability'],
-                bayesian_posterior=bayesian_result['posterior'],
-                confidence_score=ml_prediction['confidence_score'],
-                risk_level=risk_level_db
-            )
-            db.session.add(prediction_record)
-            db.session.commit()
-            print(f"✅ Prediction saved: disease={disease}, risk_level={risk_level_db}")
-        except Exception as db_error:
-            # Log error but don't fail the prediction
-            print(f"⚠️ Failed to save prediction to database: {db_error}")
-            traceback.print_exc()
-            db.session.rollback()
+        # Save prediction to database (off the request path)
+        with server_timing.span('db'):
+            save_predictions([{
+                'disease': disease,
+                'symptoms': json.dumps(symptoms),
+                'patient_age': age,
+                'ml_probability': ml_prediction['raw_probability'],
+                'bayesian_posterior': bayesian_result['posterior'],
+                'confidence_score': ml_prediction['confidence_score'],
+                'risk_level': risk_level_db,
+                'model_version': model.version
+            }])
         
         # Combine results
-        result = {
-            'success': True,
-            'disease': disease.replace('_', ' ').title(),
-            'ml_prediction': {
-                'raw_probability': round(ml_prediction['raw_probability'] * 100, 2),
-                'confidence_score': round(ml_prediction['confidence_score'] * 100, 2),
-                'symptoms_analyzed': ml_prediction['symptoms_matched']
-            },
-            'bayesian_analysis': {
-                'prior': round(bayesian_result['prior'] * 100, 2),
-                'likelihood': round(bayesian_result['likelihood'] * 100, 2),
-                'posterior': round(bayesian_result['posterior'] * 100, 2),
-                'false_positive_rate': round(bayesian_result['false_positive_rate'] * 100, 2)
-            },
-            'risk_assessment': risk_assessment
-        }
+        with server_timing.span('serialize'):
+            result = {
+                'success': True,
+                'disease': disease.replace('_', ' ').title(),
+                'ml_prediction': {
+                    'raw_probability': round(ml_prediction['raw_probability'] * 100, 2),
+                    'confidence_score': round(ml_prediction['confidence_score'] * 100, 2),
+                    'symptoms_analyzed': ml_prediction['symptoms_matched']
+                },
+                'bayesian_analysis': {
+                    'prior': round(bayesian_result['prior'] * 100, 2),
+                    'likelihood': round(bayesian_result['likelihood'] * 100, 2),
+                    'posterior': round(bayesian_result['posterior'] * 100, 2),
+                    'false_positive_rate': round(bayesian_result['false_positive_rate'] * 100, 2)
+                },
+                'risk_assessment': risk_assessment,
+                'model_version': model.version
+            }
+            response = jsonify(result)
         
-        return jsonify(result), 200
+        return response, 200
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
@@ -129,6 +175,182 @@ def predict_disease():
         return jsonify({'error': f'Prediction failed: {str(e)}'}), 500
 
 
+@ml_bp.route('/api/ml/predict-batch', methods=['POST'])
+def predict_batch():
+    """
+    API endpoint for scoring many patients in one request.
+    
+    Accepts a JSON array of /api/ml/predict payloads, or an NDJSON body
+    (Content-Type: application/x-ndjson) with one payload per line:
+    [
+        {"disease": "diabetes", "symptoms": ["fatigue"], "age": 54},
+        {"disease": "influenza", "symptoms": ["fever", "cough"]}
+    ]
+    
+    Streams back one NDJSON line per patient, in input order, as each chunk
+    is scored. A bad item produces {"index": i, "success": false, "error": ...}
+    without failing the rest of the batch. Rate limiting counts items.
+    """
+    items = _parse_batch_body()
+    if items is None:
+        return jsonify({'error': 'Body must be a JSON array or NDJSON'}), 400
+    if not items:
+        return jsonify({'error': 'No data provided'}), 400
+    if len(items) > MAX_BATCH_ITEMS:
+        return jsonify({'error': f'Too many items in batch (maximum {MAX_BATCH_ITEMS})'}), 413
+    
+    allowed, retry_after, remaining = rate_limiter.check_rate_limit('batch_prediction', cost=len(items))
+    if not allowed:
+        return rate_limit_exceeded_response(retry_after)
+    
+    # Pin one model version for the whole batch (weights may hot-reload)
+    model = ml_model.current
+    
+    def generate():
+        for start in range(0, len(items), BATCH_CHUNK_SIZE):
+            chunk = items[start:start + BATCH_CHUNK_SIZE]
+            for result in _score_batch_chunk(model, chunk, start):
+                yield json.dumps(result) + '\n'
+    
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['X-RateLimit-Remaining'] = str(remaining)
+    response.headers['X-Batch-Items'] = str(len(items))
+    return response
+
+
+def _parse_batch_body():
+    """
+    Parse a batch request body into a list of items.
+    
+    Undecodable NDJSON lines become None items (reported per item).
+    
+    Returns:
+        List of items, or None if the body is not a JSON array or NDJSON
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        items = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(None)
+        return items
+    
+    data = request.get_json(silent=True)
+    return data if isinstance(data, list) else None
+
+
+def _validate_batch_item(item):
+    """
+    Validate one batch item the same way /api/ml/predict does.
+    
+    Returns:
+        Tuple of (disease, symptoms, age)
+    """
+    if not isinstance(item, dict):
+        raise ValueError('Item must be a JSON object')
+    
+    disease = item.get('disease')
+    symptoms = item.get('symptoms', [])
+    age = item.get('age')
+    
+    if not disease or not isinstance(disease, str):
+        raise ValueError('Disease not specified')
+    if not symptoms or not isinstance(symptoms, list):
+        raise ValueError('No symptoms provided')
+    if not all(isinstance(symptom, str) for symptom in symptoms):
+        raise ValueError('Each symptom must be a string')
+    
+    # Invalid ages are ignored, as in /api/ml/predict
+    if age is not None:
+        try:
+            age = int(age)
+        except (ValueError, TypeError):
+            age = None
+    
+    return disease.lower(), symptoms, age
+
+
+def _score_batch_chunk(model, chunk, offset):
+    """
+    Score one chunk of batch items with the vectorized model path and save
+    the successful predictions.
+    
+    Args:
+        model: Pinned DiseaseMLModel
+        chunk: Items to score
+        offset: Index of the first item in the whole batch
+    
+    Returns:
+        List of result dicts in input order
+    """
+    results = [None] * len(chunk)
+    valid = []
+    for i, item in enumerate(chunk):
+        try:
+            valid.append((i, *_validate_batch_item(item)))
+        except ValueError as e:
+            results[i] = {'index': offset + i, 'success': False, 'error': str(e)}
+    
+    records = []
+    if valid:
+        positions, diseases, symptom_sets, ages = zip(*valid)
+        batch = model.predict_batch(diseases, symptom_sets, ages=ages, strict=False)
+        bayesian = BayesCalculator().calculate_posterior_batch(
+            batch['prior_probability'], batch['likelihood'], 0.05
+        )
+        
+        for j, i in enumerate(positions):
+            if not batch['disease_found'][j]:
+                results[i] = {
+                    'index': offset + i,
+                    'success': False,
+                    'error': f"Disease '{diseases[j]}' (key: {batch['disease_key'][j]}) not found in model"
+                }
+                continue
+            
+            raw_probability = float(batch['raw_probability'][j])
+            confidence_score = float(batch['confidence_score'][j])
+            posterior = float(bayesian['posterior'][j])
+            risk_assessment = get_risk_level(posterior * 100)
+            
+            results[i] = {
+                'index': offset + i,
+                'success': True,
+                'disease': diseases[j].replace('_', ' ').title(),
+                'ml_prediction': {
+                    'raw_probability': round(raw_probability * 100, 2),
+                    'confidence_score': round(confidence_score * 100, 2),
+                    'symptoms_analyzed': int(batch['symptoms_matched'][j])
+                },
+                'bayesian_analysis': {
+                    'prior': round(float(bayesian['prior'][j]) * 100, 2),
+                    'likelihood': round(float(bayesian['likelihood'][j]) * 100, 2),
+                    'posterior': round(posterior * 100, 2),
+                    'false_positive_rate': round(float(bayesian['false_positive_rate'][j]) * 100, 2)
+                },
+                'risk_assessment': risk_assessment,
+                'model_version': model.version
+            }
+            records.append({
+                'disease': diseases[j],
+                'symptoms': json.dumps(symptom_sets[j]),
+                'patient_age': ages[j],
+                'ml_probability': raw_probability,
+                'bayesian_posterior': posterior,
+                'confidence_score': confidence_score,
+                'risk_level': RISK_LEVEL_STORAGE.get(risk_assessment['level'], 'medium'),
+                'model_version': model.version
+            })
+    
+    if records:
+        save_predictions(records)
+    
+    return results
+
+
 @ml_bp.route('/api/ml/predict-multiple', methods=['POST'])
 def predict_multiple_diseases():
     """
@@ -136,52 +358,98 @@ def predict_multiple_diseases():
     
     Expected JSON payload:
     {
-        "symptoms": ["fever", "cough", "fatigue"]
+        "symptoms": ["fever", "cough", "fatigue"],
+        "top_k": 10  (optional, return only the k most likely diseases)
     }
     """
     try:
-        data = request.get_json()
+        with server_timing.span('parse'):
+            data = request.get_json()
         
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
         symptoms = data.get('symptoms', [])
+        top_k = data.get('top_k')
         
         if not symptoms or len(symptoms) == 0:
             return jsonify({'error': 'No symptoms provided'}), 400
         
-        # Get predictions for all diseases
-        predictions = ml_model.predict_multiple_diseases(symptoms)
+        if top_k is not None:
+            try:
+                top_k = int(top_k)
+            except (ValueError, TypeError):
+                return jsonify({'error': 'top_k must be a positive integer'}), 400
+            if top_k < 1:
+                return jsonify({'error': 'top_k must be a positive integer'}), 400
         
-        # Format results
-        results = []
-        calculator = BayesCalculator()
+        # Get predictions for all diseases (or the top k)
+        model = ml_model.current
+        with server_timing.span('model'):
+            predictions = model.predict_multiple_diseases(symptoms, top_k=top_k)
         
-        for pred in predictions:
-            bayesian = calculator.calculate_posterior(
-                prior=pred['prior_probability'],
-                likelihood=pred['likelihood'],
+        # One vectorized Bayes step for every prediction
+        with server_timing.span('bayes'):
+            calculator = BayesCalculator()
+            bayesian = calculator.calculate_posterior_batch(
+                prior=[pred['prior_probability'] for pred in predictions],
+                likelihood=[pred['likelihood'] for pred in predictions],
                 false_positive_rate=0.05
             )
+        
+        # Format results
+        with server_timing.span('serialize'):
+            results = []
+            for pred, posterior in zip(predictions, bayesian['posterior'].tolist()):
+                results.append({
+                    'disease': pred['disease'].replace('_', ' ').title(),
+                    'probability': round(pred['raw_probability'] * 100, 2),
+                    'posterior': round(posterior * 100, 2),
+                    'confidence': round(pred['confidence_score'] * 100, 2),
+                    'risk_level': get_risk_level(posterior * 100)
+                })
             
-            results.append({
-                'disease': pred['disease'].replace('_', ' ').title(),
-                'probability': round(pred['raw_probability'] * 100, 2),
-                'posterior': round(bayesian['posterior'] * 100, 2),
-                'confidence': round(pred['confidence_score'] * 100, 2),
-                'risk_level': get_risk_level(bayesian['posterior'] * 100)
+            response = jsonify({
+                'success': True,
+                'predictions': results,
+                'symptoms_count': len(symptoms),
+                'model_version': model.version
             })
         
-        return jsonify({
-            'success': True,
-            'predictions': results,
-            'symptoms_count': len(symptoms)
-        }), 200
+        return response, 200
         
     except Exception as e:
         return jsonify({'error': f'Prediction failed: {str(e)}'}), 500
 
 
+@ml_bp.route('/api/ml/model', methods=['GET'])
+def get_model_info():
+    """Get the served model version and hot-reload status"""
+    return jsonify({
+        'success': True,
+        'model': ml_model.get_info()
+    }), 200
+
+
+@ml_bp.route('/api/ml/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Get hit/miss counters for the prediction and posterior caches"""
+    return jsonify({
+        'success': True,
+        'prediction_cache': ml_model.prediction_cache.stats(),
+        'posterior_cache': posterior_cache.stats()
+    }), 200
+
+
+@ml_bp.route('/api/ml/write-stats', methods=['GET'])
+def get_write_stats():
+    """Get queue depth and counters of the prediction write-behind queue"""
+    return jsonify({
+        'success': True,
+        'writer': prediction_writer.get_stats()
+    }), 200
+
+
 @ml_bp.route('/api/ml/diseases', methods=['GET'])
 def get_diseases():
     """Get list of available diseases"""
@@ -256,6 +524,20 @@ def get_symptom_importance(disease):
         return jsonify({'error': str(e)}), 500
 
 
+def save_predictions(rows):
+    """
+    Hand PredictionHistory rows to the write-behind queue.
+    
+    Rows are written synchronously when PREDICTION_WRITE_BEHIND is off.
+    When the queue is full the rows are written on this request instead.
+    
+    Args:
+        rows: List of PredictionHistory column dictionaries
+    """
+    synchronous = not current_app.config.get('PREDICTION_WRITE_BEHIND', True)
+    prediction_writer.submit_many(rows, synchronous=synchronous)
+
+
 def get_risk_level(probability):
     """
     Determine risk level based on probability percentage.
@@ -1,5 +1,12 @@
+import os
+import time
 import pandas as pd
 
+# Rows per chunk in streaming mode; bounds peak memory regardless of input size
+DEFAULT_CHUNKSIZE = 50_000
+
+PROBABILITY_COLUMNS = ["prior", "sensitivity", "specificity"]
+
 def bayesian_survival(prior, sensitivity, specificity):
     """
     Calculate posterior probability using Bayes' Theorem.
@@ -130,49 +137,70 @@ class BayesCalculator:
         }
 
 
+def _check_columns(df):
+    """Raise if the required probability columns are missing"""
+    expected_cols = set(PROBABILITY_COLUMNS)
+    if not expected_cols.issubset(df.columns):
+        raise ValueError(f"CSV must contain columns: {expected_cols}, found {df.columns.tolist()}")
+
+
 def read_data(filepath):
     """Read CSV data for batch processing"""
     df = pd.read_csv(filepath)
-    expected_cols = {'prior', 'sensitivity', 'specificity'}
-    if not expected_cols.issubset(df.columns):
-        raise ValueError(f"CSV must contain columns: {expected_cols}, found {df.columns.tolist()}")
+    _check_columns(df)
     return df
 
 
-def clean_data(df, strict=False):
-    """Clean and validate data"""
-    df = df.copy()
-    df[["prior", "sensitivity", "specificity"]] = df[["prior", "sensitivity", "specificity"]].apply(pd.to_numeric, errors='coerce')
-    df[["prior", "sensitivity", "specificity"]] = df[["prior", "sensitivity", "specificity"]].clip(0, 1)
+def _validate(df, strict=False):
+    """
+    Coerce and clamp the probability columns of df in place.
+
+    Returns:
+        Tuple of (valid rows, number of dropped rows)
+    """
+    df[PROBABILITY_COLUMNS] = df[PROBABILITY_COLUMNS].apply(pd.to_numeric, errors='coerce').clip(0, 1)
 
-    nan_mask = df[["prior", "sensitivity", "specificity"]].isna().any(axis=1)
+    nan_mask = df[PROBABILITY_COLUMNS].isna().any(axis=1)
 
     if strict:
         if nan_mask.any():
             bad_rows = df[nan_mask]
             raise ValueError(f"Invalid rows found:\n{bad_rows}")
-        return df
-    else:
-        dropped_count = nan_mask.sum()
-        if dropped_count > 0:
-            print(f"Warning: Dropped {dropped_count} invalid row(s) due to non-numeric values.")
-        return df[~nan_mask]
+        return df, 0
+    dropped_count = int(nan_mask.sum())
+    if dropped_count:
+        df = df[~nan_mask].copy()
+    return df, dropped_count
 
 
-def add_posterior_column(df):
-    """Add posterior probability column to dataframe"""
-    df = df.copy()
+def _warn_dropped(dropped_count):
+    if dropped_count > 0:
+        print(f"Warning: Dropped {dropped_count} invalid row(s) due to non-numeric values.")
+
+
+def clean_data(df, strict=False):
+    """Clean and validate data"""
+    df, dropped_count = _validate(df.copy(), strict=strict)
+    _warn_dropped(dropped_count)
+    return df
 
+
+def _compute_posterior(df):
+    """Set the posterior column of df in place"""
     numerator = df['sensitivity'] * df['prior']
     denominator = numerator + ((1 - df['specificity']) * (1 - df['prior']))
 
     # Avoid division by zero: where denominator == 0, set posterior = 0
     df['posterior'] = numerator / denominator
     df.loc[denominator == 0, 'posterior'] = 0.0
-
     return df
 
 
+def add_posterior_column(df):
+    """Add posterior probability column to dataframe"""
+    return _compute_posterior(df.copy())
+
+
 def save_results(df, save_path):
     """Save results to CSV"""
     df.to_csv(save_path, index=False)
@@ -192,6 +220,80 @@ def load_data(filepath, strict=False, save_results_flag=False, save_path=None):
     return df.to_dict(orient='records')
 
 
+def iter_posterior_chunks(filepath, strict=False, chunksize=DEFAULT_CHUNKSIZE, stats=None):
+    """
+    Stream the CSV in fixed-size chunks, yielding validated DataFrames with a
+    posterior column. Only one chunk is held in memory at a time.
+
+    Args:
+        filepath: Input CSV path
+        strict: Raise ValueError on the first invalid row instead of dropping it
+        chunksize: Rows per chunk
+        stats: Optional dict updated with 'rows_read' and 'rows_dropped'
+
+    Yields:
+        pandas DataFrame per chunk (row index continues across chunks)
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault('rows_read', 0)
+    stats.setdefault('rows_dropped', 0)
+
+    for chunk in pd.read_csv(filepath, chunksize=chunksize):
+        _check_columns(chunk)
+        stats['rows_read'] += len(chunk)
+        chunk, dropped_count = _validate(chunk, strict=strict)
+        stats['rows_dropped'] += dropped_count
+        yield _compute_posterior(chunk)
+
+
+def stream_data(filepath, save_path, strict=False, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Process a CSV of any size with bounded memory, appending each chunk to
+    save_path as it is computed.
+
+    Output goes to a temporary file renamed over save_path at the end, so a
+    strict-mode failure never leaves a partial result behind.
+
+    Args:
+        filepath: Input CSV path
+        save_path: Output CSV path
+        strict: Raise ValueError on invalid rows instead of dropping them
+        chunksize: Rows per chunk
+
+    Returns:
+        Dictionary with rows_read, rows_written, rows_dropped, seconds and rows_per_sec
+    """
+    stats = {}
+    rows_written = 0
+    start = time.perf_counter()
+    tmp_path = f"{save_path}.tmp"
+
+    try:
+        with open(tmp_path, 'w', newline='') as output:
+            for chunk in iter_posterior_chunks(filepath, strict=strict, chunksize=chunksize, stats=stats):
+                chunk.to_csv(output, index=False, header=(rows_written == 0))
+                rows_written += len(chunk)
+        os.replace(tmp_path, save_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    seconds = time.perf_counter() - start
+    rows_per_sec = stats.get('rows_read', 0) / seconds if seconds > 0 else 0.0
+    _warn_dropped(stats.get('rows_dropped', 0))
+    print(f"Processed {stats.get('rows_read', 0)} row(s) in {seconds:.2f}s ({rows_per_sec:,.0f} rows/sec)")
+
+    return {
+        'rows_read': stats.get('rows_read', 0),
+        'rows_written': rows_written,
+        'rows_dropped': stats.get('rows_dropped', 0),
+        'seconds': seconds,
+        'rows_per_sec': rows_per_sec
+    }
+
+
 def display_results(results):
     """Display results in console"""
     for row in results:
@@ -0,0 +1,48 @@
+"""
+Shared fixtures for the application tests.
+"""
+
+import os
+
+import pytest
+
+from backend import create_app, db
+
+
+@pytest.fixture(scope='session', autouse=True)
+def log_dir(tmp_path_factory):
+    """Keep structured log files out of the working tree."""
+    previous = os.environ.get('LOG_DIR')
+    os.environ['LOG_DIR'] = str(tmp_path_factory.mktemp('logs'))
+    yield os.environ['LOG_DIR']
+    if previous is None:
+        os.environ.pop('LOG_DIR')
+    else:
+        os.environ['LOG_DIR'] = previous
+
+
+@pytest.fixture
+def app_config():
+    """Extra configuration for the test application; modules override this."""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path_factory, app_config):
+    """Create a test application backed by a throwaway SQLite database."""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path_factory.mktemp('db') / 'test.db'),
+        **app_config
+    })
+
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    """Create a test client."""
+    return app.test_client()
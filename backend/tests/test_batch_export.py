@@ -0,0 +1,202 @@
+"""
+Tests for the streamed multi-patient PDF and ZIP exports.
+"""
+
+import io
+import json
+import re
+import zipfile
+import zlib
+from datetime import datetime
+
+import pytest
+
+from backend import db
+from backend.models.prediction import PredictionHistory
+from backend.models.user import User
+from backend.utils.batch_export import PREDICTION_COLUMNS, StreamingTablePdf, iter_prediction_pdf
+from backend.routes import doctor_routes
+from backend.utils.render_pool import RenderPoolBusy, RenderTimeout, pdf_render_pool
+
+DOCTOR_EMAIL = 'doctor@example.com'
+
+
+@pytest.fixture
+def app_config():
+    """Make DOCTOR_EMAIL a doctor account."""
+    return {'DOCTOR_EMAILS': frozenset([DOCTOR_EMAIL])}
+
+
+def sign_in(app, client, email):
+    """Create a user and put it in the test client's session."""
+    user = User(username=email.split('@')[0], email=email, password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+
+
+@pytest.fixture
+def client(app):
+    """Create a test client signed in as a doctor."""
+    client = app.test_client()
+    sign_in(app, client, DOCTOR_EMAIL)
+    return client
+
+
+@pytest.fixture
+def predictions(app):
+    """Eight predictions over four days, alternating disease and risk level."""
+    with app.app_context():
+        for i in range(8):
+            db.session.add(PredictionHistory(
+                disease='diabetes' if i % 2 else 'hypertension',
+                symptoms=json.dumps(['fatigue', 'increased_thirst']),
+                ml_probability=0.1 * (i + 1),
+                bayesian_posterior=0.05 * (i + 1),
+                risk_level=['low', 'medium', 'high', 'critical'][i % 4],
+                patient_age=30 + i,
+                created_at=datetime(2026, 3, 1 + i // 2, 12, 0)
+            ))
+        db.session.commit()
+
+
+def parse_pdf(data):
+    """Check the cross-reference table and return (page count, page text)."""
+    assert data.startswith(b'%PDF-1.4') and data.endswith(b'%%EOF\n')
+    xref_offset = int(re.search(rb'startxref\n(\d+)\n%%EOF\n$', data).group(1))
+    xref = data[xref_offset:].split(b'\n')
+    size = int(xref[1].split()[1])
+    for number in range(1, size):
+        offset = int(xref[2 + number][:10])
+        assert data[offset:].startswith(f'{number} 0 obj\n'.encode()), number
+
+    text = b''.join(
+        zlib.decompress(stream)
+        for stream in re.findall(rb'/FlateDecode >>\nstream\n(.*?)\nendstream', data, re.S)
+    )
+    return int(re.search(rb'/Type /Pages /Kids \[[^\]]*\] /Count (\d+)', data).group(1)), text
+
+
+class TestStreamingTablePdf:
+    """Tests for the incremental PDF writer"""
+
+    def test_pages_emitted_before_rows_exhausted(self):
+        """Test that full pages are sent while rows are still being read."""
+        consumed = []
+
+        def rows():
+            for i in range(300):
+                consumed.append(i)
+                yield type('Row', (), {
+                    'id': i, 'created_at': datetime(2026, 1, 1), 'disease': 'flu', 'patient_age': 40,
+                    'symptoms': '["cough"]', 'ml_probability': 0.5, 'bayesian_posterior': None,
+                    'risk_level': 'low', 'model_version': None
+                })
+
+        chunks = iter_prediction_pdf(rows())
+        next(chunks)  # header
+        next(chunks)  # first full page
+        assert 0 < len(consumed) < 300
+
+        pages, text = parse_pdf(b''.join(iter_prediction_pdf(rows())))
+        assert pages > 1
+        assert text.count(b'(cough) Tj') == 300
+
+    def test_empty_document_and_escaping(self):
+        """Test that an empty table still renders a valid page and text is escaped."""
+        pdf = StreamingTablePdf('Report (draft) \\ test', PREDICTION_COLUMNS, subtitle='Café ✓')
+        data = pdf.begin() + pdf.end('Nothing here.')
+
+        pages, text = parse_pdf(data)
+        assert pages == 1
+        assert b'(Report \\(draft\\) \\\\ test) Tj' in text
+        assert b'(Caf\xe9 ?) Tj' in text
+        assert b'(Nothing here.) Tj' in text
+
+
+class TestExportRoute:
+    """Tests for /api/doctor/export"""
+
+    def test_pdf_export_streams_filtered_rows(self, client, predictions):
+        """Test that the PDF is streamed and contains only matching rows."""
+        response = client.get('/api/doctor/export?start=2026-03-02&end=2026-03-03&risk_level=high,critical')
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.mimetype == 'application/pdf'
+        assert 'attachment; filename=prediction_export_' in response.headers['Content-Disposition']
+
+        pages, text = parse_pdf(response.get_data())
+        assert pages == 1
+        # March 2-3 hold ids 3-6, of which 3 is high and 4 critical
+        assert re.findall(rb'BT /F1 8 Tf 40 [\d.]+ Td \((\d+)\) Tj', text) == [b'3', b'4']
+        assert b'Risk: high, critical' in text
+
+    def test_zip_export_has_one_pdf_per_prediction(self, client, predictions, monkeypatch):
+        """Test that the ZIP holds a report for every matching prediction."""
+        monkeypatch.setattr(pdf_render_pool, 'workers', 0)
+        response = client.get('/api/doctor/export?format=zip&disease=diabetes')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/zip'
+
+        archive = zipfile.ZipFile(io.BytesIO(response.get_data()))
+        assert archive.testzip() is None
+        assert archive.namelist() == [f'prediction_{i}_diabetes.pdf' for i in (2, 4, 6, 8)]
+        assert archive.read('prediction_2_diabetes.pdf').startswith(b'%PDF')
+
+    def test_render_failure_closes_zip_with_error_entry(self, client, predictions, monkeypatch):
+        """Test that a render timeout mid-stream still yields a valid archive."""
+        calls = []
+
+        def render(func, fields):
+            calls.append(fields['id'])
+            if len(calls) == 3:
+                raise RenderTimeout('too slow')
+            return b'%PDF-1.4 stub'
+        monkeypatch.setattr(pdf_render_pool, 'render', render)
+
+        response = client.get('/api/doctor/export?format=zip')
+        archive = zipfile.ZipFile(io.BytesIO(response.get_data()))
+        assert archive.testzip() is None
+        assert archive.namelist() == ['prediction_1_hypertension.pdf', 'prediction_2_diabetes.pdf', 'EXPORT_ERROR.txt']
+        assert b'after 2 reports' in archive.read('EXPORT_ERROR.txt')
+
+    def test_busy_pool_retried_then_reported(self, client, predictions, monkeypatch):
+        """Test that a full pool is waited for, and never bypassed by rendering in the web worker."""
+        busy_calls = []
+
+        def render(func, fields):
+            if fields['id'] == 1 and len(busy_calls) < 2 or fields['id'] == 3:
+                busy_calls.append(fields['id'])
+                raise RenderPoolBusy(1)
+            return b'%PDF-1.4 stub'
+        monkeypatch.setattr(pdf_render_pool, 'render', render)
+        monkeypatch.setattr(doctor_routes, 'render_prediction_report', None)
+        monkeypatch.setattr(doctor_routes, 'EXPORT_RENDER_WAIT', 0.3)
+
+        archive = zipfile.ZipFile(io.BytesIO(client.get('/api/doctor/export?format=zip').get_data()))
+        assert archive.namelist() == ['prediction_1_hypertension.pdf', 'prediction_2_diabetes.pdf', 'EXPORT_ERROR.txt']
+        assert b'RenderPoolBusy' in archive.read('EXPORT_ERROR.txt')
+        assert busy_calls[:2] == [1, 1] and len(busy_calls) > 3
+
+    def test_anonymous_redirected_to_login(self, app):
+        """Test that the export requires a signed-in user."""
+        response = app.test_client().get('/api/doctor/export')
+        assert response.status_code == 302
+        assert '/login' in response.headers['Location']
+
+    def test_non_doctor_refused(self, app):
+        """Test that users not listed in DOCTOR_EMAILS get 403."""
+        client = app.test_client()
+        sign_in(app, client, 'patient@example.com')
+        response = client.get('/api/doctor/export')
+        assert response.status_code == 403
+        assert response.get_json()['success'] is False
+
+    def test_invalid_filters_rejected(self, client):
+        """Test that malformed filters return 400 before streaming starts."""
+        for query in ('start=03/01/2026', 'risk_level=severe', 'format=docx', 'start=2026-03-05&end=2026-03-01'):
+            response = client.get(f'/api/doctor/export?{query}')
+            assert response.status_code == 400
+            assert response.get_json()['success'] is False
@@ -0,0 +1,112 @@
+"""
+Tests for the parallel batch scoring CLI.
+"""
+
+import csv
+import json
+
+import pytest
+
+from backend.models.ml_model import DiseaseMLModel
+from backend.utils.batch_scoring import main, score_file, score_records
+from backend.utils.calculator import BayesCalculator
+
+
+RECORDS = [
+    {'disease': 'Diabetes', 'symptoms': 'increased_thirst;frequent urination', 'age': '60'},
+    {'disease': 'influenza', 'symptoms': 'fever|chills', 'age': ''},
+    {'disease': 'unknown_disease', 'symptoms': 'fever', 'age': '30'},
+    {'disease': 'influenza', 'symptoms': 'fever', 'age': 'old'},
+    {'disease': 'diabetes', 'symptoms': 'increased_thirst', 'age': '45',
+     'sensitivity': '0.9', 'specificity': '0.8', 'test_result': 'Negative'},
+]
+
+
+@pytest.fixture
+def patients_csv(tmp_path):
+    path = tmp_path / 'patients.csv'
+    fields = ['disease', 'symptoms', 'age', 'sensitivity', 'specificity', 'test_result']
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for _ in range(40):
+            writer.writerows(RECORDS)
+    return path
+
+
+class TestScoreRecords:
+    """Test scoring of record chunks"""
+
+    def test_matches_scalar_path(self):
+        """Test that scores agree with predict_disease_probability and calculate_posterior."""
+        model = DiseaseMLModel()
+        calculator = BayesCalculator()
+        result = score_records([RECORDS[0]], model=model)[0]
+
+        expected = model.predict_disease_probability('diabetes', ['increased_thirst', 'frequent_urination'], age=60)
+        posterior = calculator.calculate_posterior(expected['prior_probability'], expected['likelihood'], 0.05)
+        assert result['ml_probability'] == pytest.approx(expected['raw_probability'], abs=1e-12)
+        assert result['posterior'] == pytest.approx(posterior['posterior'], abs=1e-12)
+        assert result['model_version'] == model.version
+
+    def test_per_row_errors(self):
+        """Test that bad rows get an error without affecting the others."""
+        results = score_records(RECORDS, model=DiseaseMLModel())
+        assert [bool(result.get('error')) for result in results] == [False, False, True, True, False]
+        assert 'not found' in results[2]['error']
+        assert 'age' in results[3]['error']
+
+    def test_wrongly_typed_fields_are_row_errors(self):
+        """Test that non-string diseases and non-list symptoms fail only their row."""
+        records = [
+            {'disease': 5, 'symptoms': ['fatigue']},
+            {'disease': ['diabetes'], 'symptoms': ['fatigue']},
+            {'disease': 'diabetes', 'symptoms': {'fatigue': True}},
+            {'disease': 'diabetes', 'symptoms': 42},
+            RECORDS[0],
+        ]
+        results = score_records(records, model=DiseaseMLModel())
+        assert 'disease must be a string' in results[0]['error']
+        assert 'disease must be a string' in results[1]['error']
+        assert 'symptoms must be a list' in results[2]['error']
+        assert 'symptoms must be a list' in results[3]['error']
+        assert 'error' not in results[4]
+
+    def test_test_result_chains_on_posterior(self):
+        """Test that a lab result updates the symptom posterior."""
+        result = score_records([RECORDS[4]], model=DiseaseMLModel())[0]
+        expected = BayesCalculator().calculate_with_test_result(result['posterior'], 0.9, 0.8, 'negative')
+        assert result['test_posterior'] == pytest.approx(expected['posterior'])
+
+
+class TestScoreFile:
+    """Test the file-level entry point"""
+
+    def test_parallel_matches_serial_in_order(self, patients_csv, tmp_path):
+        """Test that worker output is written in input order and equals the serial output."""
+        serial = tmp_path / 'serial.ndjson'
+        parallel = tmp_path / 'parallel.ndjson'
+        score_file(str(patients_csv), str(serial), workers=1, chunk_size=7)
+        stats = score_file(str(patients_csv), str(parallel), workers=2, chunk_size=7)
+
+        assert parallel.read_text() == serial.read_text()
+        rows = [json.loads(line) for line in parallel.read_text().splitlines()]
+        assert [row['row'] for row in rows] == list(range(200))
+        assert stats['rows'] == 200
+        assert stats['errors'] == 80
+
+    def test_ndjson_input_csv_output(self, tmp_path):
+        """Test NDJSON input with list symptoms and CSV output via the CLI."""
+        input_path = tmp_path / 'patients.ndjson'
+        input_path.write_text(
+            json.dumps({'disease': 'influenza', 'symptoms': ['fever', 'chills'], 'age': 30}) + '\n'
+            + 'not json\n'
+        )
+        output_path = tmp_path / 'scored.csv'
+
+        assert main([str(input_path), str(output_path), '--workers', '1']) == 0
+        with open(output_path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert rows[0]['disease_key'] == 'influenza'
+        assert rows[0]['error'] == ''
+        assert rows[1]['error'] == 'Invalid record'
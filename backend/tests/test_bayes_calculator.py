@@ -0,0 +1,85 @@
+"""
+Tests for the array-aware BayesCalculator methods.
+The batch methods must agree exactly with the scalar ones.
+"""
+
+import numpy as np
+import pytest
+
+from backend.utils.calculator import BayesCalculator, POSTERIOR_DTYPE, TEST_RESULT_DTYPE
+
+
+@pytest.fixture
+def calculator():
+    return BayesCalculator()
+
+
+@pytest.fixture
+def cohort():
+    """Random inputs plus the clamping and zero-denominator edge cases."""
+    rng = np.random.default_rng(0)
+    values = rng.uniform(-0.2, 1.2, size=(3, 200))
+    edges = np.array([
+        [0.0, 1.0, 0.0, 1.0, np.nan, 0.5],
+        [0.0, 0.0, 1.0, 1.0, 0.5, np.inf],
+        [0.0, 1.0, 0.0, 1.0, 0.5, -1.0],
+    ])
+    return np.concatenate([values, edges], axis=1)
+
+
+class TestCalculatePosteriorBatch:
+    """Test calculate_posterior_batch"""
+
+    def test_matches_scalar(self, calculator, cohort):
+        """Test every field against the scalar method."""
+        prior, likelihood, fpr = cohort
+        results = calculator.calculate_posterior_batch(prior, likelihood, fpr)
+
+        assert results.dtype == POSTERIOR_DTYPE
+        for i, row in enumerate(results):
+            expected = calculator.calculate_posterior(prior[i], likelihood[i], fpr[i])
+            for field in POSTERIOR_DTYPE.names:
+                assert row[field] == expected[field]
+
+    def test_broadcasts_scalars(self, calculator):
+        """Test that scalar arguments broadcast against arrays."""
+        results = calculator.calculate_posterior_batch([0.1, 0.2, 0.3], 0.9)
+        assert results.shape == (3,)
+        assert np.all(results['false_positive_rate'] == 0.05)
+
+    def test_zero_denominator(self, calculator):
+        """Test that a zero denominator gives a zero posterior."""
+        results = calculator.calculate_posterior_batch([0.0, 1.0], [0.5, 0.0], 0.0)
+        assert results['posterior'].tolist() == [0.0, 0.0]
+
+    def test_non_numeric_input(self, calculator):
+        """Test that non-numeric input raises ValueError like the scalar method."""
+        with pytest.raises(ValueError):
+            calculator.calculate_posterior_batch(['abc'], [0.5])
+        with pytest.raises(ValueError):
+            calculator.calculate_posterior_batch([0.1, None], [0.5, 0.5])
+
+
+class TestCalculateWithTestResultBatch:
+    """Test calculate_with_test_result_batch"""
+
+    def test_matches_scalar(self, calculator, cohort):
+        """Test both test results against the scalar method."""
+        prior, sensitivity, specificity = cohort
+        test_results = np.where(np.arange(prior.size) % 2 == 0, 'positive', 'Negative')
+        results = calculator.calculate_with_test_result_batch(prior, sensitivity, specificity, test_results)
+
+        assert results.dtype == TEST_RESULT_DTYPE
+        for i, row in enumerate(results):
+            expected = calculator.calculate_with_test_result(
+                prior[i], sensitivity[i], specificity[i], test_results[i]
+            )
+            for field in ('prior', 'sensitivity', 'specificity', 'false_positive_rate', 'posterior'):
+                assert row[field] == expected[field]
+            assert row['test_result'] == expected['test_result'].lower()
+
+    def test_boolean_test_results(self, calculator):
+        """Test that booleans are accepted as positive/negative flags."""
+        flags = calculator.calculate_with_test_result_batch(0.1, 0.9, 0.8, [True, False])
+        names = calculator.calculate_with_test_result_batch(0.1, 0.9, 0.8, ['positive', 'negative'])
+        assert np.array_equal(flags, names)
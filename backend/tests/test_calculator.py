@@ -4,7 +4,7 @@ import os
 import csv
 import io
 import sys
-from src.calculator import bayesian_survival, load_data, display_results
+from src.calculator import bayesian_survival, load_data, display_results, stream_data, iter_posterior_chunks
 
 class TestBayesianCalculator(unittest.TestCase):
 
@@ -91,6 +91,60 @@ class TestBayesianCalculator(unittest.TestCase):
         self.assertEqual(results[0]['specificity'], 0.5)
         self.assertIn("Warning: Dropped 1 invalid row(s)", captured.getvalue())
 
+    # -----------------------------
+    # Test streaming mode
+    # -----------------------------
+    def _write_cohort(self, rows):
+        temp_file = tempfile.NamedTemporaryFile(delete=False, mode='w', newline='', suffix='.csv')
+        writer = csv.DictWriter(temp_file, fieldnames=['prior','sensitivity','specificity'])
+        writer.writeheader()
+        writer.writerows(rows)
+        temp_file.close()
+        self.addCleanup(os.unlink, temp_file.name)
+        return temp_file.name
+
+    def test_stream_data_matches_load_data(self):
+        rows = [{'prior': 0.1*(i%11), 'sensitivity': 0.9, 'specificity': 0.8} for i in range(250)]
+        rows[7]['prior'] = 'abc'
+        rows[180]['sensitivity'] = 1.5
+        input_path = self._write_cohort(rows)
+        output_path = input_path + '.out'
+        self.addCleanup(os.unlink, output_path)
+
+        captured = io.StringIO()
+        sys.stdout = captured
+        expected = load_data(input_path)
+        stats = stream_data(input_path, output_path, chunksize=64)
+        sys.stdout = sys.__stdout__
+
+        with open(output_path, newline='') as f:
+            streamed = list(csv.DictReader(f))
+        self.assertEqual(len(streamed), len(expected))
+        for got, want in zip(streamed, expected):
+            self.assertAlmostEqual(float(got['posterior']), want['posterior'], places=12)
+        self.assertEqual(stats['rows_read'], 250)
+        self.assertEqual(stats['rows_written'], 249)
+        self.assertEqual(stats['rows_dropped'], 1)
+        self.assertEqual(captured.getvalue().count("Warning: Dropped 1 invalid row(s)"), 2)
+        self.assertIn("rows/sec", captured.getvalue())
+
+    def test_stream_data_strict_leaves_no_output(self):
+        rows = [{'prior': 0.5, 'sensitivity': 0.5, 'specificity': 0.5} for _ in range(100)]
+        rows[90]['specificity'] = 'abc'
+        input_path = self._write_cohort(rows)
+        output_path = input_path + '.out'
+
+        with self.assertRaises(ValueError):
+            stream_data(input_path, output_path, strict=True, chunksize=10)
+        self.assertFalse(os.path.exists(output_path))
+        self.assertFalse(os.path.exists(output_path + '.tmp'))
+
+    def test_iter_posterior_chunks_bounded(self):
+        rows = [{'prior': 0.2, 'sensitivity': 0.8, 'specificity': 0.9} for _ in range(95)]
+        input_path = self._write_cohort(rows)
+        sizes = [len(chunk) for chunk in iter_posterior_chunks(input_path, chunksize=20)]
+        self.assertEqual(sizes, [20, 20, 20, 20, 15])
+
 
     def test_display_results_empty(self):
         captured = io.StringIO()
@@ -0,0 +1,81 @@
+"""
+Tests for the in-memory hospital_data.csv catalog.
+"""
+
+import os
+
+import pytest
+
+from backend.utils.calculator import bayesian_survival
+from backend.utils.disease_catalog import DiseaseCatalog, disease_catalog
+
+
+def write_catalog(path, rows):
+    path.write_text("Disease,Prevalence,Sensitivity,FalsePositive\n" + "".join(f"{row}\n" for row in rows))
+
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    path = tmp_path / 'hospital_data.csv'
+    write_catalog(path, ["Influenza,0.05,0.9,0.1", "COVID-19,0.02,0.95,0.02", "Broken,abc,0.9,0.1"])
+    return path
+
+
+class TestDiseaseCatalog:
+    """Test the catalog lookup and reload behaviour"""
+
+    def test_case_insensitive_lookup(self, catalog_path):
+        """Test lookups and the precomputed posterior."""
+        catalog = DiseaseCatalog(str(catalog_path))
+        preset = catalog.get('covid-19')
+
+        assert preset == {
+            'p_d_given_pos': round(bayesian_survival(0.02, 0.95, 0.02), 4),
+            'prior': 0.02,
+            'sensitivity': 0.95,
+            'falsePositive': 0.02
+        }
+        assert catalog.get('INFLUENZA')['prior'] == 0.05
+        assert catalog.get('unknown') is None
+        assert catalog.get('broken') is None
+        assert catalog.names() == ['Influenza', 'COVID-19', 'Broken']
+
+    def test_reloads_only_when_file_changes(self, catalog_path):
+        """Test that the file is re-parsed only after an mtime/size change."""
+        catalog = DiseaseCatalog(str(catalog_path), check_interval=0)
+        names = catalog.names()
+        assert catalog.names() is names
+        assert catalog.reload_count == 1
+
+        write_catalog(catalog_path, ["Measles,0.01,0.97,0.03"])
+        os.utime(catalog_path, ns=(0, 0))
+
+        assert catalog.names() == ['Measles']
+        assert catalog.get('influenza') is None
+        assert catalog.reload_count == 2
+
+    def test_missing_file(self, tmp_path):
+        """Test that a missing file gives an empty, unavailable catalog."""
+        catalog = DiseaseCatalog(str(tmp_path / 'missing.csv'))
+        assert catalog.names() == []
+        assert catalog.get('influenza') is None
+        assert catalog.available is False
+
+
+class TestPresetRoute:
+    """Test /preset and /calculator against the shipped hospital_data.csv"""
+
+    def test_preset_lookup(self, client):
+        """Test that /preset serves catalog values."""
+        response = client.post('/preset', json={'disease': 'influenza'})
+        assert response.status_code == 200
+        assert response.get_json() == disease_catalog.get('Influenza')
+
+        assert client.post('/preset', json={'disease': 'nope'}).status_code == 404
+        assert client.post('/preset', json={}).status_code == 400
+
+    def test_calculator_lists_catalog(self, client):
+        """Test that the calculator page lists catalog diseases."""
+        response = client.get('/calculator')
+        assert response.status_code == 200
+        assert disease_catalog.names()[0] in response.get_data(as_text=True)
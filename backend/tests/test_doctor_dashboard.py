@@ -6,27 +6,15 @@ Tests database persistence, data aggregation, percentage calculations, and error
 import pytest
 import json
 from datetime import datetime, timedelta
-from backend import create_app, db
-from backend.models.prediction import PredictionHistory
+from backend import db
+from backend.models.prediction import PredictionHistory, PredictionRollup, rebuild_prediction_rollup
+from backend.models.ml_model import ml_model
 
 
 @pytest.fixture
-def app():
-    """Create and configure a test application instance."""
-    app = create_app()
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    
-    with app.app_context():
-        db.create_all()
-        yield app
-        db.drop_all()
-
-
-@pytest.fixture
-def client(app):
-    """Create a test client."""
-    return app.test_client()
+def app_config():
+    """Write predictions on the request so tests can read them back at once."""
+    return {'PREDICTION_WRITE_BEHIND': False}
 
 
 @pytest.fixture
@@ -197,6 +185,26 @@ class TestPredictionPersistence:
             prediction = PredictionHistory.query.first()
             assert prediction.risk_level in ['low', 'medium', 'high', 'critical']
     
+    def test_prediction_model_version_saved(self, client, app):
+        """Test that the serving model version is stored with the prediction."""
+        payload = {
+            'disease': 'diabetes',
+            'symptoms': ['increased_thirst'],
+            'age': 40
+        }
+        
+        response = client.post(
+            '/api/ml/predict',
+            data=json.dumps(payload),
+            content_type='application/json'
+        )
+        
+        data = json.loads(response.data)
+        with app.app_context():
+            prediction = PredictionHistory.query.first()
+            assert prediction.model_version == data['model_version']
+            assert prediction.model_version == ml_model.version
+    
     def test_prediction_symptoms_stored_as_json(self, client, app):
         """Test that symptoms are stored as JSON string."""
         payload = {
@@ -218,6 +226,104 @@ class TestPredictionPersistence:
             assert 'frequent_urination' in symptoms_list
 
 
+class TestPredictionRollup:
+    """Tests for the dashboard rollup table."""
+    
+    def _add(self, disease, risk_level, created_at):
+        db.session.add(PredictionHistory(
+            disease=disease,
+            symptoms=json.dumps(['fever']),
+            ml_probability=0.5,
+            risk_level=risk_level,
+            created_at=created_at
+        ))
+    
+    def _rollup(self):
+        return {
+            (row.day, row.disease, row.risk_level): row.count
+            for row in PredictionRollup.query.all() if row.count
+        }
+    
+    def test_rollup_updated_on_insert_and_delete(self, app):
+        """Test that ORM inserts and deletes keep the rollup in step."""
+        now = datetime.utcnow()
+        with app.app_context():
+            self._add('diabetes', 'low', now)
+            self._add('diabetes', 'low', now)
+            self._add('diabetes', 'high', now - timedelta(days=2))
+            db.session.commit()
+            
+            assert self._rollup() == {
+                (now.date(), 'diabetes', 'low'): 2,
+                ((now - timedelta(days=2)).date(), 'diabetes', 'high'): 1
+            }
+            
+            db.session.delete(PredictionHistory.query.filter_by(risk_level='high').first())
+            db.session.commit()
+            assert self._rollup() == {(now.date(), 'diabetes', 'low'): 2}
+    
+    def test_rollup_follows_updates(self, app):
+        """Test that changing a row's disease, risk level or day moves its count."""
+        now = datetime.utcnow()
+        with app.app_context():
+            self._add('diabetes', 'low', now)
+            db.session.commit()
+            
+            prediction = PredictionHistory.query.one()
+            prediction.risk_level = 'critical'
+            db.session.commit()
+            assert self._rollup() == {(now.date(), 'diabetes', 'critical'): 1}
+            
+            db.session.expire_all()
+            prediction = PredictionHistory.query.one()
+            prediction.disease = 'covid19'
+            prediction.created_at = now - timedelta(days=3)
+            db.session.commit()
+            assert self._rollup() == {((now - timedelta(days=3)).date(), 'covid19', 'critical'): 1}
+            
+            prediction.patient_age = 40
+            db.session.commit()
+            assert self._rollup() == {((now - timedelta(days=3)).date(), 'covid19', 'critical'): 1}
+    
+    def test_rollup_rolled_back_with_insert(self, app):
+        """Test that a rolled back insert leaves the rollup unchanged."""
+        with app.app_context():
+            self._add('diabetes', 'low', datetime.utcnow())
+            db.session.flush()
+            db.session.rollback()
+            assert self._rollup() == {}
+    
+    def test_rebuild_matches_history(self, app):
+        """Test that the backfill rebuilds rows written around the ORM."""
+        now = datetime.utcnow()
+        with app.app_context():
+            self._add('covid19', 'critical', now)
+            db.session.commit()
+            db.session.execute(PredictionHistory.__table__.insert().values(
+                disease='covid19', symptoms='[]', ml_probability=0.9,
+                risk_level='critical', created_at=now
+            ))
+            db.session.commit()
+            
+            assert self._rollup() == {(now.date(), 'covid19', 'critical'): 1}
+            rebuild_prediction_rollup()
+            assert self._rollup() == {(now.date(), 'covid19', 'critical'): 2}
+    
+    def test_new_cases_window_is_exact(self, client, app):
+        """Test that the 7-day window cuts inside the boundary day."""
+        now = datetime.utcnow()
+        with app.app_context():
+            self._add('diabetes', 'low', now - timedelta(days=7, minutes=5))
+            self._add('diabetes', 'low', now - timedelta(days=7) + timedelta(minutes=5))
+            self._add('diabetes', 'low', now - timedelta(days=3))
+            self._add('diabetes', 'low', now - timedelta(days=30))
+            db.session.commit()
+        
+        data = json.loads(client.get('/api/doctor/dashboard').data)['data']
+        assert data['total_patients'] == 4
+        assert data['new_cases'] == 2
+
+
 class TestPredictionHistoryModel:
     """Tests for the PredictionHistory model."""
     
@@ -280,3 +386,51 @@ class TestDoctorDashboardPage:
         """Test that patient dashboard page loads successfully."""
         response = client.get('/patient-dashboard')
         assert response.status_code == 200
+
+
+class TestModelVersionMigration:
+    """Tests for backend.migrate and the startup schema check."""
+    
+    def test_adds_column_to_old_table(self, tmp_path):
+        """Test that an old database is refused at startup until migrated, keeping its rows."""
+        from sqlalchemy import create_engine, text
+        from backend import create_app
+        from backend.migrate import main, missing_columns
+        
+        path = str(tmp_path / 'old.db')
+        engine = create_engine('sqlite:///' + path)
+        with engine.begin() as connection:
+            connection.execute(text(
+                'CREATE TABLE prediction_history (id INTEGER PRIMARY KEY, user_id INTEGER, patient_age INTEGER, '
+                'disease VARCHAR(100) NOT NULL, symptoms TEXT NOT NULL, ml_probability FLOAT NOT NULL, '
+                'bayesian_posterior FLOAT, confidence_score FLOAT, risk_level VARCHAR(20) NOT NULL, '
+                'created_at DATETIME NOT NULL)'
+            ))
+            connection.execute(text(
+                "INSERT INTO prediction_history (disease, symptoms, ml_probability, risk_level, created_at) "
+                "VALUES ('diabetes', '[]', 0.5, 'low', '2026-01-01 00:00:00')"
+            ))
+        
+        with pytest.raises(RuntimeError, match='prediction_history.model_version'):
+            create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path})
+        
+        main([path])
+        assert missing_columns(engine) == []
+        main([path])  # already up to date
+        engine.dispose()
+        
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path})
+        with app.app_context():
+            assert PredictionHistory.query.one().model_version is None
+            db.engine.dispose()
+    
+    def test_tracked_database_is_current(self):
+        """Test that the shipped site.db already has every migrated column."""
+        from sqlalchemy import create_engine
+        from backend.migrate import DEFAULT_DATABASE, missing_columns
+        
+        engine = create_engine('sqlite:///' + DEFAULT_DATABASE)
+        try:
+            assert missing_columns(engine) == []
+        finally:
+            engine.dispose()
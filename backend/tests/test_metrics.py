@@ -0,0 +1,145 @@
+"""
+Tests for the metrics registry and the /metrics endpoint.
+"""
+
+import json
+import os
+import time
+
+from flask import Flask, Response
+import pytest
+
+from backend.middleware.security import rate_limiter
+from backend.utils.metrics import MetricsRegistry, metrics
+
+
+def parse_samples(text):
+    """Map 'name{labels}' -> float for every sample line."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            sample, value = line.rsplit(' ', 1)
+            samples[sample] = float(value)
+    return samples
+
+
+@pytest.fixture
+def client(app):
+    """Create a test client."""
+    rate_limiter.reset()
+    return app.test_client()
+
+
+class TestMetricsRegistry:
+    """Tests for recording and rendering"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test bucket placement, +Inf, sum and count."""
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        for seconds in (0.05, 0.1, 0.5, 3.0):
+            registry.observe_request('/api/x', 'GET', 200, seconds)
+
+        samples = parse_samples(registry.render())
+        labels = 'endpoint="/api/x",method="GET",status="200"'
+        assert samples[f'http_request_duration_seconds_bucket{{{labels},le="0.1"}}'] == 2
+        assert samples[f'http_request_duration_seconds_bucket{{{labels},le="1.0"}}'] == 3
+        assert samples[f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'] == 4
+        assert samples[f'http_request_duration_seconds_sum{{{labels}}}'] == pytest.approx(3.65)
+        assert samples[f'http_requests_total{{{labels}}}'] == 4
+
+    def test_collectors_and_hit_ratio(self):
+        """Test that collector values are rendered and hit ratios derived."""
+        registry = MetricsRegistry()
+        registry.register_collector(lambda: [
+            ('cache_hits_total', 'counter', 'Cache hits', {'cache': 'c'}, 3),
+            ('cache_misses_total', 'counter', 'Cache misses', {'cache': 'c'}, 1),
+            ('queue_depth', 'gauge', 'Depth', {}, 7),
+        ])
+        text = registry.render()
+        samples = parse_samples(text)
+        assert samples['cache_hit_ratio{cache="c"}'] == 0.75
+        assert samples['queue_depth'] == 7
+        assert '# TYPE cache_hits_total counter' in text
+
+    def test_workers_merged_through_shared_directory(self, tmp_path):
+        """Test that snapshots are summed, skipping gauges of exited workers."""
+        worker = MetricsRegistry(metrics_dir=str(tmp_path))
+        worker.observe_request('/api/x', 'GET', 200, 0.01)
+        worker.track_in_flight(2)
+        worker.write_snapshot()
+
+        # Pretend the snapshot came from a live and an exited worker
+        snapshot = json.loads((tmp_path / f'metrics_{os.getpid()}.json').read_text())
+        (tmp_path / 'metrics_1.json').write_text(json.dumps({**snapshot, 'pid': 1}))
+        (tmp_path / 'metrics_999999999.json').write_text(json.dumps({**snapshot, 'pid': 999999999}))
+
+        scraper = MetricsRegistry(metrics_dir=str(tmp_path))
+        scraper.observe_request('/api/x', 'GET', 200, 0.01)
+        samples = parse_samples(scraper.render())
+        assert samples['http_requests_total{endpoint="/api/x",method="GET",status="200"}'] == 3
+        assert samples['http_requests_in_flight'] == 2
+
+    def test_streamed_response_timed_until_body_sent(self):
+        """Test that a streamed request is recorded when its body is closed, not when returned."""
+        app = Flask(__name__)
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.init_app(app)
+
+        @app.route('/stream')
+        def stream():
+            def generate():
+                yield 'first\n'
+                time.sleep(0.2)
+                yield 'last\n'
+            return Response(generate(), mimetype='application/x-ndjson')
+
+        labels = 'endpoint="/stream",method="GET",status="200"'
+        response = app.test_client().get('/stream')
+        assert f'http_requests_total{{{labels}}}' not in parse_samples(registry.render())
+        assert response.get_data(as_text=True) == 'first\nlast\n'
+        response.close()
+
+        samples = parse_samples(registry.render())
+        assert samples[f'http_requests_total{{{labels}}}'] == 1
+        assert samples[f'http_request_duration_seconds_sum{{{labels}}}'] >= 0.2
+        assert samples['http_requests_in_flight'] == 0
+
+
+class TestMetricsEndpoint:
+    """Tests for request recording through the app"""
+
+    def test_requests_recorded_by_route(self, client):
+        """Test that requests are labelled with the URL rule and status."""
+        labels = 'endpoint="/api/ml/symptoms/<disease>",method="GET",status="200"'
+        before = parse_samples(client.get('/metrics').get_data(as_text=True))
+        client.get('/api/ml/symptoms/diabetes')
+        client.get('/api/ml/symptoms/influenza')
+        # Streamed bodies (werkzeug's 404 page among them) are recorded once closed
+        client.get('/no-such-page').close()
+
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        samples = parse_samples(response.get_data(as_text=True))
+        assert samples[f'http_requests_total{{{labels}}}'] - before.get(f'http_requests_total{{{labels}}}', 0) == 2
+        assert samples['http_requests_total{endpoint="unmatched",method="GET",status="404"}'] >= 1
+        # Only the scrape itself is in flight (as it was for the first scrape)
+        assert samples['http_requests_in_flight'] == before['http_requests_in_flight']
+
+    def test_cache_and_write_queue_metrics(self, client):
+        """Test that cache ratios and write queue depth are exported."""
+        payload = {'disease': 'diabetes', 'symptoms': ['fatigue'], 'age': 40}
+        client.post('/api/ml/predict', json=payload)
+        client.post('/api/ml/predict', json=payload)
+
+        samples = parse_samples(client.get('/metrics').get_data(as_text=True))
+        assert 0 < samples['cache_hit_ratio{cache="prediction"}'] <= 1
+        assert 'prediction_write_queue_depth' in samples
+        assert 'prediction_writes_total{result="flushed"}' in samples
+        assert 'prediction_write_overflow_total' in samples
+
+    def test_global_registry_is_used(self, client):
+        """Test that the app records into the module-level registry."""
+        client.get('/help')
+        assert any(sample.startswith('http_requests_total{endpoint="/help"')
+                   for sample in metrics.snapshot()['http_requests_total']['samples'])
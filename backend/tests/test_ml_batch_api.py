@@ -0,0 +1,101 @@
+"""
+Tests for the /api/ml/predict-batch NDJSON streaming endpoint.
+"""
+
+import json
+
+import pytest
+
+from backend.middleware.security import rate_limiter
+from backend.models.prediction import PredictionHistory
+
+
+@pytest.fixture
+def app_config():
+    """Write predictions on the request so tests can read them back at once."""
+    return {'PREDICTION_WRITE_BEHIND': False}
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    """Give every test a fresh rate limit window."""
+    rate_limiter.reset()
+    yield
+    rate_limiter.reset()
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+class TestPredictBatchAPI:
+    """Tests for the batch prediction endpoint"""
+
+    def test_matches_single_predictions(self, client):
+        """Test that each batch line equals the /api/ml/predict response."""
+        items = [
+            {'disease': 'diabetes', 'symptoms': ['increased_thirst', 'fatigue'], 'age': 60},
+            {'disease': 'Influenza', 'symptoms': ['fever', 'chills']},
+        ]
+        response = client.post('/api/ml/predict-batch', json=items)
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        lines = read_ndjson(response)
+        assert [line['index'] for line in lines] == [0, 1]
+        for item, line in zip(items, lines):
+            single = client.post('/api/ml/predict', json=item).get_json()
+            for field in ('disease', 'ml_prediction', 'bayesian_analysis', 'risk_assessment', 'model_version'):
+                assert line[field] == single[field]
+
+    def test_item_errors_do_not_fail_batch(self, client):
+        """Test that invalid items are reported per line."""
+        items = [
+            {'disease': 'diabetes', 'symptoms': ['fatigue']},
+            {'disease': 'not_a_disease', 'symptoms': ['fever']},
+            {'disease': 'influenza'},
+            'not an object',
+        ]
+        lines = read_ndjson(client.post('/api/ml/predict-batch', json=items))
+
+        assert [line['success'] for line in lines] == [True, False, False, False]
+        assert 'not found' in lines[1]['error']
+        assert lines[2]['error'] == 'No symptoms provided'
+
+    def test_ndjson_body(self, client):
+        """Test that an NDJSON body is accepted, including undecodable lines."""
+        body = json.dumps({'disease': 'influenza', 'symptoms': ['fever']}) + '\n{bad json\n'
+        response = client.post('/api/ml/predict-batch', data=body, content_type='application/x-ndjson')
+
+        lines = read_ndjson(response)
+        assert lines[0]['success'] is True
+        assert lines[1] == {'index': 1, 'success': False, 'error': 'Item must be a JSON object'}
+
+    def test_successful_items_saved(self, client, app):
+        """Test that scored items are stored in prediction history."""
+        with app.app_context():
+            before = PredictionHistory.query.count()
+        items = [{'disease': 'diabetes', 'symptoms': ['fatigue']}] * 3 + [{'disease': 'nope', 'symptoms': ['x']}]
+        read_ndjson(client.post('/api/ml/predict-batch', json=items))
+
+        with app.app_context():
+            assert PredictionHistory.query.count() == before + 3
+
+    def test_rejects_bad_bodies(self, client):
+        """Test body-level validation."""
+        assert client.post('/api/ml/predict-batch', json={'disease': 'diabetes'}).status_code == 400
+        assert client.post('/api/ml/predict-batch', json=[]).status_code == 400
+        too_many = [{'disease': 'diabetes', 'symptoms': ['fatigue']}] * 501
+        assert client.post('/api/ml/predict-batch', json=too_many).status_code == 413
+
+    def test_rate_limit_counts_items(self, client):
+        """Test that the rate limit is charged per item."""
+        batch = [{'disease': 'diabetes', 'symptoms': ['fatigue']}] * 400
+        first = client.post('/api/ml/predict-batch', json=batch)
+        assert first.headers['X-RateLimit-Remaining'] == '600'
+        read_ndjson(first)
+        assert client.post('/api/ml/predict-batch', json=batch).status_code == 200
+
+        response = client.post('/api/ml/predict-batch', json=batch)
+        assert response.status_code == 429
+        assert int(response.headers['Retry-After']) > 0
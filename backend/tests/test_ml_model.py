@@ -0,0 +1,356 @@
+"""
+Tests for the DiseaseMLModel prediction engine.
+Tests the compiled weight matrix against the per-disease scoring path.
+"""
+
+import csv
+import json
+import os
+import numpy as np
+import pytest
+from backend.models.ml_model import DiseaseMLModel, HotReloadingModel
+
+
+@pytest.fixture
+def model():
+    """Create a fresh model instance."""
+    return DiseaseMLModel()
+
+
+class TestCompiledWeights:
+    """Tests for the dense disease x symptom matrix."""
+
+    def test_matrix_shape(self, model):
+        """Test that the matrix has one row per disease and one column per symptom."""
+        assert model.weight_matrix.shape == (len(model.disease_weights), len(model.symptom_index))
+        assert model.bias_vector.shape == (len(model.disease_weights),)
+
+    def test_matrix_matches_weights(self, model):
+        """Test that every weight lands in the right cell."""
+        for row, disease in enumerate(model.disease_index):
+            data = model.disease_weights[disease]
+            assert model.bias_vector[row] == data['bias']
+            for symptom, weight in data['symptoms'].items():
+                assert model.weight_matrix[row, model.symptom_index[symptom]] == weight
+
+
+class TestPredictMultipleDiseases:
+    """Tests for the vectorized differential diagnosis."""
+
+    @pytest.mark.parametrize("symptoms", [
+        ['fever', 'cough', 'fatigue'],
+        ['chest_pain', 'shortness_breath', 'nausea', 'cold_sweat'],
+        ['fever', 'fever', 'unknown_symptom'],
+        ['not_a_symptom'],
+    ])
+    def test_matches_single_disease_path(self, model, symptoms):
+        """Test that each result equals predict_disease_probability for that disease."""
+        predictions = model.predict_multiple_diseases(symptoms)
+        assert len(predictions) == len(model.disease_weights)
+
+        for pred in predictions:
+            expected = model.predict_disease_probability(pred['disease'], symptoms)
+            assert pred['disease'] == expected['disease']
+            assert pred['raw_probability'] == pytest.approx(expected['raw_probability'], abs=1e-12)
+            assert pred['prior_probability'] == pytest.approx(expected['prior_probability'], abs=1e-12)
+            assert pred['likelihood'] == pytest.approx(expected['likelihood'], abs=1e-12)
+            assert pred['confidence_score'] == pytest.approx(expected['confidence_score'], abs=1e-12)
+            assert pred['symptoms_matched'] == expected['symptoms_matched']
+            assert pred['total_symptoms'] == expected['total_symptoms']
+
+    def test_sorted_by_probability(self, model):
+        """Test that predictions are sorted from most to least likely."""
+        predictions = model.predict_multiple_diseases(['fever', 'chills', 'sweating'])
+        probabilities = [p['raw_probability'] for p in predictions]
+        assert probabilities == sorted(probabilities, reverse=True)
+        assert predictions[0]['disease'] == 'malaria'
+
+    @pytest.mark.parametrize("symptoms", [['fever', 'chills'], ['seizures'], ['nothing']])
+    def test_order_matches_stable_sort(self, model, symptoms):
+        """Test that ranking equals a stable sort of per-disease results."""
+        expected = [model.predict_disease_probability(d, symptoms) for d in model.disease_weights]
+        expected.sort(key=lambda x: x['raw_probability'], reverse=True)
+        predictions = model.predict_multiple_diseases(symptoms)
+        assert [p['disease'] for p in predictions] == [p['disease'] for p in expected]
+
+    @pytest.mark.parametrize("top_k", [1, 3, 10, 500])
+    def test_top_k_is_prefix(self, model, top_k):
+        """Test that top_k returns the head of the full ranking."""
+        symptoms = ['fever', 'headache', 'nausea']
+        full = model.predict_multiple_diseases(symptoms)
+        assert model.predict_multiple_diseases(symptoms, top_k=top_k) == full[:top_k]
+
+    def test_top_k_invalid(self, model):
+        """Test that a non-positive top_k is rejected."""
+        with pytest.raises(ValueError):
+            model.predict_multiple_diseases(['fever'], top_k=0)
+
+
+class TestPredictBatch:
+    """Tests for batch inference over many patients."""
+
+    DISEASES = ['diabetes', 'Heart Disease', 'covid-19', 'malaria', 'diabetes type 2']
+    SYMPTOM_SETS = [
+        ['increased_thirst', 'fatigue'],
+        ['chest_pain', 'nausea', 'chest_pain'],
+        ['fever', 'dry_cough', 'loss_taste_smell'],
+        [],
+        ['unknown'],
+    ]
+    AGES = [60, 15, None, 35, 50]
+
+    def test_matches_single_prediction(self, model):
+        """Test that batch scores equal predict_disease_probability per record."""
+        result = model.predict_batch(self.DISEASES, self.SYMPTOM_SETS, self.AGES)
+
+        for i, (disease, symptoms, age) in enumerate(zip(self.DISEASES, self.SYMPTOM_SETS, self.AGES)):
+            expected = model.predict_disease_probability(disease, symptoms, age=age)
+            assert result['raw_probability'][i] == pytest.approx(expected['raw_probability'], abs=1e-12)
+            assert result['prior_probability'][i] == pytest.approx(expected['prior_probability'], abs=1e-12)
+            assert result['likelihood'][i] == pytest.approx(expected['likelihood'], abs=1e-12)
+            assert result['confidence_score'][i] == pytest.approx(expected['confidence_score'], abs=1e-12)
+            assert result['symptoms_matched'][i] == expected['symptoms_matched']
+            assert result['total_symptoms'][i] == expected['total_symptoms']
+
+    def test_without_ages(self, model):
+        """Test that omitting ages applies no age adjustment."""
+        result = model.predict_batch(['diabetes'], [['fatigue']])
+        expected = model.predict_disease_probability('diabetes', ['fatigue'])
+        assert result['raw_probability'][0] == pytest.approx(expected['raw_probability'], abs=1e-12)
+
+    def test_unknown_disease_strict(self, model):
+        """Test that an unknown disease raises in strict mode."""
+        with pytest.raises(ValueError):
+            model.predict_batch(['not_a_disease'], [['fever']])
+
+    def test_unknown_disease_lenient(self, model):
+        """Test that an unknown disease yields NaN when strict=False."""
+        result = model.predict_batch(['not_a_disease', 'malaria'], [['fever'], ['fever']], strict=False)
+        assert list(result['disease_found']) == [False, True]
+        assert np.isnan(result['raw_probability'][0])
+        assert result['raw_probability'][1] > 0
+
+    def test_multiple_batch_matches_differential(self, model):
+        """Test that batch differential rows equal predict_multiple_diseases."""
+        symptom_sets = [['fever', 'chills'], ['wheezing'], []]
+        result = model.predict_multiple_batch(symptom_sets, chunk_size=2)
+
+        for i, symptoms in enumerate(symptom_sets):
+            expected = {p['disease']: p for p in model.predict_multiple_diseases(symptoms)}
+            for col, disease in enumerate(result['diseases']):
+                assert result['raw_probability'][i, col] == pytest.approx(expected[disease]['raw_probability'], abs=1e-12)
+                assert result['symptoms_matched'][i, col] == expected[disease]['symptoms_matched']
+
+
+class TestDiseaseAliases:
+    """Tests for disease name resolution."""
+
+    @pytest.mark.parametrize("name,key", [
+        ('diabetes', 'diabetes'),
+        ('Heart Disease', 'heart_disease'),
+        ('heart-disease', 'heart_disease'),
+        ('heartdisease', 'heart_disease'),
+        ('Diabetes Type 2', 'diabetes_type_2'),
+        ('COVID-19', 'covid19'),
+        ('HIV/AIDS', 'hiv_aids'),
+        ("Alzheimer's Disease", 'alzheimers_disease'),
+        ('Chronic Obstructive Pulmonary Disease', 'copd'),
+        ('Urinary Tract Infection', 'uti'),
+    ])
+    def test_resolves_alias(self, model, name, key):
+        """Test that display names, separator variants and CSV spellings resolve."""
+        assert model._match_disease_key(name) == key
+        assert model.get_disease_symptoms(name) == model.get_disease_symptoms(key)
+
+    def test_all_csv_diseases_resolve(self, model):
+        """Test that every disease in hospital_data.csv maps to a model key."""
+        csv_path = os.path.join(os.path.dirname(__file__), '..', '..', 'hospital_data.csv')
+        with open(csv_path, newline='', encoding='utf-8') as csvfile:
+            for row in csv.DictReader(csvfile):
+                assert model._match_disease_key(row['Disease']) in model.disease_weights
+
+    def test_unknown_disease_cached(self, model):
+        """Test that misses are cached and still raise."""
+        with pytest.raises(ValueError):
+            model.predict_disease_probability('Not A Disease', ['fever'])
+        assert model._resolved_disease_names['Not A Disease'] == 'not_a_disease'
+        with pytest.raises(ValueError):
+            model.get_symptom_importance('Not A Disease')
+
+
+class TestTableMode:
+    """Tests for precomputed per-disease probability tables."""
+
+    @pytest.fixture
+    def compute_model(self):
+        """Create a model that always computes predictions."""
+        return DiseaseMLModel(table_mode=False)
+
+    @pytest.mark.parametrize("disease", ['diabetes', 'malaria', 'herniated_disc'])
+    @pytest.mark.parametrize("age", [None, 15, 20, 50, 51])
+    def test_matches_compute_mode(self, model, compute_model, disease, age):
+        """Test that every symptom subset matches compute mode."""
+        symptom_keys = list(model.disease_weights[disease]['symptoms'])
+        for mask in range(1 << len(symptom_keys)):
+            symptoms = [s for i, s in enumerate(symptom_keys) if mask & (1 << i)] + ['unrelated']
+            table_result = model.predict_disease_probability(disease, symptoms, age=age)
+            compute_result = compute_model.predict_disease_probability(disease, symptoms, age=age)
+            assert table_result.keys() == compute_result.keys()
+            for key, value in compute_result.items():
+                assert table_result[key] == pytest.approx(value, abs=1e-12)
+
+    def test_repeated_symptom_falls_back(self, model, compute_model):
+        """Test that a repeated symptom is scored by compute mode."""
+        symptoms = ['fever', 'fever', 'chills']
+        assert model._lookup_probability_table('malaria', symptoms, None) is None
+        assert model.predict_disease_probability('malaria', symptoms) == \
+            compute_model.predict_disease_probability('malaria', symptoms)
+
+    def test_tables_cover_small_diseases(self, model):
+        """Test that every disease within the symptom limit has a table."""
+        for disease, data in model.disease_weights.items():
+            assert (disease in model._probability_tables) == (len(data['symptoms']) <= 12)
+
+
+class TestPredictionCache:
+    """Tests for the canonical LRU prediction cache."""
+
+    def test_canonical_key_hits(self, model):
+        """Test that symptom order, unrelated symptoms and age within a bucket share an entry."""
+        first = model.predict_disease_probability('diabetes', ['fatigue', 'increased_thirst'], age=30)
+        second = model.predict_disease_probability('Diabetes', ['increased_thirst', 'fatigue', 'fever'], age=45)
+        stats = model.prediction_cache.stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] == 1
+        assert second['raw_probability'] == first['raw_probability']
+        assert second['disease'] == 'Diabetes'
+        assert second['total_symptoms'] == 3
+
+    def test_age_bucket_separates_entries(self, model):
+        """Test that different age buckets are cached separately."""
+        young = model.predict_disease_probability('diabetes', ['fatigue'], age=15)
+        old = model.predict_disease_probability('diabetes', ['fatigue'], age=70)
+        assert model.prediction_cache.stats()['misses'] == 2
+        assert young['raw_probability'] < old['raw_probability']
+
+    def test_lru_eviction(self):
+        """Test that the cache is bounded."""
+        model = DiseaseMLModel(cache_size=2)
+        for disease in ['diabetes', 'malaria', 'asthma']:
+            model.predict_disease_probability(disease, ['fatigue'])
+        stats = model.prediction_cache.stats()
+        assert stats['size'] == 2
+        assert stats['evictions'] == 1
+
+    def test_update_weights_swaps_model(self, model):
+        """Test that new weights are served by a new model with its own cache."""
+        reloading = HotReloadingModel(model)
+        before = reloading.predict_disease_probability('asthma', ['wheezing'])
+        weights = dict(model.disease_weights)
+        weights['asthma'] = {'symptoms': {'wheezing': 2.0}, 'bias': -1.0}
+        updated = reloading.update_weights(weights)
+
+        after = reloading.predict_disease_probability('asthma', ['wheezing'])
+        assert reloading.current is updated
+        assert after['raw_probability'] != before['raw_probability']
+        assert after['raw_probability'] == pytest.approx(model.sigmoid(1.0))
+        # The old model is left untouched for callers still using it
+        assert model.predict_disease_probability('asthma', ['wheezing']) == before
+        assert len(updated.prediction_cache) == 1
+
+
+class TestModelArtifact:
+    """Tests for exporting and memory-mapping compiled model artifacts."""
+
+    def test_round_trip(self, model, tmp_path):
+        """Test that a loaded artifact predicts exactly like the source model."""
+        model.export_artifact(str(tmp_path))
+        loaded = DiseaseMLModel(artifact_path=str(tmp_path))
+
+        assert isinstance(loaded.weight_matrix, np.memmap)
+        assert loaded.disease_index == model.disease_index
+        assert loaded.symptom_index == model.symptom_index
+        assert loaded.disease_weights == model.disease_weights
+
+        symptoms = ['fever', 'chest_pain', 'fatigue']
+        assert loaded.predict_multiple_diseases(symptoms) == model.predict_multiple_diseases(symptoms)
+        assert loaded.get_disease_symptoms('diabetes') == model.get_disease_symptoms('diabetes')
+        assert loaded.predict_disease_probability('stroke', ['confusion'], age=70) == \
+            model.predict_disease_probability('stroke', ['confusion'], age=70)
+
+    def test_rejects_unknown_version(self, model, tmp_path):
+        """Test that an artifact with a different format version is refused."""
+        model.export_artifact(str(tmp_path))
+        header_path = tmp_path / 'model.json'
+        header = json.loads(header_path.read_text())
+        header['format_version'] = 999
+        header_path.write_text(json.dumps(header))
+
+        with pytest.raises(ValueError):
+            DiseaseMLModel(artifact_path=str(tmp_path))
+
+
+class TestHotReload:
+    """Tests for artifact watching and atomic model swap."""
+
+    def test_version_is_content_hash(self, model, tmp_path):
+        """Test that the version id follows the weights, including through an artifact."""
+        assert model.version == DiseaseMLModel().version
+        model.export_artifact(str(tmp_path))
+        assert DiseaseMLModel(artifact_path=str(tmp_path)).version == model.version
+
+        weights = dict(model.disease_weights)
+        weights['asthma'] = {'symptoms': {'wheezing': 2.0}, 'bias': -1.0}
+        assert DiseaseMLModel(disease_weights=weights).version != model.version
+
+    def test_swaps_on_artifact_change(self, model, tmp_path):
+        """Test that a changed artifact is loaded and swapped in."""
+        reloading = HotReloadingModel(model, artifact_path=str(tmp_path))
+        assert reloading.check_for_update() is False
+
+        # A caller holding the old model keeps using it after the swap
+        old_model = reloading.current
+        weights = dict(model.disease_weights)
+        weights['asthma'] = {'symptoms': {'wheezing': 2.0}, 'bias': -1.0}
+        updated = DiseaseMLModel(disease_weights=weights)
+        updated.export_artifact(str(tmp_path))
+
+        assert reloading.check_for_update() is True
+        assert reloading.current is not old_model
+        assert reloading.version == updated.version
+        assert reloading.predict_disease_probability('asthma', ['wheezing'])['raw_probability'] == \
+            pytest.approx(model.sigmoid(1.0))
+        assert old_model.version == model.version
+        assert reloading.check_for_update() is False
+        assert reloading.get_info()['reload_count'] == 1
+
+    def test_bad_artifact_keeps_current_model(self, model, tmp_path):
+        """Test that a broken artifact does not replace the served model."""
+        reloading = HotReloadingModel(model, artifact_path=str(tmp_path))
+        (tmp_path / 'model.json').write_text('{"format_version": 999}')
+
+        assert reloading.check_for_update() is False
+        assert reloading.current is model
+        assert reloading.get_info()['last_error']
+
+
+class TestLazyModel:
+    """Test that the served model is built on first use"""
+
+    def test_loader_runs_once_on_first_use(self, model, tmp_path):
+        """Test that construction is deferred until an attribute is read."""
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return model
+
+        reloading = HotReloadingModel(artifact_path=str(tmp_path), loader=loader)
+        assert reloading.is_loaded is False
+        assert reloading.check_for_update() is False
+        assert calls == []
+
+        assert reloading.get_available_diseases() == model.get_available_diseases()
+        assert reloading.current is model
+        assert reloading.is_loaded is True
+        assert calls == [1]
@@ -0,0 +1,154 @@
+"""
+Tests for the on-demand request profiler and its admin routes.
+"""
+
+import os
+import pstats
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+from backend.middleware import profiler as profiler_module
+from backend.middleware.profiler import RequestProfiler, request_profiler
+
+TOKEN = 'test-profiler-token'
+
+
+@pytest.fixture
+def app(app, tmp_path, monkeypatch):
+    """The test application with profiling enabled by token."""
+    monkeypatch.setattr(request_profiler, 'token', TOKEN)
+    monkeypatch.setattr(request_profiler, 'report_dir', str(tmp_path))
+    return app
+
+
+def make_app(profiler):
+    app = Flask(__name__)
+    profiler.init_app(app)
+
+    @app.route('/slow')
+    def slow():
+        time.sleep(0.05)
+        return jsonify(ok=True)
+
+    @app.route('/fast')
+    def fast():
+        return jsonify(ok=True)
+
+    return app
+
+
+class TestProfiledRequests:
+    """Tests for selecting and storing profiles"""
+
+    def test_unprofiled_without_token(self, client, tmp_path):
+        """Test that ordinary requests are not profiled."""
+        response = client.get('/api/ml/diseases')
+        assert 'X-Profile-Id' not in response.headers
+        assert os.listdir(tmp_path) == []
+
+    def test_token_request_saves_cprofile_report(self, client, tmp_path):
+        """Test that a token request is profiled and listed by the admin route."""
+        response = client.get('/api/ml/symptoms/diabetes', headers={'X-Profiler-Token': TOKEN})
+        assert response.status_code == 200
+        name = response.headers['X-Profile-Id']
+        assert name.endswith('_api_ml_symptoms_disease_.pstats')
+
+        listing = client.get('/admin/profiles', headers={'X-Profiler-Token': TOKEN}).get_json()
+        report = listing['profiles'][0]
+        assert report['name'] == name
+        assert report['endpoint'] == '/api/ml/symptoms/<disease>'
+        assert report['status'] == 200
+        assert report['mode'] == 'cprofile'
+
+        download = client.get(f'/admin/profiles/{name}', headers={'X-Profiler-Token': TOKEN})
+        assert download.status_code == 200
+        saved = tmp_path / 'download.pstats'
+        saved.write_bytes(download.data)
+        stats = pstats.Stats(str(saved))
+        assert any(func[2] == 'get_disease_symptoms' for func in stats.stats)
+
+    def test_wrong_token_rejected(self, client, tmp_path):
+        """Test that a bad token neither profiles nor opens the admin routes."""
+        response = client.get('/api/ml/diseases', headers={'X-Profiler-Token': 'wrong'})
+        assert 'X-Profile-Id' not in response.headers
+        assert client.get('/admin/profiles', headers={'X-Profiler-Token': 'wrong'}).status_code == 403
+        assert client.get('/admin/profiles').status_code == 403
+
+    def test_download_rejects_unknown_names(self, client):
+        """Test that only stored report files can be downloaded."""
+        headers = {'X-Profiler-Token': TOKEN}
+        assert client.get('/admin/profiles/missing.pstats', headers=headers).status_code == 404
+        assert client.get('/admin/profiles/..%2Fsite.db', headers=headers).status_code == 404
+
+
+class TestProfilerModes:
+    """Tests for the stack sampler, sampling rate and pruning"""
+
+    def test_sampler_writes_collapsed_stacks(self, tmp_path):
+        """Test that sampler mode records wall-clock stacks of the view."""
+        profiler = RequestProfiler(token=TOKEN, report_dir=str(tmp_path), sampler_interval_ms=2)
+        client = make_app(profiler).test_client()
+
+        response = client.get('/slow', headers={'X-Profiler-Token': TOKEN, 'X-Profiler-Mode': 'sampler'})
+        name = response.headers['X-Profile-Id']
+        assert name.endswith('_slow.collapsed')
+
+        lines = (tmp_path / name).read_text().splitlines()
+        assert lines
+        top_stack, count = lines[0].rsplit(' ', 1)
+        assert top_stack.split(';')[-1].startswith('slow (')
+        assert int(count) >= 5
+
+    def test_sample_rate_limited_to_paths(self, tmp_path):
+        """Test that sampling only picks the configured paths."""
+        profiler = RequestProfiler(sample_rate=1.0, paths=['/slow'], report_dir=str(tmp_path))
+        client = make_app(profiler).test_client()
+
+        assert 'X-Profile-Id' not in client.get('/fast').headers
+        assert 'X-Profile-Id' in client.get('/slow').headers
+
+    def test_oldest_reports_pruned(self, tmp_path):
+        """Test that only max_reports reports are kept."""
+        profiler = RequestProfiler(sample_rate=1.0, report_dir=str(tmp_path), max_reports=2)
+        client = make_app(profiler).test_client()
+
+        names = []
+        for _ in range(4):
+            names.append(client.get('/fast').headers['X-Profile-Id'])
+            time.sleep(0.002)
+
+        assert [report['name'] for report in profiler.list_reports()] == names[:1:-1]
+        assert len(os.listdir(tmp_path)) == 4
+
+
+class TestOverlappingProfiles:
+    """Tests for requests that cannot use cProfile"""
+
+    def test_overlapping_request_falls_back_to_sampler(self, tmp_path):
+        """Test that a request overlapping an active cProfile run is sampled."""
+        profiler = RequestProfiler(token=TOKEN, report_dir=str(tmp_path))
+        client = make_app(profiler).test_client()
+
+        with profiler_module._cprofile_lock:
+            response = client.get('/fast', headers={'X-Profiler-Token': TOKEN})
+        assert response.status_code == 200
+        assert response.headers['X-Profile-Id'].endswith('_fast.collapsed')
+
+        response = client.get('/fast', headers={'X-Profiler-Token': TOKEN})
+        assert response.headers['X-Profile-Id'].endswith('_fast.pstats')
+
+    def test_cprofile_failure_does_not_fail_request(self, tmp_path, monkeypatch):
+        """Test that an error starting cProfile falls back to sampling."""
+        class BusyProfile:
+            def enable(self):
+                raise ValueError('Another profiling tool is already active')
+        monkeypatch.setattr(profiler_module.cProfile, 'Profile', BusyProfile)
+        profiler = RequestProfiler(token=TOKEN, report_dir=str(tmp_path))
+        client = make_app(profiler).test_client()
+
+        response = client.get('/fast', headers={'X-Profiler-Token': TOKEN})
+        assert response.status_code == 200
+        assert response.headers['X-Profile-Id'].endswith('.collapsed')
+        assert not profiler_module._cprofile_lock.locked()
@@ -0,0 +1,273 @@
+"""
+Tests for the sliding-window-counter RateLimiter and its stores.
+"""
+
+import multiprocessing
+import socket
+import socketserver
+import threading
+
+import pytest
+
+from backend.middleware.rate_limit_store import (
+    MemoryStore, RateLimitStoreError, RedisConnection, RedisStore, SQLiteStore, create_store
+)
+from backend.middleware.security import RateLimiter
+
+
+class FakeClock:
+    def __init__(self, now=600.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def limiter(clock):
+    return RateLimiter(sweep_interval=60, clock=clock)
+
+
+class TestSlidingWindow:
+    """Tests for limit enforcement"""
+
+    def test_limit_and_remaining(self, limiter):
+        """Test that the limit is enforced and remaining counts down."""
+        results = [limiter.check('client', 'report') for _ in range(11)]
+        assert [allowed for allowed, _, _ in results] == [True] * 10 + [False]
+        assert [remaining for _, _, remaining in results[:3]] == [9, 8, 7]
+        assert results[-1][1] > 0
+
+    def test_previous_window_decays(self, limiter, clock):
+        """Test that the previous window is weighted by its remaining overlap."""
+        for _ in range(10):
+            limiter.check('client', 'report')
+
+        # Halfway through the next window half of the previous count remains
+        clock.now += 90
+        assert [limiter.check('client', 'report')[0] for _ in range(6)] == [True] * 5 + [False]
+
+    def test_retry_after_is_sufficient(self, limiter, clock):
+        """Test that waiting retry_after seconds lets the request through."""
+        for _ in range(10):
+            limiter.check('client', 'report')
+        clock.now += 30
+        allowed, retry_after, _ = limiter.check('client', 'report')
+        assert allowed is False
+
+        clock.now += retry_after
+        assert limiter.check('client', 'report')[0] is True
+
+    def test_cost_counts_units(self, limiter):
+        """Test that a request can consume several units."""
+        assert limiter.check('client', 'batch_prediction', cost=600) == (True, 0, 400)
+        allowed, retry_after, _ = limiter.check('client', 'batch_prediction', cost=600)
+        assert allowed is False
+        assert retry_after > 0
+        assert limiter.check('client', 'batch_prediction', cost=400)[0] is True
+
+    def test_keys_are_independent(self, limiter):
+        """Test that clients and endpoint types have separate budgets."""
+        for _ in range(10):
+            limiter.check('a', 'report')
+        assert limiter.check('a', 'report')[0] is False
+        assert limiter.check('b', 'report')[0] is True
+        assert limiter.check('a', 'prediction')[0] is True
+
+
+class TestEvictionAndStats:
+    """Tests for idle-key eviction and statistics"""
+
+    def test_idle_keys_evicted(self, limiter, clock):
+        """Test that keys idle for two windows are swept."""
+        for i in range(200):
+            limiter.check(f'client-{i}', 'default')
+        assert limiter.get_stats()['tracked_keys'] == 200
+
+        # Active keys survive a sweep
+        clock.now += 60
+        assert limiter.evict_idle() == 0
+
+        # A check sweeps its own stripe; evict_idle sweeps the rest
+        clock.now += 120
+        limiter.check('client-0', 'default')
+        limiter.evict_idle()
+        stats = limiter.get_stats()
+        assert stats['evicted_keys'] == 200
+        assert stats['tracked_keys'] == 1
+
+    def test_stats_counters(self, limiter):
+        """Test allowed/rejected counters."""
+        for _ in range(12):
+            limiter.check('client', 'report')
+        stats = limiter.get_stats()
+        assert stats['total_requests'] == 10
+        assert stats['rejected_requests'] == 2
+
+
+class StandInRedis:
+    """
+    Threaded RESP server implementing the commands RedisStore uses
+    (INCRBY, DECRBY, EXPIRE, GET, DEL, SCAN, SELECT, AUTH, PING).
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.expiries = {}
+        self.lock = threading.Lock()
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def _handler(self):
+        stand_in = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            disable_nagle_algorithm = True
+
+            def handle(self):
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    args = []
+                    for _ in range(int(line[1:])):
+                        length = int(self.rfile.readline()[1:])
+                        args.append(self.rfile.read(length + 2)[:-2])
+                    self.wfile.write(stand_in.execute(args))
+
+        return Handler
+
+    def execute(self, args):
+        command = args[0].upper()
+        with self.lock:
+            if command in (b'INCRBY', b'DECRBY'):
+                delta = int(args[2]) * (1 if command == b'INCRBY' else -1)
+                value = int(self.data.get(args[1], 0)) + delta
+                self.data[args[1]] = str(value).encode()
+                return b':%d\r\n' % value
+            if command == b'EXPIRE':
+                self.expiries[args[1]] = int(args[2])
+                return b':1\r\n'
+            if command == b'GET':
+                value = self.data.get(args[1])
+                return b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+            if command == b'DEL':
+                deleted = sum(self.data.pop(key, None) is not None for key in args[1:])
+                return b':%d\r\n' % deleted
+            if command == b'SCAN':
+                prefix = args[3].rstrip(b'*')
+                keys = [key for key in self.data if key.startswith(prefix)]
+                reply = b'*2\r\n$1\r\n0\r\n*%d\r\n' % len(keys)
+                return reply + b''.join(b'$%d\r\n%s\r\n' % (len(key), key) for key in keys)
+            if command == b'AUTH' and args[1] != b'secret':
+                return b'-ERR invalid password\r\n'
+            if command in (b'SELECT', b'AUTH', b'PING'):
+                return b'+OK\r\n'
+        return b'-ERR unknown command\r\n'
+
+
+@pytest.fixture(scope='module')
+def redis_server():
+    server = StandInRedis()
+    yield server
+    server.server.shutdown()
+
+
+def _check_many(path, identifier, count, results):
+    limiter = RateLimiter(store=SQLiteStore(path))
+    results.put(sum(limiter.check(identifier, 'report')[0] for _ in range(count)))
+
+
+class TestSharedStores:
+    """Tests for the SQLite and Redis stores"""
+
+    def test_sqlite_budget_shared_across_processes(self, tmp_path):
+        """Test that worker processes sharing a SQLite file share one budget."""
+        path = str(tmp_path / 'ratelimit.db')
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=_check_many, args=(path, 'client', 8, results))
+            for _ in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+
+        assert sum(results.get(timeout=5) for _ in workers) == 10
+        assert RateLimiter(store=SQLiteStore(path)).check('client', 'report')[0] is False
+
+    def test_sqlite_sliding_window_and_eviction(self, tmp_path, clock):
+        """Test window decay and idle-key eviction in the SQLite store."""
+        limiter = RateLimiter(store=SQLiteStore(str(tmp_path / 'ratelimit.db')), clock=clock)
+        for _ in range(10):
+            limiter.check('client', 'report')
+        clock.now += 90
+        assert [limiter.check('client', 'report')[0] for _ in range(6)] == [True] * 5 + [False]
+
+        limiter.check('other', 'report')
+        assert limiter.get_stats()['tracked_keys'] == 2
+        clock.now += 240
+        assert limiter.evict_idle() == 2
+
+    def test_redis_store(self, redis_server, clock):
+        """Test that RedisStore enforces and decays the limit through the stand-in server."""
+        store = RedisStore(f"redis://127.0.0.1:{redis_server.port}/0", prefix='test:')
+        limiter = RateLimiter(store=store, clock=clock)
+        results = [limiter.check('client', 'report') for _ in range(11)]
+        assert [allowed for allowed, _, _ in results] == [True] * 10 + [False]
+        assert [remaining for _, _, remaining in results[:3]] == [9, 8, 7]
+
+        # The rejected request was taken back out of the counter
+        assert redis_server.data[b'test:report:client:10'] == b'10'
+        assert redis_server.expiries[b'test:report:client:10'] == 121
+
+        clock.now += 90
+        assert [limiter.check('client', 'report')[0] for _ in range(6)] == [True] * 5 + [False]
+
+        limiter.reset()
+        assert not any(key.startswith(b'test:') for key in redis_server.data)
+
+    def test_redis_error_reply_keeps_pipeline_in_sync(self, redis_server, clock):
+        """Test that an error reply mid-pipeline does not leave later replies for the next check."""
+        store = RedisStore(f"redis://127.0.0.1:{redis_server.port}/0", prefix='sync:')
+        with pytest.raises(RateLimitStoreError):
+            store._pipeline([('INCRBY', 'sync:a', 5), ('BOGUS',), ('GET', 'sync:a')])
+
+        limiter = RateLimiter(store=store, clock=clock)
+        assert [limiter.check('client', 'report')[2] for _ in range(2)] == [9, 8]
+
+    def test_redis_auth_failure(self, redis_server):
+        """Test that a rejected AUTH raises a store error."""
+        with pytest.raises(RateLimitStoreError):
+            RedisConnection('127.0.0.1', redis_server.port, password='wrong')
+        conn = RedisConnection('127.0.0.1', redis_server.port, password='secret')
+        assert conn.execute('PING') == 'OK'
+        conn.close()
+
+    def test_unreachable_store_allows_requests(self, clock):
+        """Test that a store outage allows requests and is counted."""
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        limiter = RateLimiter(store=RedisStore(f"redis://127.0.0.1:{port}/0"), clock=clock)
+
+        assert limiter.check('client', 'report') == (True, 0, 10)
+        assert limiter.get_stats()['store_errors'] == 1
+
+    def test_create_store(self, tmp_path):
+        """Test store selection from RATE_LIMIT_STORE style URLs."""
+        assert isinstance(create_store('memory'), MemoryStore)
+        assert create_store(f"sqlite:///{tmp_path}/rl.db").path == f"{tmp_path}/rl.db"
+        redis_store = create_store('redis://:secret@cache:6380/2')
+        assert (redis_store.host, redis_store.port, redis_store.db, redis_store.password) == \
+            ('cache', 6380, 2, 'secret')
+        with pytest.raises(ValueError):
+            create_store('memcached://localhost')
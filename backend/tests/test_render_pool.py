@@ -0,0 +1,176 @@
+"""
+Tests for the PDF render process pool and its 503/504 responses.
+"""
+
+from functools import partial
+import os
+import threading
+import time
+
+import pytest
+
+from backend.utils.render_pool import RenderPool, RenderPoolBusy, RenderTimeout, pdf_render_pool
+
+
+@pytest.fixture
+def pool():
+    """A one-worker pool without a queue."""
+    pool = RenderPool(workers=1, max_queue=0, timeout=5)
+    yield pool
+    pool.shutdown()
+
+
+class TestRenderPool:
+    """Tests for job execution, back-pressure and timeouts"""
+
+    def test_jobs_run_in_worker_process(self, pool):
+        """Test that jobs run outside the calling process and are timed."""
+        assert pool.render(os.getpid) != os.getpid()
+
+        stats = pool.get_stats()
+        assert stats['rendered'] == 1
+        assert stats['pending'] == 0
+        assert pool.render_histogram()['count'] == 1
+
+    def test_full_queue_rejected(self, pool):
+        """Test that a job beyond workers + max_queue is refused immediately."""
+        pool.render(os.getpid)  # start the worker
+        worker = threading.Thread(target=pool.render, args=(time.sleep, 0.5))
+        worker.start()
+        time.sleep(0.1)
+
+        with pytest.raises(RenderPoolBusy) as excinfo:
+            pool.render(os.getpid)
+        worker.join()
+
+        assert excinfo.value.retry_after >= 1
+        assert pool.get_stats()['rejected'] == 1
+        assert pool.render(os.getpid) != os.getpid()
+
+    def test_timeout_restarts_pool(self, pool):
+        """Test that a hung job times out and frees its slot for the next job."""
+        pool.timeout = 0.3
+        with pytest.raises(RenderTimeout):
+            pool.render(time.sleep, 5)
+
+        pool.timeout = 5
+        assert pool.render(os.getpid) != os.getpid()
+        stats = pool.get_stats()
+        assert stats['timeouts'] == 1
+        assert stats['pending'] == 0
+
+    def test_queue_wait_not_counted_against_timeout(self):
+        """Test that a job waiting for a busy worker gets the full timeout once it runs."""
+        pool = RenderPool(workers=1, max_queue=1, timeout=1.5, queue_timeout=5)
+        try:
+            pool.render(os.getpid)  # start the worker
+            first = threading.Thread(target=pool.render, args=(time.sleep, 1.0))
+            first.start()
+            time.sleep(0.1)
+            started = time.perf_counter()
+            pool.render(time.sleep, 1.0)
+            first.join()
+
+            assert time.perf_counter() - started > 1.5
+            assert pool.get_stats()['timeouts'] == 0
+        finally:
+            pool.shutdown()
+
+    def test_queue_timeout_rejects(self, pool):
+        """Test that a job that cannot get a worker within queue_timeout is refused."""
+        pool.max_queue = 1
+        pool.queue_timeout = 0.2
+        pool.render(os.getpid)
+        worker = threading.Thread(target=pool.render, args=(time.sleep, 1.0))
+        worker.start()
+        time.sleep(0.1)
+
+        with pytest.raises(RenderPoolBusy):
+            pool.render(os.getpid)
+        worker.join()
+        assert pool.get_stats()['rejected'] == 1
+
+    def test_jobs_interrupted_by_restart_are_busy(self):
+        """Test that a job killed by another job's timeout gets RenderPoolBusy, not a crash."""
+        pool = RenderPool(workers=2, max_queue=0, timeout=1.0)
+        try:
+            pool.render(os.getpid)
+            errors = []
+
+            def hung():
+                try:
+                    pool.render(time.sleep, 5)
+                except Exception as e:
+                    errors.append(e)
+            worker = threading.Thread(target=hung)
+            worker.start()
+            time.sleep(0.4)
+
+            # Still running when the hung job's timeout restarts the pool
+            with pytest.raises(RenderPoolBusy):
+                pool.render(time.sleep, 0.9)
+            worker.join()
+
+            assert [type(e) for e in errors] == [RenderTimeout]
+            stats = pool.get_stats()
+            assert (stats['timeouts'], stats['interrupted'], stats['pending']) == (1, 1, 0)
+            assert pool.render(os.getpid) != os.getpid()
+        finally:
+            pool.shutdown()
+
+    def test_stats_not_blocked_by_worker_start(self):
+        """Test that counters stay readable while the workers are starting."""
+        pool = RenderPool(workers=1, max_queue=0, timeout=5, initializer=partial(time.sleep, 1))
+        try:
+            starter = threading.Thread(target=pool.render, args=(os.getpid,))
+            starter.start()
+            time.sleep(0.2)
+
+            started = time.perf_counter()
+            assert pool.get_stats()['pending'] == 1
+            assert time.perf_counter() - started < 0.5
+            starter.join()
+            assert pool.get_stats()['rendered'] == 1
+        finally:
+            pool.shutdown()
+
+    def test_in_process_mode(self):
+        """Test that workers=0 renders in the calling process."""
+        pool = RenderPool(workers=0, max_queue=0)
+        assert pool.render(os.getpid) == os.getpid()
+        assert pool.get_stats()['rendered'] == 1
+
+
+class TestRenderRoutes:
+    """Tests for the PDF routes when rendering is unavailable"""
+
+    def test_busy_returns_503_with_retry_after(self, client, monkeypatch):
+        """Test that a saturated pool turns into 503 Retry-After."""
+        def busy(func, *args):
+            raise RenderPoolBusy(4)
+        monkeypatch.setattr(pdf_render_pool, 'render', busy)
+
+        response = client.post('/download-ml-results', json={'ml_probability': 0.123456})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '4'
+        assert response.get_json()['retry_after'] == 4
+
+    def test_timeout_returns_504(self, client, monkeypatch):
+        """Test that a render timeout turns into 504."""
+        def timeout(func, *args):
+            raise RenderTimeout('too slow')
+        monkeypatch.setattr(pdf_render_pool, 'render', timeout)
+
+        response = client.post('/download-results', json={'prior_probability': 0.654321})
+        assert response.status_code == 504
+
+    def test_pool_metrics_exported(self, client, monkeypatch):
+        """Test that queue depth and render time histogram appear on /metrics."""
+        monkeypatch.setattr(pdf_render_pool, 'workers', 0)
+        assert client.post('/download-ml-results', json={'ml_probability': 0.314159}).status_code == 200
+
+        body = client.get('/metrics').get_data(as_text=True)
+        assert 'pdf_render_queue_depth 0' in body
+        assert '# TYPE pdf_render_duration_seconds histogram' in body
+        assert 'pdf_render_duration_seconds_bucket{le="+Inf"}' in body
+        assert 'pdf_render_duration_seconds_count' in body
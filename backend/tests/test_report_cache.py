@@ -0,0 +1,116 @@
+"""
+Tests for the PDF report cache and the cached download routes.
+"""
+
+import pytest
+
+from backend.utils import pdf_reports
+from backend.utils.report_cache import ReportCache, pdf_report_cache, report_key
+
+ML_PAYLOAD = {
+    'disease_name': 'Diabetes',
+    'ml_probability': 0.42,
+    'prior_probability': 0.1,
+    'likelihood': 0.8,
+    'posterior_probability': 0.64,
+    'risk_level': 'Moderate Risk'
+}
+
+
+@pytest.fixture
+def client(app):
+    """Create a test client with an empty report cache."""
+    pdf_report_cache.clear()
+    return app.test_client()
+
+
+class TestCachedDownloads:
+    """Tests for /download-results and /download-ml-results"""
+
+    def test_repeat_download_served_from_cache(self, client):
+        """Test that the second identical download is a cache hit with the same ETag."""
+        first = client.post('/download-ml-results', json=ML_PAYLOAD)
+        second = client.post('/download-ml-results', json=dict(reversed(list(ML_PAYLOAD.items()))))
+
+        assert first.status_code == 200
+        assert first.mimetype == 'application/pdf'
+        assert first.data.startswith(b'%PDF')
+        assert first.headers['X-Report-Cache'] == 'miss'
+        assert second.headers['X-Report-Cache'] == 'hit'
+        assert second.data == first.data
+        assert second.headers['ETag'] == first.headers['ETag']
+        key = report_key('ml', ML_PAYLOAD, pdf_reports.REPORT_LAYOUT_VERSION)
+        assert first.headers['ETag'] == f'W/"{ReportCache.make_etag(key)}"'
+
+    def test_if_none_match_returns_304(self, client):
+        """Test that a client holding the current ETag gets 304 without a body."""
+        first = client.post('/download-results', json={'prior_probability': 0.01, 'posterior_probability': 0.2})
+        revalidated = client.post(
+            '/download-results',
+            json={'prior_probability': 0.01, 'posterior_probability': 0.2},
+            headers={'If-None-Match': first.headers['ETag']}
+        )
+        assert revalidated.status_code == 304
+        assert revalidated.data == b''
+        assert revalidated.headers['ETag'] == first.headers['ETag']
+
+    def test_different_inputs_render_separately(self, client):
+        """Test that a changed value produces a different report."""
+        first = client.post('/download-ml-results', json=ML_PAYLOAD)
+        second = client.post('/download-ml-results', json={**ML_PAYLOAD, 'posterior_probability': 0.65})
+        assert second.headers['X-Report-Cache'] == 'miss'
+        assert second.headers['ETag'] != first.headers['ETag']
+
+    def test_styles_built_once(self, client):
+        """Test that style objects are reused across renders."""
+        client.post('/download-ml-results', json=ML_PAYLOAD)
+        styles = pdf_reports._styles()
+        client.post('/download-ml-results', json={**ML_PAYLOAD, 'likelihood': 0.5})
+        assert pdf_reports._styles() is styles
+
+
+class TestReportCache:
+    """Tests for the cache tiers"""
+
+    def test_key_ignores_field_order(self):
+        """Test that equal inputs hash equally regardless of order."""
+        assert report_key('ml', {'a': 1, 'b': 2}) == report_key('ml', {'b': 2, 'a': 1})
+        assert report_key('ml', {'a': 1}) != report_key('possibility', {'a': 1})
+        assert report_key('ml', {'a': 1}, version=1) != report_key('ml', {'a': 1}, version=2)
+
+    def test_memory_bounded_by_bytes(self):
+        """Test that least recently used entries are evicted past max_bytes."""
+        cache = ReportCache(max_bytes=250)
+        cache.put('a', b'x' * 100)
+        cache.put('b', b'y' * 100)
+        cache.get('a')
+        cache.put('c', b'z' * 100)
+
+        assert cache.get('b') is None
+        assert cache.get('a')[0] == b'x' * 100
+        stats = cache.stats()
+        assert stats['bytes'] == 200
+        assert stats['evictions'] == 1
+
+    def test_etag_same_across_renders(self):
+        """Test that separate renders of one report (e.g. in two workers) share an ETag."""
+        assert ReportCache().put('k', b'%PDF-render-1')[1] == ReportCache().put('k', b'%PDF-render-2')[1]
+        assert ReportCache().put('k', b'%PDF')[1] != ReportCache().put('j', b'%PDF')[1]
+
+    def test_disk_tier_survives_memory_loss(self, tmp_path):
+        """Test that a disk entry is found after memory is cleared (another worker)."""
+        writer = ReportCache(disk_dir=str(tmp_path))
+        content, etag = writer.put('k', b'%PDF-report')
+
+        reader = ReportCache(disk_dir=str(tmp_path))
+        assert reader.get('k') == (content, etag)
+        assert reader.stats()['disk_hits'] == 1
+        assert reader.get('k') == (content, etag)
+        assert reader.stats()['hits'] == 1
+
+    def test_disk_tier_trimmed(self, tmp_path):
+        """Test that the disk tier keeps within disk_max_bytes."""
+        cache = ReportCache(max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=250)
+        for key in ('a', 'b', 'c'):
+            cache.put(key, b'x' * 100)
+        assert len(list(tmp_path.iterdir())) == 2
@@ -0,0 +1,119 @@
+"""
+Tests for Server-Timing stage instrumentation.
+"""
+
+import json
+
+import pytest
+from flask import Flask, jsonify
+
+from backend.middleware import logger as logger_module
+from backend.middleware.logger import RequestLogger, StructuredLogger
+from backend.middleware.security import rate_limiter
+from backend.utils.server_timing import ServerTiming, server_timing
+
+
+def parse_server_timing(header):
+    """Map stage name -> duration in ms."""
+    stages = {}
+    for part in header.split(','):
+        name, duration = part.strip().split(';dur=')
+        stages[name] = float(duration)
+    return stages
+
+
+@pytest.fixture
+def client(app):
+    """Create a test client."""
+    rate_limiter.reset()
+    return app.test_client()
+
+
+@pytest.fixture
+def timing_enabled():
+    server_timing.enabled = True
+    yield
+    server_timing.enabled = False
+
+
+class TestPredictionStages:
+    """Tests for the stage breakdown of the prediction endpoints"""
+
+    def test_disabled_by_default(self, client):
+        """Test that no header is sent while timing is disabled."""
+        response = client.post('/api/ml/predict', json={'disease': 'diabetes', 'symptoms': ['fatigue']})
+        assert response.status_code == 200
+        assert 'Server-Timing' not in response.headers
+
+    def test_predict_stages(self, client, timing_enabled):
+        """Test that /api/ml/predict reports every pipeline stage."""
+        response = client.post('/api/ml/predict', json={'disease': 'diabetes', 'symptoms': ['fatigue']})
+        assert response.status_code == 200
+
+        stages = parse_server_timing(response.headers['Server-Timing'])
+        assert list(stages) == ['parse', 'model', 'bayes', 'db', 'serialize', 'total']
+        assert stages['total'] >= sum(ms for name, ms in stages.items() if name != 'total')
+
+    def test_predict_multiple_stages(self, client, timing_enabled):
+        """Test that /api/ml/predict-multiple reports its stages."""
+        response = client.post('/api/ml/predict-multiple', json={'symptoms': ['fever', 'cough'], 'top_k': 3})
+        assert response.status_code == 200
+        stages = parse_server_timing(response.headers['Server-Timing'])
+        assert list(stages) == ['parse', 'model', 'bayes', 'serialize', 'total']
+
+    def test_early_return_reports_completed_stages(self, client, timing_enabled):
+        """Test that a validation error still reports the stages that ran."""
+        response = client.post('/api/ml/predict', json={'disease': 'diabetes', 'symptoms': []})
+        assert response.status_code == 400
+        assert list(parse_server_timing(response.headers['Server-Timing'])) == ['parse', 'total']
+
+
+class TestServerTiming:
+    """Tests for spans and logging"""
+
+    def test_disabled_span_is_shared_noop(self):
+        """Test that a disabled span allocates nothing per call."""
+        timing = ServerTiming(enabled=False)
+        assert timing.span('a') is timing.span('b')
+        assert timing.get_timings() is None
+
+    def test_repeated_stages_are_summed(self):
+        """Test that a stage entered twice is reported once."""
+        app = Flask(__name__)
+        timing = ServerTiming(enabled=True)
+        timing.init_app(app)
+
+        @app.route('/twice')
+        def twice():
+            for _ in range(2):
+                with timing.span('db'):
+                    pass
+            return jsonify(stages=timing.get_timings())
+
+        response = app.test_client().get('/twice')
+        assert list(response.get_json()['stages']) == ['db']
+        assert list(parse_server_timing(response.headers['Server-Timing'])) == ['db', 'total']
+
+    def test_stages_folded_into_api_log(self, tmp_path, monkeypatch, timing_enabled):
+        """Test that RequestLogger records include the stage breakdown."""
+        structured = StructuredLogger('test-server-timing', str(tmp_path))
+        monkeypatch.setattr(logger_module, '_global_logger', structured)
+
+        app = Flask(__name__)
+        server_timing.init_app(app)
+        RequestLogger(app)
+
+        @app.route('/staged')
+        def staged():
+            with server_timing.span('model'):
+                pass
+            return jsonify(ok=True)
+
+        app.test_client().get('/staged')
+        structured.flush()
+        structured.stop()
+
+        with open(tmp_path / 'api.log', encoding='utf-8') as api_log:
+            record = json.loads(api_log.readline())
+        assert record['endpoint'] == '/staged'
+        assert list(record['stages_ms']) == ['model']
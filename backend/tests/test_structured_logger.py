@@ -0,0 +1,190 @@
+"""
+Tests for the queue-based StructuredLogger pipeline.
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from backend.middleware import logger as logger_module
+from backend.middleware.logger import GzipRotatingFileHandler, JsonFormatter, StructuredLogger
+
+
+def _record(message):
+    return logging.LogRecord('rotation', logging.INFO, __file__, 1, message, None, None)
+
+
+def _read_json_lines(path):
+    with open(path, encoding='utf-8') as log_file:
+        return [json.loads(line) for line in log_file if line.strip()]
+
+
+@pytest.fixture
+def make_logger(tmp_path):
+    loggers = []
+
+    def factory(**kwargs):
+        logger = StructuredLogger(f"test-{len(loggers)}", str(tmp_path), **kwargs)
+        loggers.append(logger)
+        return logger
+
+    yield factory
+    for logger in loggers:
+        logger.stop()
+
+
+class TestQueuePipeline:
+    """Tests for writing through the QueueListener"""
+
+    def test_records_routed_by_level(self, make_logger, tmp_path):
+        """Test that records reach the file handlers for their level."""
+        logger = make_logger()
+        logger.debug('debug only')
+        logger.info('request', status_code=200)
+        logger.error('failure %s', error_type='ValueError')
+        assert logger.flush()
+
+        assert [entry['message'] for entry in _read_json_lines(tmp_path / 'app.log')] == \
+            ['debug only', 'request', 'failure %s']
+        assert [entry['message'] for entry in _read_json_lines(tmp_path / 'api.log')] == \
+            ['request', 'failure %s']
+        errors = _read_json_lines(tmp_path / 'error.log')
+        assert len(errors) == 1
+        assert errors[0]['error_type'] == 'ValueError'
+
+    def test_exception_survives_queue(self, make_logger, tmp_path):
+        """Test that the traceback is rendered before the record is queued."""
+        logger = make_logger()
+        try:
+            raise ZeroDivisionError('boom')
+        except ZeroDivisionError:
+            logger.logger.exception('failed for %s', 'patient')
+        logger.flush()
+
+        entry = _read_json_lines(tmp_path / 'error.log')[0]
+        assert entry['message'] == 'failed for patient'
+        assert 'ZeroDivisionError: boom' in entry['exception']
+
+    def test_slow_handler_does_not_block_caller(self, make_logger):
+        """Test that logging returns immediately while the writer is stuck."""
+        logger = make_logger()
+        release = threading.Event()
+        original_emit = logger.handlers[1].emit
+        logger.handlers[1].emit = lambda record: (release.wait(5), original_emit(record))
+
+        start = time.perf_counter()
+        for i in range(100):
+            logger.info(f"record {i}")
+        assert time.perf_counter() - start < 0.5
+
+        release.set()
+        assert logger.flush()
+        assert logger.get_stats()['enqueued'] == 100
+
+
+    def test_stop_is_idempotent(self, make_logger):
+        """Test that stop() can run more than once (explicitly and again at exit)."""
+        logger = make_logger()
+        assert logger in logger_module._running_loggers
+        logger.info('last record')
+        logger.stop()
+        logger.stop()
+        assert logger not in logger_module._running_loggers
+        assert logger.get_stats()['queued'] == 0
+
+    def test_counters_exact_under_threads(self, make_logger):
+        """Test that enqueued/dropped add up when many threads log at once."""
+        logger = make_logger(queue_size=50, policy='drop')
+        logger.stop()
+        threads = [threading.Thread(target=lambda: [logger.debug('x') for _ in range(200)]) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = logger.get_stats()
+        assert (stats['enqueued'], stats['dropped']) == (50, 1550)
+
+    def test_global_logger_uses_app_log_dir(self, tmp_path, monkeypatch):
+        """Test that get_logger() writes under the app's LOG_DIR."""
+        monkeypatch.setattr(logger_module, '_global_logger', None)
+        app = Flask(__name__)
+        app.config['LOG_DIR'] = str(tmp_path / 'app-logs')
+        with app.app_context():
+            structured = logger_module.get_logger('test-global')
+        try:
+            assert structured.log_dir == app.config['LOG_DIR']
+            assert (tmp_path / 'app-logs' / 'app.log').exists()
+        finally:
+            structured.stop()
+
+
+class TestOverflowPolicy:
+    """Tests for the full-queue drop and block policies"""
+
+    def test_drop_policy_counts_dropped(self, make_logger):
+        """Test that records beyond the queue size are dropped and counted."""
+        logger = make_logger(queue_size=5, policy='drop')
+        logger.stop()
+
+        for i in range(8):
+            logger.info(f"record {i}")
+        logger.error('lost error')
+
+        stats = logger.get_stats()
+        assert stats['queued'] == 5
+        assert stats['dropped'] == 4
+        assert stats['dropped_by_level'] == {'INFO': 3, 'ERROR': 1}
+
+    def test_block_policy_waits_then_drops(self, make_logger):
+        """Test that the block policy waits block_timeout_ms before dropping."""
+        logger = make_logger(queue_size=1, policy='block', block_timeout_ms=50)
+        logger.stop()
+
+        logger.info('fits')
+        start = time.perf_counter()
+        logger.info('waits and drops')
+        assert time.perf_counter() - start >= 0.05
+        assert logger.get_stats()['dropped'] == 1
+
+    def test_unknown_policy_rejected(self, tmp_path):
+        """Test that an invalid policy is refused."""
+        with pytest.raises(ValueError):
+            StructuredLogger('test-invalid', str(tmp_path), policy='spill')
+
+
+class TestGzipRotation:
+    """Tests for size-based rotation"""
+
+    def test_rotated_files_are_gzipped(self, tmp_path):
+        """Test that rotation compresses backups and keeps backup_count of them."""
+        path = str(tmp_path / 'app.log')
+        handler = GzipRotatingFileHandler(path, maxBytes=200, backupCount=2, check_interval=0)
+        handler.setFormatter(JsonFormatter())
+        for i in range(30):
+            handler.handle(_record(f"line {i:02d} " + 'x' * 40))
+        handler.close()
+
+        assert handler.rotations >= 2
+        assert sorted(os.listdir(tmp_path)) == ['app.log', 'app.log.1.gz', 'app.log.2.gz']
+        with gzip.open(path + '.1.gz', 'rt', encoding='utf-8') as backup:
+            assert json.loads(backup.readline())['message'].startswith('line')
+
+    def test_size_checked_periodically(self, tmp_path):
+        """Test that the file size is not checked again within check_interval."""
+        handler = GzipRotatingFileHandler(str(tmp_path / 'app.log'), maxBytes=10, backupCount=1, check_interval=60)
+        for _ in range(3):
+            handler.handle(_record('x' * 50))
+        assert handler.rotations == 1
+
+        # Once the interval has passed the oversized file is rotated
+        handler._next_check = 0.0
+        handler.handle(_record('x' * 50))
+        handler.close()
+        assert handler.rotations == 2
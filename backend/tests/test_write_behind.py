@@ -0,0 +1,117 @@
+"""
+Tests for the write-behind PredictionHistory queue.
+"""
+
+import time
+
+import pytest
+
+from backend.models.prediction import PredictionHistory, PredictionRollup
+from backend.utils.write_behind import PredictionWriter, prediction_writer
+
+
+def make_row(i=0):
+    return {
+        'disease': 'diabetes',
+        'symptoms': '["fatigue"]',
+        'ml_probability': 0.5,
+        'risk_level': 'low',
+        'patient_age': i
+    }
+
+
+def count_rows(app):
+    with app.app_context():
+        return PredictionHistory.query.count()
+
+
+class TestPredictionWriter:
+    """Tests for queueing, flushing and backpressure"""
+
+    def test_background_flush_by_interval(self, app):
+        """Test that a partial batch is written after the flush interval."""
+        writer = PredictionWriter(batch_size=100, flush_interval_ms=20)
+        writer.init_app(app)
+        before = count_rows(app)
+
+        assert writer.submit_many([make_row(i) for i in range(5)]) == 5
+        deadline = time.monotonic() + 5
+        while writer.get_stats()['flushed'] < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert count_rows(app) == before + 5
+        stats = writer.get_stats()
+        assert stats['enqueued'] == 5
+        assert stats['queued'] == 0
+        writer.stop()
+
+    def test_flush_writes_in_batches(self, app):
+        """Test that flush() writes everything in batch_size inserts."""
+        writer = PredictionWriter(batch_size=10, flush_interval_ms=60000)
+        writer.init_app(app)
+        before = count_rows(app)
+
+        writer.submit_many([make_row(i) for i in range(25)])
+        assert writer.flush(timeout=5) is True
+
+        assert count_rows(app) == before + 25
+        assert writer.get_stats()['flushed'] == 25
+        writer.stop()
+
+    def test_full_queue_writes_on_caller(self, app, monkeypatch):
+        """Test that rows that do not fit in the queue are written by the caller."""
+        writer = PredictionWriter(max_queue=2, block_timeout_ms=0)
+        writer.init_app(app)
+        monkeypatch.setattr(writer, '_ensure_started', lambda: None)
+        before = count_rows(app)
+
+        assert writer.submit_many([make_row(i) for i in range(5)]) == 5
+        stats = writer.get_stats()
+        assert stats['overflow'] == 3
+        assert stats['flushed'] == 3
+        assert stats['queued'] == 2
+        assert count_rows(app) == before + 3
+
+        writer.stop()
+        assert count_rows(app) == before + 5
+
+    def test_bulk_insert_updates_rollup(self, app):
+        """Test that bulk-inserted rows are counted in the dashboard rollup."""
+        writer = PredictionWriter()
+        writer.init_app(app)
+        writer.submit_many([make_row(i) for i in range(3)], synchronous=True)
+
+        with app.app_context():
+            rollup = PredictionRollup.query.filter_by(disease='diabetes', risk_level='low').one()
+            assert rollup.count == 3
+            assert rollup.day == PredictionHistory.query.first().created_at.date()
+
+    def test_synchronous_submit(self, app):
+        """Test that synchronous submits are written before returning."""
+        writer = PredictionWriter()
+        writer.init_app(app)
+        before = count_rows(app)
+
+        assert writer.submit(make_row(), synchronous=True) is True
+        assert count_rows(app) == before + 1
+        assert writer.get_stats()['running'] is False
+
+
+class TestWriteBehindRoute:
+    """Tests for /api/ml/predict with write-behind enabled"""
+
+    def test_prediction_written_by_background_writer(self, app):
+        """Test that a prediction is queued and written once the writer flushes."""
+        app.config['PREDICTION_WRITE_BEHIND'] = True
+        before = count_rows(app)
+
+        response = app.test_client().post('/api/ml/predict', json={
+            'disease': 'diabetes', 'symptoms': ['fatigue', 'increased_thirst'], 'age': 50
+        })
+        assert response.status_code == 200
+        assert prediction_writer.get_stats()['running'] is True
+
+        assert prediction_writer.flush(timeout=5) is True
+        assert count_rows(app) == before + 1
+        with app.app_context():
+            assert PredictionHistory.query.order_by(PredictionHistory.id.desc()).first().patient_age == 50
@@ -0,0 +1,305 @@
+"""
+Streaming multi-patient exports of prediction history.
+
+Rows are consumed one at a time (the caller reads them from the database
+with yield_per) and written out as they arrive, so memory does not grow
+with the number of patients:
+
+    pdf  one multi-page table report, emitted a page at a time
+    zip  a ZIP of per-patient PDF reports, emitted an entry at a time
+"""
+
+from datetime import datetime
+import io
+import json
+import re
+import zipfile
+import zlib
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792  # US Letter, points
+MARGIN = 40
+FONT_SIZE = 8
+LINE_HEIGHT = 12
+
+# (heading, width in points) of the table report; widths add up to the text width
+PREDICTION_COLUMNS = [
+    ('ID', 40), ('Date (UTC)', 80), ('Disease', 90), ('Age', 30),
+    ('ML Prob.', 45), ('Posterior', 50), ('Risk', 50), ('Symptoms', 147),
+]
+
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9_.-]+')
+_ESCAPES = str.maketrans({'\\': '\\\\', '(': '\\(', ')': '\\)', '\r': ' ', '\n': ' '})
+
+
+def _pdf_string(text):
+    """Encode text as a PDF literal string (WinAnsi, unsupported characters replaced)."""
+    text = str(text)
+    if not text.isascii():
+        text = text.encode('cp1252', 'replace').decode('latin-1')
+    return '(' + text.translate(_ESCAPES) + ')'
+
+
+def _fit(text, width):
+    """Truncate text to roughly fit a column (Helvetica averages ~0.5 em per character)."""
+    text = str(text)
+    max_chars = int(width / (FONT_SIZE * 0.5))
+    return text if len(text) <= max_chars else text[:max_chars - 3] + '...'
+
+
+class StreamingTablePdf:
+    """
+    Minimal PDF writer that emits each page of a table as soon as it is full.
+
+    reportlab keeps every page of a document until it is saved; this writer
+    keeps only the byte offsets of the objects already written (for the
+    cross-reference table) and the page object numbers.
+
+    Usage: data = begin(), then add_row() for each row, then end(); every
+    call returns the bytes to send next (possibly empty).
+    """
+
+    def __init__(self, title, columns, subtitle=''):
+        """
+        Args:
+            title: Heading printed on every page and stored as the PDF title
+            columns: List of (heading, width in points)
+            subtitle: Second heading line (e.g. the filters applied)
+        """
+        self.title = title
+        self.columns = columns
+        self.subtitle = subtitle
+        self.rows = 0
+
+        self._position = 0
+        self._offsets = {}  # object number -> byte offset
+        self._next_object = 5  # 1 catalog, 2 page tree, 3 and 4 fonts
+        self._pages = []  # page object numbers
+        self._lines = None  # content operators of the open page
+        self._y = 0
+
+    def _emit(self, data):
+        self._position += len(data)
+        return data
+
+    def _object(self, number, body):
+        self._offsets[number] = self._position
+        return self._emit(f'{number} 0 obj\n'.encode('latin-1') + body + b'\nendobj\n')
+
+    def _allocate(self):
+        number = self._next_object
+        self._next_object += 1
+        return number
+
+    def _text(self, x, text, font='F1', size=FONT_SIZE):
+        self._lines.append(f'BT /{font} {size} Tf {x} {self._y} Td {_pdf_string(text)} Tj ET')
+
+    def _row(self, values, font):
+        # One text object per row; Td moves from column to column
+        parts = [f'BT /{font} {FONT_SIZE} Tf {MARGIN} {self._y} Td']
+        for (_, width), value in zip(self.columns, values):
+            parts.append(f'{_pdf_string(_fit(value, width))} Tj {width} 0 Td')
+        parts.append('ET')
+        self._lines.append(' '.join(parts))
+        self._y -= LINE_HEIGHT
+
+    def begin(self):
+        """Header, catalog and fonts."""
+        return (
+            self._emit(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+            + self._object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+            + self._object(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+            + self._object(4, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold '
+                              b'/Encoding /WinAnsiEncoding >>')
+        )
+
+    def _start_page(self):
+        self._lines = []
+        self._y = PAGE_HEIGHT - MARGIN
+        self._text(MARGIN, self.title, 'F2', 14)
+        self._text(PAGE_WIDTH - MARGIN - 40, f'Page {len(self._pages) + 1}')
+        self._y -= 16
+        if self.subtitle:
+            self._text(MARGIN, self.subtitle)
+            self._y -= LINE_HEIGHT
+        self._y -= 6
+        self._row([heading for heading, _ in self.columns], 'F2')
+        rule_y = self._y + LINE_HEIGHT - 3
+        self._lines.append(f'{MARGIN} {rule_y} m {PAGE_WIDTH - MARGIN} {rule_y} l S')
+
+    def _finish_page(self):
+        """Write the open page (compressed content stream and page object)."""
+        if self._lines is None:
+            return b''
+        content = zlib.compress('\n'.join(self._lines).encode('latin-1'))
+        content_number, page_number = self._allocate(), self._allocate()
+        self._pages.append(page_number)
+        self._lines = None
+        return (
+            self._object(content_number, f'<< /Length {len(content)} /Filter /FlateDecode >>\nstream\n'.encode('latin-1')
+                         + content + b'\nendstream')
+            + self._object(page_number, (
+                f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+                f'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {content_number} 0 R >>'
+            ).encode('latin-1'))
+        )
+
+    def add_row(self, values):
+        """Add a table row; returns the previous page once it is full."""
+        data = b''
+        if self._lines is None or self._y < MARGIN:
+            data = self._finish_page()
+            self._start_page()
+        self._row(values, 'F1')
+        self.rows += 1
+        return data
+
+    def end(self, empty_message='No rows.'):
+        """Last page, page tree, info, cross-reference table and trailer."""
+        if self._lines is None and not self._pages:
+            self._start_page()
+            self._text(MARGIN, empty_message)
+        data = self._finish_page()
+
+        kids = ' '.join(f'{number} 0 R' for number in self._pages)
+        data += self._object(2, f'<< /Type /Pages /Kids [{kids}] /Count {len(self._pages)} >>'.encode('latin-1'))
+        info_number = self._allocate()
+        created = datetime.utcnow().strftime('D:%Y%m%d%H%M%SZ')
+        data += self._object(info_number, (
+            f'<< /Title {_pdf_string(self.title)} /CreationDate ({created}) >>'
+        ).encode('latin-1'))
+
+        xref_offset = self._position
+        size = self._next_object
+        xref = [f'xref\n0 {size}\n', '0000000000 65535 f \n']
+        xref.extend(f'{self._offsets[number]:010d} 00000 n \n' for number in range(1, size))
+        xref.append(f'trailer\n<< /Size {size} /Root 1 0 R /Info {info_number} 0 R >>\n'
+                    f'startxref\n{xref_offset}\n%%EOF\n')
+        return data + self._emit(''.join(xref).encode('latin-1'))
+
+
+def _symptoms_text(symptoms):
+    """Symptoms column value (stored as a JSON list)."""
+    try:
+        symptoms = json.loads(symptoms)
+    except (TypeError, ValueError):
+        return symptoms or ''
+    return ', '.join(str(symptom).replace('_', ' ') for symptom in symptoms)
+
+
+def prediction_fields(row):
+    """
+    Report values of a prediction row.
+
+    Args:
+        row: PredictionHistory instance or row with the same column names
+
+    Returns:
+        Dictionary with id, created_at, disease, patient_age, symptoms,
+        ml_probability, bayesian_posterior, risk_level and model_version
+    """
+    return {
+        'id': row.id,
+        'created_at': row.created_at.strftime('%Y-%m-%d %H:%M') if row.created_at else '',
+        'disease': row.disease,
+        'patient_age': row.patient_age,
+        'symptoms': _symptoms_text(row.symptoms),
+        'ml_probability': row.ml_probability,
+        'bayesian_posterior': row.bayesian_posterior,
+        'risk_level': row.risk_level,
+        'model_version': row.model_version,
+    }
+
+
+def iter_prediction_pdf(rows, subtitle=''):
+    """
+    Stream a table report of predictions.
+
+    Args:
+        rows: Iterable of prediction rows (consumed lazily)
+        subtitle: Description of the filters applied
+
+    Yields:
+        PDF bytes, a page at a time
+    """
+    pdf = StreamingTablePdf('Prediction History Report', PREDICTION_COLUMNS, subtitle)
+    yield pdf.begin()
+    for row in rows:
+        fields = prediction_fields(row)
+        posterior = fields['bayesian_posterior']
+        chunk = pdf.add_row([
+            fields['id'],
+            fields['created_at'],
+            fields['disease'],
+            fields['patient_age'] if fields['patient_age'] is not None else '-',
+            f"{fields['ml_probability']:.1%}",
+            f"{posterior:.4f}" if posterior is not None else '-',
+            fields['risk_level'],
+            fields['symptoms'],
+        ])
+        if chunk:
+            yield chunk
+    yield pdf.end('No predictions match the selected filters.')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable file that collects written bytes until they are drained."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_prediction_zip(rows, render):
+    """
+    Stream a ZIP with one PDF report per prediction.
+
+    zipfile writes to the unseekable sink using data descriptors, so each
+    entry can be sent as soon as it is compressed; only the small central
+    directory records are kept until the end.
+
+    The response has already started when a report fails to render (e.g.
+    a render timeout), so the export stops there: an EXPORT_ERROR.txt entry
+    explains what is missing and the archive is still closed properly.
+
+    Args:
+        rows: Iterable of prediction rows (consumed lazily)
+        render: Callable turning prediction_fields() into PDF bytes
+
+    Yields:
+        ZIP bytes, an entry at a time
+    """
+    sink = _ChunkSink()
+    exported = 0
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for row in rows:
+            fields = prediction_fields(row)
+            try:
+                content = render(fields)
+            except Exception as e:
+                print(f"⚠️ Export stopped at prediction {fields['id']}: {e}")
+                archive.writestr('EXPORT_ERROR.txt', (
+                    f"The export stopped after {exported} reports because the report for "
+                    f"prediction {fields['id']} could not be rendered ({type(e).__name__}: {e}).\n"
+                    f"Narrow the filters or try again later.\n"
+                ))
+                break
+            slug = _UNSAFE_CHARS.sub('_', fields['disease']).strip('_') or 'prediction'
+            created = row.created_at or datetime.utcnow()
+            info = zipfile.ZipInfo(f"prediction_{fields['id']}_{slug}.pdf", created.timetuple()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, content)
+            exported += 1
+            yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,337 @@
+"""
+Parallel batch scoring of patient files through the ML model and BayesCalculator.
+
+Reads a CSV or NDJSON file of patient records, scores fixed-size chunks on a
+process pool and writes the results in input order:
+
+    python -m backend.utils.batch_scoring patients.csv scored.ndjson --workers 32
+
+Input records have a disease, symptoms, an optional age and optional test
+results (sensitivity, specificity, test_result). In CSV files symptoms are
+separated by ';' or '|' (a JSON list also works); in NDJSON they are a list.
+Rows that cannot be scored get an 'error' value instead of failing the run.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sys
+import time
+
+from backend.models.ml_model import ml_model
+from backend.utils.calculator import BayesCalculator
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# False positive rate used by the API routes for the symptom Bayes step
+SYMPTOM_FALSE_POSITIVE_RATE = 0.05
+
+OUTPUT_FIELDS = [
+    'row', 'disease', 'disease_key', 'age', 'symptoms_matched', 'total_symptoms',
+    'ml_probability', 'prior_probability', 'likelihood', 'posterior',
+    'confidence_score', 'test_result', 'test_posterior', 'model_version', 'error'
+]
+
+_SYMPTOM_SEPARATORS = re.compile(r'[;|]')
+
+
+def _detect_format(path, fmt=None):
+    """Return 'csv' or 'ndjson' from an explicit format or the file extension."""
+    if fmt:
+        return fmt
+    return 'ndjson' if os.path.splitext(path)[1].lower() in ('.ndjson', '.jsonl', '.json') else 'csv'
+
+
+def _normalize_symptom(symptom):
+    return str(symptom).strip().lower().replace(' ', '_')
+
+
+def _parse_symptoms(value):
+    """Symptom list from a list, a JSON list string or a ';'/'|' separated string."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith('['):
+            value = json.loads(value)
+        else:
+            value = _SYMPTOM_SEPARATORS.split(value)
+    return [_normalize_symptom(symptom) for symptom in value if str(symptom).strip()]
+
+
+def _parse_optional_float(value, name):
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be numeric, got {value!r}")
+
+
+def _parse_record(record):
+    """
+    Validate one input record.
+
+    Returns:
+        Tuple of (disease, symptoms, age, sensitivity, specificity, test_result)
+    """
+    disease = record.get('disease')
+    if not disease:
+        raise ValueError("disease is required")
+    if not isinstance(disease, str):
+        raise ValueError(f"disease must be a string, got {type(disease).__name__}")
+    raw_symptoms = record.get('symptoms')
+    if raw_symptoms is not None and not isinstance(raw_symptoms, (list, str)):
+        raise ValueError(f"symptoms must be a list or a string, got {type(raw_symptoms).__name__}")
+    symptoms = _parse_symptoms(raw_symptoms)
+    if not symptoms:
+        raise ValueError("symptoms are required")
+
+    age = _parse_optional_float(record.get('age'), 'age')
+    sensitivity = _parse_optional_float(record.get('sensitivity'), 'sensitivity')
+    specificity = _parse_optional_float(record.get('specificity'), 'specificity')
+    test_result = record.get('test_result') or None
+    if test_result is not None:
+        test_result = str(test_result).strip().lower()
+        if test_result not in ('positive', 'negative'):
+            raise ValueError(f"test_result must be 'positive' or 'negative', got {test_result!r}")
+        if sensitivity is None or specificity is None:
+            raise ValueError("sensitivity and specificity are required with test_result")
+    return disease, symptoms, age, sensitivity, specificity, test_result
+
+
+def _decode_chunk(input_format, header, lines):
+    """Turn raw CSV rows or NDJSON lines into record dicts (None when undecodable)."""
+    if input_format == 'csv':
+        return [dict(zip(header, row)) for row in lines]
+    records = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        records.append(record if isinstance(record, dict) else None)
+    return records
+
+
+def score_records(records, model=None):
+    """
+    Score a list of record dicts.
+
+    Valid records are scored with one predict_batch call and one vectorized
+    Bayes step; invalid ones get an 'error' value.
+
+    Args:
+        records: Record dicts (None entries are reported as undecodable)
+        model: DiseaseMLModel to use (default: the served ml_model)
+
+    Returns:
+        List of result dicts with OUTPUT_FIELDS keys (without 'row')
+    """
+    model = model or ml_model.current
+    calculator = BayesCalculator()
+
+    results = [None] * len(records)
+    parsed = []
+    positions = []
+    for i, record in enumerate(records):
+        if record is None:
+            results[i] = {'error': 'Invalid record'}
+            continue
+        try:
+            parsed.append(_parse_record(record))
+            positions.append(i)
+        except (ValueError, TypeError) as e:
+            results[i] = {'disease': record.get('disease'), 'error': str(e)}
+
+    if parsed:
+        diseases, symptom_sets, ages, sensitivities, specificities, test_results = zip(*parsed)
+        batch = model.predict_batch(diseases, symptom_sets, ages=ages, strict=False)
+        bayesian = calculator.calculate_posterior_batch(
+            batch['prior_probability'], batch['likelihood'], SYMPTOM_FALSE_POSITIVE_RATE
+        )
+
+        # Chain the lab test on top of the symptom posterior where one was given
+        with_test = [j for j, result in enumerate(test_results) if result is not None]
+        test_posteriors = {}
+        if with_test:
+            tested = calculator.calculate_with_test_result_batch(
+                bayesian['posterior'][with_test],
+                [sensitivities[j] for j in with_test],
+                [specificities[j] for j in with_test],
+                [test_results[j] for j in with_test]
+            )
+            test_posteriors = dict(zip(with_test, tested['posterior'].tolist()))
+
+        columns = {
+            name: batch[name].tolist() for name in
+            ('disease_found', 'symptoms_matched', 'total_symptoms', 'raw_probability',
+             'prior_probability', 'likelihood', 'confidence_score')
+        }
+        posteriors = bayesian['posterior'].tolist()
+        for j, i in enumerate(positions):
+            if not columns['disease_found'][j]:
+                results[i] = {'disease': diseases[j], 'error': f"Disease '{diseases[j]}' not found in model"}
+                continue
+            results[i] = {
+                'disease': diseases[j],
+                'disease_key': batch['disease_key'][j],
+                'age': ages[j],
+                'symptoms_matched': columns['symptoms_matched'][j],
+                'total_symptoms': columns['total_symptoms'][j],
+                'ml_probability': columns['raw_probability'][j],
+                'prior_probability': columns['prior_probability'][j],
+                'likelihood': columns['likelihood'][j],
+                'posterior': posteriors[j],
+                'confidence_score': columns['confidence_score'][j],
+                'test_result': test_results[j],
+                'test_posterior': test_posteriors.get(j),
+                'model_version': model.version
+            }
+    return results
+
+
+def _format_results(results, first_row, output_format):
+    """Serialize results to CSV rows or NDJSON lines."""
+    buffer = io.StringIO()
+    if output_format == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=OUTPUT_FIELDS, lineterminator='\n')
+        for offset, result in enumerate(results):
+            writer.writerow({'row': first_row + offset, **result})
+    else:
+        for offset, result in enumerate(results):
+            buffer.write(json.dumps({'row': first_row + offset, **result}))
+            buffer.write('\n')
+    return buffer.getvalue()
+
+
+def _score_chunk(task):
+    """
+    Worker entry point: decode, score and serialize one chunk.
+
+    Returns:
+        Tuple of (output text, rows, rows with errors)
+    """
+    input_format, header, lines, first_row, output_format = task
+    results = score_records(_decode_chunk(input_format, header, lines))
+    errors = sum(1 for result in results if result.get('error'))
+    return _format_results(results, first_row, output_format), len(results), errors
+
+
+def _iter_chunks(input_file, input_format, chunk_size):
+    """Yield (header, raw rows, first row number) without decoding records."""
+    if input_format == 'csv':
+        reader = csv.reader(input_file)
+        header = next(reader, None)
+        source = reader
+    else:
+        header = None
+        source = (line for line in input_file if line.strip())
+
+    chunk = []
+    first_row = 0
+    for line in source:
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield header, chunk, first_row
+            first_row += len(chunk)
+            chunk = []
+    if chunk:
+        yield header, chunk, first_row
+
+
+def score_file(input_path, output_path, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+               input_format=None, output_format=None):
+    """
+    Score a patient file on a process pool, writing results in input order.
+
+    At most two chunks per worker are in flight, so memory stays bounded
+    regardless of file size.
+
+    Args:
+        input_path: CSV or NDJSON file of patient records
+        output_path: Output file (.csv or .ndjson)
+        workers: Number of worker processes (default: CPU count; 1 scores in-process)
+        chunk_size: Records per chunk
+        input_format: 'csv' or 'ndjson' (default: from the file extension)
+        output_format: 'csv' or 'ndjson' (default: from the file extension)
+
+    Returns:
+        Dictionary with rows, errors, seconds and rows_per_sec
+    """
+    workers = workers or os.cpu_count() or 1
+    input_format = _detect_format(input_path, input_format)
+    output_format = _detect_format(output_path, output_format)
+
+    rows = 0
+    errors = 0
+    start = time.perf_counter()
+
+    with open(input_path, newline='', encoding='utf-8') as input_file, \
+            open(output_path, 'w', newline='', encoding='utf-8') as output_file:
+        if output_format == 'csv':
+            output_file.write(','.join(OUTPUT_FIELDS) + '\n')
+
+        tasks = (
+            (input_format, header, lines, first_row, output_format)
+            for header, lines, first_row in _iter_chunks(input_file, input_format, chunk_size)
+        )
+
+        def write(result):
+            nonlocal rows, errors
+            text, chunk_rows, chunk_errors = result
+            output_file.write(text)
+            rows += chunk_rows
+            errors += chunk_errors
+
+        if workers == 1:
+            for task in tasks:
+                write(_score_chunk(task))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = deque()
+                for task in tasks:
+                    pending.append(executor.submit(_score_chunk, task))
+                    if len(pending) >= workers * 2:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+
+    seconds = time.perf_counter() - start
+    rows_per_sec = rows / seconds if seconds > 0 else 0.0
+    print(f"Scored {rows} row(s) ({errors} with errors) in {seconds:.2f}s "
+          f"with {workers} worker(s) ({rows_per_sec:,.0f} rows/sec)")
+
+    return {
+        'rows': rows,
+        'errors': errors,
+        'seconds': seconds,
+        'rows_per_sec': rows_per_sec
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV/NDJSON patient file with the disease model")
+    parser.add_argument('input', help="Input CSV or NDJSON file")
+    parser.add_argument('output', help="Output CSV or NDJSON file")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Records per chunk")
+    parser.add_argument('--input-format', choices=('csv', 'ndjson'), help="Override input format detection")
+    parser.add_argument('--output-format', choices=('csv', 'ndjson'), help="Override output format detection")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size < 1 or (args.workers is not None and args.workers < 1):
+        parser.error("--workers and --chunk-size must be positive")
+
+    score_file(args.input, args.output, workers=args.workers, chunk_size=args.chunk_size,
+               input_format=args.input_format, output_format=args.output_format)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
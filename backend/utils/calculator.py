@@ -1,4 +1,5 @@
 import csv
+import numpy as np
 
 def bayesian_survival(prevalence, sensitivity, false_positive):
     """
@@ -47,6 +48,44 @@ def display_results(results):
 # NEW: BayesCalculator Class for ML Integration
 # ============================================================================
 
+# Record layouts returned by the array-aware BayesCalculator methods
+POSTERIOR_DTYPE = np.dtype([
+    ('prior', 'f8'),
+    ('likelihood', 'f8'),
+    ('posterior', 'f8'),
+    ('false_positive_rate', 'f8')
+])
+
+TEST_RESULT_DTYPE = np.dtype([
+    ('prior', 'f8'),
+    ('sensitivity', 'f8'),
+    ('specificity', 'f8'),
+    ('false_positive_rate', 'f8'),
+    ('posterior', 'f8'),
+    ('test_result', 'U8')
+])
+
+
+def _clamp_array(values):
+    """
+    Convert to a float array clamped to [0, 1].
+    fmin/fmax match max(0.0, min(1.0, x)) exactly, including NaN -> 1.0.
+    """
+    values = np.asarray(values)
+    # float(None) raises, but a None in an object array would silently become NaN
+    if values.dtype == object and any(value is None for value in values.flat):
+        raise ValueError(f"Non-numeric input provided")
+    try:
+        values = values.astype(np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(f"Non-numeric input provided")
+    return np.fmax(0.0, np.fmin(1.0, values))
+
+
+def _safe_divide(numerator, denominator):
+    """Elementwise numerator / denominator, 0.0 where the denominator is 0."""
+    return np.divide(numerator, denominator, out=np.zeros_like(denominator), where=denominator != 0)
+
 class BayesCalculator:
     """
     Bayesian probability calculator for disease prediction.
@@ -147,6 +186,79 @@ class BayesCalculator:
             'test_result': test_result
         }
 
+    def calculate_posterior_batch(self, prior, likelihood, false_positive_rate=0.05):
+        """
+        Array version of calculate_posterior.
+
+        Inputs may be arrays or scalars and are broadcast against each other.
+        Clamping and the zero-denominator rule match the scalar method.
+
+        Args:
+            prior: Prior probabilities (0-1)
+            likelihood: P(symptoms|disease) values (0-1)
+            false_positive_rate: P(symptoms|no disease) values (0-1)
+
+        Returns:
+            Structured array (POSTERIOR_DTYPE) with prior, likelihood,
+            posterior and false_positive_rate fields
+        """
+        prior, likelihood, false_positive_rate = np.broadcast_arrays(
+            _clamp_array(prior), _clamp_array(likelihood), _clamp_array(false_positive_rate)
+        )
+
+        numerator = likelihood * prior
+        denominator = numerator + (false_positive_rate * (1 - prior))
+
+        results = np.empty(prior.shape, dtype=POSTERIOR_DTYPE)
+        results['prior'] = prior
+        results['likelihood'] = likelihood
+        results['posterior'] = _safe_divide(numerator, denominator)
+        results['false_positive_rate'] = false_positive_rate
+        return results
+
+    def calculate_with_test_result_batch(self, prior, sensitivity, specificity, test_result='positive'):
+        """
+        Array version of calculate_with_test_result.
+
+        Inputs may be arrays or scalars and are broadcast against each other.
+        Clamping and the zero-denominator rule match the scalar method.
+
+        Args:
+            prior: Prior probabilities of disease (0-1)
+            sensitivity: True positive rates (0-1)
+            specificity: True negative rates (0-1)
+            test_result: 'positive'/'negative' strings or booleans (True = positive)
+
+        Returns:
+            Structured array (TEST_RESULT_DTYPE) with prior, sensitivity,
+            specificity, false_positive_rate, posterior and test_result fields
+        """
+        test_result = np.asarray(test_result)
+        if test_result.dtype.kind == 'b':
+            positive = test_result
+        else:
+            positive = np.char.lower(test_result.astype(str)) == 'positive'
+
+        prior, sensitivity, specificity, positive = np.broadcast_arrays(
+            _clamp_array(prior), _clamp_array(sensitivity), _clamp_array(specificity), positive
+        )
+
+        false_positive_rate = 1 - specificity
+
+        # P(D|+) = P(+|D) * P(D) / [P(+|D) * P(D) + P(+|~D) * P(~D)]
+        # P(D|-) = P(-|D) * P(D) / [P(-|D) * P(D) + P(-|~D) * P(~D)]
+        numerator = np.where(positive, sensitivity, 1 - sensitivity) * prior
+        denominator = numerator + (np.where(positive, false_positive_rate, specificity) * (1 - prior))
+
+        results = np.empty(prior.shape, dtype=TEST_RESULT_DTYPE)
+        results['prior'] = prior
+        results['sensitivity'] = sensitivity
+        results['specificity'] = specificity
+        results['false_positive_rate'] = false_positive_rate
+        results['posterior'] = _safe_divide(numerator, denominator)
+        results['test_result'] = np.where(positive, 'positive', 'negative')
+        return results
+
 
 if __name__ == "__main__":
     data_file = 'C:\\Users\\Vansh\\Desktop\\October\\Projects\\disease_refactor\\hospital_data.csv'
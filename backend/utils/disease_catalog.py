@@ -0,0 +1,136 @@
+"""
+In-memory catalog of hospital_data.csv for the Bayesian calculator.
+Parsed once into a case-insensitive index with the positive-test posterior
+precomputed, and reloaded only when the file's mtime or size changes.
+"""
+
+import csv
+import os
+import threading
+import time
+
+from backend.utils.calculator import bayesian_survival
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_CATALOG_PATH = os.path.join(PROJECT_ROOT, "hospital_data.csv")
+
+
+class DiseaseCatalog:
+    """
+    Case-insensitive disease -> preset lookup backed by a CSV file.
+
+    Each load builds a new (names, index) snapshot and publishes it with a
+    single reference assignment, so readers never see a half-built catalog
+    and lookups take no lock.
+    """
+
+    def __init__(self, csv_path=DEFAULT_CATALOG_PATH, check_interval=1.0):
+        """
+        Args:
+            csv_path: Path to the hospital data CSV
+            check_interval: Minimum seconds between file change checks
+        """
+        self.csv_path = csv_path
+        self.check_interval = check_interval
+        self.available = False
+        self.reload_count = 0
+
+        self._snapshot = ([], {})
+        self._signature = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def _file_signature(self):
+        """(mtime, size) of the CSV, or None when missing."""
+        try:
+            stat = os.stat(self.csv_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _parse(self):
+        """
+        Parse the CSV into (names in file order, lowercased name -> preset).
+        Rows with non-numeric values are listed but have no preset.
+        """
+        names = []
+        index = {}
+        with open(self.csv_path, newline="", encoding='utf-8') as csvfile:
+            for row in csv.DictReader(csvfile):
+                name = row["Disease"]
+                names.append(name)
+                key = name.lower()
+                if key in index:
+                    continue
+                try:
+                    prior = float(row["Prevalence"])
+                    sensitivity = float(row["Sensitivity"])
+                    false_pos = float(row["FalsePositive"])
+                    p_d_given_pos = bayesian_survival(prior, sensitivity, false_pos)
+                except (TypeError, ValueError, ZeroDivisionError):
+                    print(f"Warning: Skipping invalid row for '{name}' in {self.csv_path}")
+                    continue
+                index[key] = {
+                    "p_d_given_pos": round(p_d_given_pos, 4),
+                    "prior": prior,
+                    "sensitivity": sensitivity,
+                    "falsePositive": false_pos
+                }
+        return names, index
+
+    def refresh(self, force=False):
+        """
+        Reload the CSV if its mtime/size changed.
+
+        Checks the file at most once per check_interval unless force is set.
+
+        Returns:
+            True when a new snapshot was loaded
+        """
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return False
+
+        with self._lock:
+            self._next_check = now + self.check_interval
+            signature = self._file_signature()
+            if signature == self._signature and not force:
+                return False
+
+            if signature is None:
+                print(f"Error: hospital_data.csv not found at {self.csv_path}")
+                self._snapshot = ([], {})
+                self.available = False
+            else:
+                try:
+                    snapshot = self._parse()
+                except Exception as e:
+                    # Keep serving the previous snapshot
+                    print(f"Error loading diseases: {e}")
+                    return False
+                self._snapshot = snapshot
+                self.available = True
+                print(f"Loaded {len(snapshot[0])} diseases from CSV")
+
+            self._signature = signature
+            self.reload_count += 1
+            return True
+
+    def names(self):
+        """Disease names in file order (the cached list; do not mutate)."""
+        self.refresh()
+        return self._snapshot[0]
+
+    def get(self, disease_name):
+        """
+        Case-insensitive preset lookup.
+
+        Returns:
+            Dictionary with p_d_given_pos, prior, sensitivity and falsePositive, or None
+        """
+        self.refresh()
+        return self._snapshot[1].get(disease_name.lower())
+
+
+# Global instance
+disease_catalog = DiseaseCatalog()
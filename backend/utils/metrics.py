@@ -0,0 +1,349 @@
+"""
+In-process request metrics served in Prometheus text format at /metrics.
+
+Every request is recorded into a fixed-bucket latency histogram keyed by
+(endpoint rule, method, status); request counts and in-flight gauges come
+from the same counters. Streamed responses are recorded when the server
+closes the body, so their latency covers generating it. Other components
+expose values through collectors that run only at scrape time.
+
+With several worker processes, set METRICS_DIR to a directory shared by
+the workers (and cleared when the server starts). Each worker writes a
+snapshot there every METRICS_WRITE_SECONDS and /metrics merges all of
+them, so any worker answers for the whole server.
+"""
+
+from bisect import bisect_left
+import atexit
+import glob
+import itertools
+import json
+import os
+import threading
+import time
+
+from flask import g, request
+
+# Latency histogram upper bounds in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_DURATION = 'http_request_duration_seconds'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    """Render a label set as name="value" pairs in the given order."""
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _histogram_samples(name, labels, value):
+    """Expand a collector's histogram value into _bucket, _sum and _count samples."""
+    prefix = f'{_labels(**labels)},' if labels else ''
+    suffix = f'{{{_labels(**labels)}}}' if labels else ''
+    samples = {}
+    for bound, cumulative in value['buckets']:
+        samples[f'{name}_bucket{{{prefix}le="{bound}"}}'] = cumulative
+    samples[f'{name}_bucket{{{prefix}le="+Inf"}}'] = value['count']
+    samples[f'{name}_sum{suffix}'] = value['sum']
+    samples[f'{name}_count{suffix}'] = value['count']
+    return samples
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class _Stripe:
+    """Counters recorded by the threads assigned to one lock."""
+
+    __slots__ = ('lock', 'histograms', 'in_flight')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (endpoint, method, status) -> [count per bucket..., count above last bucket, sum]
+        self.histograms = {}
+        self.in_flight = 0
+
+
+class MetricsRegistry:
+    """
+    Request metrics plus scrape-time collectors.
+
+    Each thread is pinned to one of NUM_STRIPES stripes, so recording takes
+    an uncontended lock and increments preallocated list slots; a new
+    series is allocated only the first time a thread sees its key.
+    """
+
+    NUM_STRIPES = 16
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, metrics_dir=None, write_interval=None):
+        """
+        Args:
+            buckets: Histogram upper bounds in seconds
+            metrics_dir: Shared directory for multi-worker aggregation
+                (env METRICS_DIR, default: none, single process)
+            write_interval: Seconds between snapshot writes (env METRICS_WRITE_SECONDS, default 5)
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.metrics_dir = metrics_dir or os.environ.get('METRICS_DIR') or None
+        self.write_interval = write_interval or float(os.environ.get('METRICS_WRITE_SECONDS', 5))
+
+        self._stripes = [_Stripe() for _ in range(self.NUM_STRIPES)]
+        self._stripe_ids = itertools.count()
+        self._local = threading.local()
+        self._collectors = []
+        self._writer_pid = None
+        self._writer_lock = threading.Lock()
+
+    def _stripe(self):
+        try:
+            return self._local.stripe
+        except AttributeError:
+            stripe = self._local.stripe = self._stripes[next(self._stripe_ids) % self.NUM_STRIPES]
+            return stripe
+
+    def observe_request(self, endpoint, method, status, seconds):
+        """
+        Record one finished request.
+
+        Args:
+            endpoint: URL rule (e.g. '/api/ml/symptoms/<disease>'), not the raw path
+            method: HTTP method
+            status: Response status code
+            seconds: Request duration
+        """
+        key = (endpoint, method, status)
+        stripe = self._stripe()
+        with stripe.lock:
+            series = stripe.histograms.get(key)
+            if series is None:
+                series = stripe.histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, seconds)] += 1
+            series[-1] += seconds
+
+    def track_in_flight(self, delta):
+        """Add delta (+1 on request start, -1 on finish) to the in-flight gauge."""
+        stripe = self._stripe()
+        with stripe.lock:
+            stripe.in_flight += delta
+
+    def register_collector(self, collector):
+        """
+        Add a scrape-time collector.
+
+        Args:
+            collector: Callable returning an iterable of
+                (name, type, help, labels dict, value) tuples, where type is
+                'counter' or 'gauge', or 'histogram' with value a dict of
+                cumulative 'buckets' [(upper bound, count)], 'sum' and 'count'
+        """
+        self._collectors.append(collector)
+
+    def init_app(self, app):
+        """Record every request of the application."""
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        g._metrics_start = time.perf_counter()
+        self.track_in_flight(1)
+        if self.metrics_dir is not None and self._writer_pid != os.getpid():
+            self._start_writer()
+
+    def _after_request(self, response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            method, status = request.method, response.status_code
+            if response.is_streamed:
+                # The body is generated after this hook; record once the server closes it
+                def finish():
+                    self.observe_request(endpoint, method, status, time.perf_counter() - start)
+                    self.track_in_flight(-1)
+                response.call_on_close(finish)
+            else:
+                self.observe_request(endpoint, method, status, time.perf_counter() - start)
+                self.track_in_flight(-1)
+        return response
+
+    def _teardown_request(self, error=None):
+        # after_request did not run (unhandled exception)
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            self.observe_request(endpoint, request.method, 500, time.perf_counter() - start)
+            self.track_in_flight(-1)
+
+    def snapshot(self):
+        """
+        Current values of this process.
+
+        Returns:
+            Dictionary of metric name -> {'type', 'help', 'samples': {sample: value}},
+            where sample is the rendered sample name and labels
+        """
+        histograms = {}
+        in_flight = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                in_flight += stripe.in_flight
+                for key, series in stripe.histograms.items():
+                    total = histograms.get(key)
+                    if total is None:
+                        histograms[key] = list(series)
+                    else:
+                        for i, value in enumerate(series):
+                            total[i] += value
+
+        buckets = {}
+        requests = {}
+        for (endpoint, method, status), series in sorted(histograms.items()):
+            labels = _labels(endpoint=endpoint, method=method, status=status)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                buckets[f'{REQUEST_DURATION}_bucket{{{labels},le="{bound}"}}'] = cumulative
+            count = cumulative + series[-2]
+            buckets[f'{REQUEST_DURATION}_bucket{{{labels},le="+Inf"}}'] = count
+            buckets[f'{REQUEST_DURATION}_sum{{{labels}}}'] = series[-1]
+            buckets[f'{REQUEST_DURATION}_count{{{labels}}}'] = count
+            requests[f'http_requests_total{{{labels}}}'] = count
+
+        families = {
+            REQUEST_DURATION: {'type': 'histogram', 'help': 'Request latency by endpoint, method and status',
+                               'samples': buckets},
+            'http_requests_total': {'type': 'counter', 'help': 'Requests by endpoint, method and status',
+                                    'samples': requests},
+            'http_requests_in_flight': {'type': 'gauge', 'help': 'Requests currently being handled',
+                                        'samples': {'http_requests_in_flight': in_flight}},
+        }
+
+        for collector in self._collectors:
+            try:
+                collected = list(collector())
+            except Exception as e:
+                print(f"⚠️ Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+                continue
+            for name, metric_type, help_text, labels, value in collected:
+                family = families.setdefault(name, {'type': metric_type, 'help': help_text, 'samples': {}})
+                if metric_type == 'histogram':
+                    family['samples'].update(_histogram_samples(name, labels, value))
+                    continue
+                sample = f'{name}{{{_labels(**labels)}}}' if labels else name
+                family['samples'][sample] = value
+
+        return families
+
+    def _snapshot_path(self, pid=None):
+        return os.path.join(self.metrics_dir, f'metrics_{pid or os.getpid()}.json')
+
+    def write_snapshot(self):
+        """Write this process's snapshot to metrics_dir (atomic replace)."""
+        if self.metrics_dir is None:
+            return
+        path = self._snapshot_path()
+        tmp_path = f'{path}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as snapshot_file:
+                json.dump({'pid': os.getpid(), 'families': self.snapshot()}, snapshot_file)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Could not write metrics snapshot {path}: {e}")
+
+    def _start_writer(self):
+        """Start the snapshot writer thread of this process (after any worker fork)."""
+        with self._writer_lock:
+            if self._writer_pid == os.getpid():
+                return
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            self._writer_pid = os.getpid()
+            threading.Thread(target=self._write_loop, name='metrics-writer', daemon=True).start()
+
+    def _write_loop(self):
+        while True:
+            self.write_snapshot()
+            time.sleep(self.write_interval)
+
+    def collect(self):
+        """
+        Metric families for the whole server.
+
+        Without metrics_dir this is the local snapshot. Otherwise every
+        worker's snapshot is summed; gauges of workers that have exited are
+        left out, their counters are kept.
+
+        Returns:
+            Dictionary in the snapshot() format, with cache hit ratios added
+        """
+        families = self.snapshot()
+        if self.metrics_dir is not None:
+            self.write_snapshot()
+            own_path = self._snapshot_path()
+            for path in sorted(glob.glob(os.path.join(self.metrics_dir, 'metrics_*.json'))):
+                if path == own_path:
+                    continue
+                try:
+                    with open(path, encoding='utf-8') as snapshot_file:
+                        snapshot = json.load(snapshot_file)
+                except (OSError, ValueError):
+                    continue
+                alive = _pid_alive(snapshot.get('pid', 0))
+                for name, family in snapshot['families'].items():
+                    if family['type'] == 'gauge' and not alive:
+                        continue
+                    merged = families.setdefault(name, {**family, 'samples': {}})
+                    samples = merged['samples']
+                    for sample, value in family['samples'].items():
+                        samples[sample] = samples.get(sample, 0) + value
+
+        self._add_hit_ratios(families)
+        return families
+
+    @staticmethod
+    def _add_hit_ratios(families):
+        """Derive cache_hit_ratio from the (merged) hit and miss counters."""
+        hits = families.get('cache_hits_total', {}).get('samples', {})
+        misses = families.get('cache_misses_total', {}).get('samples', {})
+        ratios = {}
+        for sample, hit_count in hits.items():
+            labels = sample[len('cache_hits_total'):]
+            lookups = hit_count + misses.get(f'cache_misses_total{labels}', 0)
+            ratios[f'cache_hit_ratio{labels}'] = hit_count / lookups if lookups else 0.0
+        if ratios:
+            families['cache_hit_ratio'] = {'type': 'gauge', 'help': 'Cache hits / lookups', 'samples': ratios}
+
+    def render(self):
+        """
+        Render all metrics in the Prometheus text exposition format (0.0.4).
+
+        Returns:
+            Text body for /metrics
+        """
+        lines = []
+        for name, family in self.collect().items():
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            for sample, value in family['samples'].items():
+                lines.append(f"{sample} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+# Global instance
+metrics = MetricsRegistry()
+atexit.register(metrics.write_snapshot)
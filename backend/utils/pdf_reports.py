@@ -0,0 +1,259 @@
+"""
+PDF rendering for the downloadable calculator and ML prediction reports.
+
+reportlab is imported on first use, and the style sheet, paragraph styles
+and table styles are built once per process instead of on every render.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+from xml.sax.saxutils import escape
+import io
+
+from backend.utils.startup import startup_timer
+
+# Bump when the report layout changes so cached PDFs are not reused
+REPORT_LAYOUT_VERSION = 2
+
+
+@lru_cache(maxsize=None)
+def _reportlab():
+    """Import the reportlab names used by the reports (once)."""
+    with startup_timer.first_use('reportlab.platypus'):
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib import colors
+        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+    return {
+        'letter': letter, 'colors': colors, 'SimpleDocTemplate': SimpleDocTemplate, 'Table': Table,
+        'TableStyle': TableStyle, 'Paragraph': Paragraph, 'Spacer': Spacer,
+        'getSampleStyleSheet': getSampleStyleSheet, 'ParagraphStyle': ParagraphStyle, 'inch': inch
+    }
+
+
+@lru_cache(maxsize=None)
+def _styles():
+    """Paragraph and table styles shared by every report in this process."""
+    rl = _reportlab()
+    colors = rl['colors']
+    sheet = rl['getSampleStyleSheet']()
+    return {
+        'normal': sheet['Normal'],
+        'possibility_title': rl['ParagraphStyle'](
+            "TitleStyle",
+            parent=sheet["Heading1"],
+            fontSize=24,
+            textColor=colors.HexColor("#1f77b4"),
+            alignment=1,
+            spaceAfter=20,
+        ),
+        'ml_title': rl['ParagraphStyle'](
+            'CustomTitle',
+            parent=sheet['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#1f77b4'),
+            spaceAfter=12,
+            alignment=1
+        ),
+        'possibility_table': rl['TableStyle']([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1f77b4")),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("GRID", (0, 0), (-1, -1), 1, colors.black),
+            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+        ]),
+        'ml_table': rl['TableStyle']([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f77b4')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f0f0')]),
+        ]),
+    }
+
+
+def warm_up():
+    """Import reportlab and build the styles ahead of the first render."""
+    _styles()
+
+
+def _new_document(buffer):
+    rl = _reportlab()
+    inch = rl['inch']
+    return rl['SimpleDocTemplate'](buffer, pagesize=rl['letter'], topMargin=0.5 * inch, bottomMargin=0.5 * inch)
+
+
+def render_possibility_report(fields):
+    """
+    Render the Bayesian calculator report.
+
+    Args:
+        fields: Dictionary with disease_name, prior, posterior, test_result,
+            sensitivity and false_positive
+
+    Returns:
+        PDF bytes
+    """
+    rl = _reportlab()
+    styles = _styles()
+    Paragraph, Spacer, inch = rl['Paragraph'], rl['Spacer'], rl['inch']
+    posterior = fields['posterior']
+
+    buffer = io.BytesIO()
+    doc = _new_document(buffer)
+    story = []
+
+    # Title
+    story.append(Paragraph("Possibility Report", styles['possibility_title']))
+    story.append(Spacer(1, 0.3 * inch))
+
+    # Timestamp
+    story.append(Paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['normal']))
+    story.append(Spacer(1, 0.2 * inch))
+
+    # Results table
+    table_data = [
+        ["Parameter", "Value"],
+        ["Disease Name", fields['disease_name']],
+        ["Prior Probability", f"{fields['prior']:.4f}"],
+        ["Posterior Probability", f"{posterior:.4f}"],
+        ["Test Result", fields['test_result']],
+        ["Sensitivity", f"{fields['sensitivity']:.4f}"],
+        ["False Positive Rate", f"{fields['false_positive']:.4f}"],
+    ]
+    table = rl['Table'](table_data, colWidths=[3 * inch, 3 * inch])
+    table.setStyle(styles['possibility_table'])
+    story.append(table)
+    story.append(Spacer(1, 0.3 * inch))
+
+    # Risk assessment
+    risk_level = (
+        "High Risk" if posterior > 0.7 else
+        "Moderate Risk" if posterior > 0.3 else
+        "Low Risk"
+    )
+    story.append(Paragraph(f"<b>Risk Assessment:</b> {risk_level}", styles['normal']))
+    story.append(Spacer(1, 0.2 * inch))
+
+    # Disclaimer
+    story.append(Paragraph(
+        "<i>This report is for educational purposes only. "
+        "Consult healthcare professionals for medical advice.</i>",
+        styles['normal'],
+    ))
+    doc.title = "Possibility Report"  # browser tab title
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def render_ml_report(fields):
+    """
+    Render the ML prediction report.
+
+    Args:
+        fields: Dictionary with disease_name, ml_probability, prior_probability,
+            likelihood, posterior_probability and risk_level
+
+    Returns:
+        PDF bytes
+    """
+    rl = _reportlab()
+    styles = _styles()
+    Paragraph, Spacer, inch = rl['Paragraph'], rl['Spacer'], rl['inch']
+    risk_level = fields['risk_level']
+
+    buffer = io.BytesIO()
+    doc = _new_document(buffer)
+    story = []
+    story.append(Paragraph("ML Disease Prediction Report\n(Bayesian Analysis)", styles['ml_title']))
+    story.append(Spacer(1, 0.3 * inch))
+
+    # Add timestamp
+    story.append(Paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['normal']))
+    story.append(Spacer(1, 0.2 * inch))
+
+    # Disease and ML Prediction
+    story.append(Paragraph(f"<b>Disease:</b> {fields['disease_name']}", styles['normal']))
+    story.append(Spacer(1, 0.1 * inch))
+    story.append(Paragraph(f"<b>ML Prediction Probability:</b> {fields['ml_probability']:.2%}", styles['normal']))
+    story.append(Spacer(1, 0.2 * inch))
+
+    # Bayesian Analysis table
+    data_table = [
+        ['Bayesian Analysis', 'Value'],
+        ['Prior Probability', f"{fields['prior_probability']:.4f}"],
+        ['Likelihood', f"{fields['likelihood']:.4f}"],
+        ['Posterior Probability', f"{fields['posterior_probability']:.4f}"],
+        ['Risk Assessment', risk_level]
+    ]
+    table = rl['Table'](data_table, colWidths=[2.5 * inch, 2.5 * inch])
+    table.setStyle(styles['ml_table'])
+    story.append(table)
+    story.append(Spacer(1, 0.3 * inch))
+
+    # Risk color coding
+    risk_color = "#27ae60" if risk_level == "Low Risk" else ("#f39c12" if risk_level == "Moderate Risk" else "#e74c3c")
+    story.append(Paragraph(f"<font color='{risk_color}'><b>Risk Level: {risk_level}</b></font>", styles['normal']))
+    story.append(Spacer(1, 0.2 * inch))
+
+    # Disclaimer
+    disclaimer = ("<i>Note: This report is for educational purposes only. "
+                  "Always consult with healthcare professionals for medical advice.</i>")
+    story.append(Paragraph(disclaimer, styles['normal']))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def render_prediction_report(fields):
+    """
+    Render the report of one stored prediction (batch ZIP export).
+
+    Args:
+        fields: Dictionary from batch_export.prediction_fields()
+
+    Returns:
+        PDF bytes
+    """
+    rl = _reportlab()
+    styles = _styles()
+    Paragraph, Spacer, inch = rl['Paragraph'], rl['Spacer'], rl['inch']
+    posterior = fields['bayesian_posterior']
+
+    buffer = io.BytesIO()
+    doc = _new_document(buffer)
+    story = []
+    story.append(Paragraph(f"Prediction Report #{fields['id']}", styles['ml_title']))
+    story.append(Spacer(1, 0.3 * inch))
+
+    data_table = [
+        ['Field', 'Value'],
+        ['Recorded (UTC)', fields['created_at']],
+        ['Disease', fields['disease']],
+        ['Patient Age', str(fields['patient_age']) if fields['patient_age'] is not None else '-'],
+        ['ML Prediction Probability', f"{fields['ml_probability']:.2%}"],
+        ['Posterior Probability', f"{posterior:.4f}" if posterior is not None else '-'],
+        ['Risk Level', fields['risk_level']],
+        ['Model Version', fields['model_version'] or '-'],
+    ]
+    table = rl['Table'](data_table, colWidths=[2.5 * inch, 2.5 * inch])
+    table.setStyle(styles['ml_table'])
+    story.append(table)
+    story.append(Spacer(1, 0.3 * inch))
+
+    story.append(Paragraph(f"<b>Reported symptoms:</b> {escape(fields['symptoms'] or '-')}", styles['normal']))
+    story.append(Spacer(1, 0.2 * inch))
+
+    disclaimer = ("<i>Note: This report is for educational purposes only. "
+                  "Always consult with healthcare professionals for medical advice.</i>")
+    story.append(Paragraph(disclaimer, styles['normal']))
+
+    doc.title = f"Prediction Report #{fields['id']}"
+    doc.build(story)
+    return buffer.getvalue()
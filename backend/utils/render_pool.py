@@ -0,0 +1,335 @@
+"""
+Bounded process pool for CPU-bound report rendering.
+
+PDF rendering holds the GIL for milliseconds at a time, so running it on a
+web worker's threads slows every other request on that worker. Jobs run
+in separate processes instead; at most workers + max_queue jobs are
+accepted at once and further ones are refused immediately so the route
+can answer 503 with Retry-After.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from bisect import bisect_left
+import atexit
+import math
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+from backend.middleware.logger import get_logger
+from backend.utils.metrics import DEFAULT_BUCKETS
+from backend.utils.pdf_reports import warm_up
+
+
+class RenderPoolBusy(Exception):
+    """Raised when the pool already has its maximum number of pending jobs."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Render queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class RenderTimeout(Exception):
+    """Raised when a job does not finish within the pool's timeout."""
+    pass
+
+
+# Set in each worker process by _init_worker
+_start_barrier = None
+
+
+def _init_worker(niceness, initializer, barrier=None):
+    """Lower the worker's CPU priority below the web workers, then run the initializer."""
+    global _start_barrier
+    _start_barrier = barrier
+    if niceness:
+        try:
+            os.nice(niceness)
+        except (AttributeError, OSError):
+            pass
+    if initializer is not None:
+        initializer()
+
+
+def _ready(timeout):
+    """
+    Start-up job: blocks until every worker runs one, so each worker
+    process reports its pid exactly once.
+    """
+    if _start_barrier is not None:
+        _start_barrier.wait(timeout)
+    return os.getpid()
+
+
+def _timed_call(func, args):
+    """Worker entry point: run func and report how long it took."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class RenderPool:
+    """
+    Process pool with a bounded backlog, per-job timeout and render metrics.
+
+    Workers are started with forkserver (a clean process) rather than
+    forked from the threaded web worker, and are started and initialized
+    before the first job is submitted so process start-up does not count
+    against the job timeout.
+
+    A job is only submitted once a worker is free, so the timeout covers
+    rendering alone; waiting for a worker has its own budget (queue_timeout)
+    and ends in RenderPoolBusy. A running job cannot be cancelled, so one
+    that times out has its pool torn down and its processes terminated; jobs
+    running beside it are interrupted and also get RenderPoolBusy, and the
+    next job starts a fresh pool.
+
+    As with spawn, the workers re-import the __main__ module, so an entry
+    script must keep its side effects under `if __name__ == "__main__"`
+    or accept running them once per worker.
+    """
+
+    def __init__(self, workers=None, max_queue=None, timeout=None, start_method=None, initializer=None,
+                 niceness=None, queue_timeout=None):
+        """
+        Args:
+            workers: Render processes (env PDF_RENDER_WORKERS, default 2; 0 renders in-process)
+            max_queue: Jobs allowed to wait for a free process (env PDF_RENDER_QUEUE, default 8)
+            timeout: Seconds a job may run in a worker (env PDF_RENDER_TIMEOUT, default 15)
+            start_method: multiprocessing start method (env PDF_RENDER_START_METHOD, default forkserver)
+            initializer: Picklable callable run once in each worker (e.g. to import libraries)
+            niceness: Added to the workers' nice value so renders yield the CPU to
+                request handling (env PDF_RENDER_NICE, default 10)
+            queue_timeout: Seconds a job may wait for a free worker
+                (env PDF_RENDER_QUEUE_TIMEOUT, default: timeout)
+        """
+        self.workers = workers if workers is not None else int(os.environ.get('PDF_RENDER_WORKERS', 2))
+        self.max_queue = max_queue if max_queue is not None else int(os.environ.get('PDF_RENDER_QUEUE', 8))
+        self.timeout = timeout or float(os.environ.get('PDF_RENDER_TIMEOUT', 15))
+        self.start_method = start_method or os.environ.get('PDF_RENDER_START_METHOD', 'forkserver')
+        self.initializer = initializer
+        self.niceness = niceness if niceness is not None else int(os.environ.get('PDF_RENDER_NICE', 10))
+        self.queue_timeout = queue_timeout or float(os.environ.get('PDF_RENDER_QUEUE_TIMEOUT', self.timeout))
+
+        self._executor = None
+        self._executor_pid = None
+        self._worker_pids = ()
+        self._slots = threading.Semaphore(max(self.workers, 1))
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._pending = 0
+
+        # Counters
+        self.rendered = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.interrupted = 0
+        self.failed = 0
+        self._bucket_counts = [0] * (len(DEFAULT_BUCKETS) + 1)
+        self._render_seconds = 0.0
+
+    def _get_executor(self):
+        """The pool of this process (created on first use and after a fork)."""
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                return self._executor
+
+        # Starting the workers takes a while; only concurrent starters wait on
+        # _start_lock, while _lock (counters, stats) stays free
+        with self._start_lock:
+            with self._lock:
+                if self._executor is not None and self._executor_pid == os.getpid():
+                    return self._executor
+            context = multiprocessing.get_context(self.start_method)
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.niceness, self.initializer, context.Barrier(self.workers))
+            )
+            # One job per worker starts every process before real jobs arrive
+            started = time.perf_counter()
+            try:
+                ready = [executor.submit(_ready, self.timeout) for _ in range(self.workers)]
+                worker_pids = tuple(future.result() for future in ready)
+            except BaseException:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            get_logger().info(
+                f"Started {self.workers} render workers in {time.perf_counter() - started:.2f}s",
+                workers=self.workers
+            )
+            with self._lock:
+                self._executor = executor
+                self._executor_pid = os.getpid()
+                self._worker_pids = worker_pids
+            return executor
+
+    def _recycle(self, executor):
+        """Tear down a pool whose job hung or whose workers died."""
+        worker_pids = ()
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                worker_pids, self._worker_pids = self._worker_pids, ()
+        executor.shutdown(wait=False, cancel_futures=True)
+        # ProcessPoolExecutor cannot cancel a running job; stop its processes
+        for pid in worker_pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def _retry_after(self):
+        """Seconds until the backlog should have drained (caller holds the lock)."""
+        average = self._render_seconds / self.rendered if self.rendered else 1.0
+        return max(1, math.ceil(average * self._pending / max(self.workers, 1)))
+
+    def _record(self, seconds):
+        with self._lock:
+            self.rendered += 1
+            self._render_seconds += seconds
+            self._bucket_counts[bisect_left(DEFAULT_BUCKETS, seconds)] += 1
+
+    def render(self, func, *args):
+        """
+        Run func(*args) on the pool and wait for the result.
+
+        Args:
+            func: Picklable top-level function
+            *args: Picklable arguments
+
+        Returns:
+            func's return value
+
+        Raises:
+            RenderPoolBusy: workers + max_queue jobs are already pending, no
+                worker became free within queue_timeout, or the job was
+                interrupted by a restart of the pool
+            RenderTimeout: The job did not finish within timeout
+        """
+        with self._lock:
+            if self._pending >= max(self.workers, 1) + self.max_queue:
+                self.rejected += 1
+                raise RenderPoolBusy(self._retry_after())
+            self._pending += 1
+
+        if self.workers <= 0:
+            try:
+                result, seconds = _timed_call(func, args)
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+                raise
+            finally:
+                self._release()
+            self._record(seconds)
+            return result
+
+        # Wait here rather than in the executor so the job timeout starts when it runs
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._pending -= 1
+                self.rejected += 1
+                raise RenderPoolBusy(self._retry_after())
+
+        # The worker is freed by whichever comes first: the job finishing or a timeout
+        released = threading.Lock()
+
+        def release(future=None):
+            if released.acquire(blocking=False):
+                self._slots.release()
+                self._release()
+
+        try:
+            executor = self._get_executor()
+            future = executor.submit(_timed_call, func, args)
+        except Exception:
+            release()
+            raise
+        future.add_done_callback(release)
+
+        try:
+            result, seconds = future.result(timeout=self.timeout)
+        except FuturesTimeout:
+            with self._lock:
+                self.timeouts += 1
+            get_logger().warning(
+                f"Render job exceeded {self.timeout}s; restarting the render pool",
+                timeout=self.timeout
+            )
+            self._recycle(executor)
+            release()
+            raise RenderTimeout(f"Rendering did not finish within {self.timeout}s")
+        except BrokenProcessPool:
+            # Another job's timeout restarted the pool, or a worker died
+            self._recycle(executor)
+            release()
+            with self._lock:
+                self.interrupted += 1
+                raise RenderPoolBusy(self._retry_after())
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+
+        self._record(seconds)
+        return result
+
+    def shutdown(self):
+        """Stop this process's worker processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._executor_pid == os.getpid():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self):
+        """
+        Get pool counters.
+
+        Returns:
+            Dictionary with workers, max_queue, pending, queued (waiting for a
+            process), rendered, rejected, timeouts, interrupted, failed and avg_render_ms
+        """
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'pending': self._pending,
+                'queued': max(0, self._pending - self.workers),
+                'rendered': self.rendered,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'interrupted': self.interrupted,
+                'failed': self.failed,
+                'avg_render_ms': round(self._render_seconds / self.rendered * 1000, 2) if self.rendered else 0.0
+            }
+
+    def render_histogram(self):
+        """
+        Render durations (measured in the worker) for /metrics.
+
+        Returns:
+            Dictionary with cumulative 'buckets' [(upper bound, count)], 'sum' and 'count'
+        """
+        with self._lock:
+            counts = list(self._bucket_counts)
+            total_seconds = self._render_seconds
+        buckets = []
+        cumulative = 0
+        for bound, count in zip(DEFAULT_BUCKETS, counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return {'buckets': buckets, 'sum': total_seconds, 'count': cumulative + counts[-1]}
+
+
+# Global instance for the PDF download routes
+pdf_render_pool = RenderPool(initializer=warm_up)
+atexit.register(pdf_render_pool.shutdown)
@@ -0,0 +1,209 @@
+"""
+Content-addressed cache of rendered report files.
+
+Reports are keyed by a hash of their canonicalized input, so downloading
+the same result again is served without re-rendering. Entries live in a
+byte-bounded in-memory LRU and, when REPORT_CACHE_DIR is set, in an
+on-disk tier shared by the workers on the host.
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+
+
+def report_key(kind, fields, version=1):
+    """
+    Hash a report's inputs into a cache key.
+
+    Args:
+        kind: Report type (e.g. 'possibility', 'ml')
+        fields: JSON-serializable dictionary of the values rendered
+        version: Layout version; changing it invalidates old entries
+
+    Returns:
+        Hex SHA-256 of the canonical JSON of (kind, version, fields)
+    """
+    canonical = json.dumps([kind, version, fields], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ReportCache:
+    """
+    Byte-bounded LRU of rendered reports with an optional disk tier.
+
+    The ETag of an entry is derived from its key, not its bytes: two
+    renders of the same report differ (generation time, the PDF's
+    CreationDate and /ID), so a content hash would differ between workers.
+    Serve it as a weak validator.
+    """
+
+    def __init__(self, max_bytes=None, disk_dir=None, disk_max_bytes=None, suffix='.pdf'):
+        """
+        Args:
+            max_bytes: In-memory capacity (env REPORT_CACHE_BYTES, default 64 MB; 0 disables)
+            disk_dir: On-disk tier directory (env REPORT_CACHE_DIR, default: no disk tier)
+            disk_max_bytes: On-disk capacity (env REPORT_CACHE_DISK_BYTES, default 512 MB)
+            suffix: File suffix for the disk tier
+        """
+        self.max_bytes = max_bytes if max_bytes is not None else \
+            int(os.environ.get('REPORT_CACHE_BYTES', 64 * 1024 * 1024))
+        self.disk_dir = disk_dir or os.environ.get('REPORT_CACHE_DIR') or None
+        self.disk_max_bytes = disk_max_bytes if disk_max_bytes is not None else \
+            int(os.environ.get('REPORT_CACHE_DISK_BYTES', 512 * 1024 * 1024))
+        self.suffix = suffix
+
+        self._entries = OrderedDict()  # key -> (bytes, etag)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_etag(key):
+        """ETag of the report stored under key (same in every worker and tier)."""
+        return key
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key + self.suffix)
+
+    def get(self, key):
+        """
+        Look up a report in memory, then on disk.
+
+        Returns:
+            Tuple of (bytes, etag), or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        if self.disk_dir is not None:
+            try:
+                with open(self._disk_path(key), 'rb') as report_file:
+                    content = report_file.read()
+            except OSError:
+                pass
+            else:
+                entry = (content, self.make_etag(key))
+                self._put_memory(key, entry)
+                with self._lock:
+                    self.disk_hits += 1
+                return entry
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, content):
+        """
+        Store rendered bytes.
+
+        Returns:
+            Tuple of (bytes, etag)
+        """
+        entry = (content, self.make_etag(key))
+        self._put_memory(key, entry)
+        if self.disk_dir is not None:
+            self._put_disk(key, content)
+        return entry
+
+    def get_or_render(self, key, render):
+        """
+        Return the cached report, rendering and storing it on a miss.
+
+        Args:
+            key: Cache key from report_key()
+            render: Callable returning the report bytes
+
+        Returns:
+            Tuple of (bytes, etag, cached)
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry[0], entry[1], True
+        content, etag = self.put(key, render())
+        return content, etag, False
+
+    def _put_memory(self, key, entry):
+        size = len(entry[0])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[0])
+            self._entries[key] = entry
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted[0])
+                self.evictions += 1
+
+    def _put_disk(self, key, content):
+        """Write atomically, then trim the directory to disk_max_bytes (oldest first)."""
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as report_file:
+                report_file.write(content)
+            os.replace(tmp_path, path)
+
+            files = []
+            total = 0
+            with os.scandir(self.disk_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(self.suffix):
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, entry.path, stat.st_size))
+                        total += stat.st_size
+            for _, stale_path, size in sorted(files):
+                if total <= self.disk_max_bytes:
+                    break
+                try:
+                    os.remove(stale_path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+        except OSError as e:
+            print(f"⚠️ Could not write report cache file for {key}: {e}")
+
+    def clear(self):
+        """Drop the in-memory entries (counters and disk files are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with entries, bytes, max_bytes, hits, disk_hits,
+            misses, evictions and hit_ratio
+        """
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'disk_dir': self.disk_dir,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': ((self.hits + self.disk_hits) / lookups) if lookups else 0.0
+            }
+
+
+# Global instance for the PDF download routes
+pdf_report_cache = ReportCache()
@@ -0,0 +1,123 @@
+"""
+Per-request stage timings reported in the Server-Timing response header.
+
+Routes wrap their stages in spans:
+
+    with server_timing.span('model'):
+        prediction = model.predict_disease_probability(...)
+
+and the response carries e.g.
+Server-Timing: parse;dur=0.081, model;dur=1.204, bayes;dur=0.032, total;dur=1.62
+
+Enable with SERVER_TIMING=1. When disabled, span() returns a shared no-op
+context manager, so the instrumentation can stay in production code.
+"""
+
+import os
+import time
+
+from flask import g, has_request_context
+
+
+class _NullSpan:
+    """Span used while timing is disabled (a single shared instance)."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Times one stage and appends (name, seconds) to the request's timings."""
+
+    __slots__ = ('name', 'timings', 'start')
+
+    def __init__(self, name, timings):
+        self.name = name
+        self.timings = timings
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timings.append((self.name, time.perf_counter() - self.start))
+        return False
+
+
+class ServerTiming:
+    """
+    Collects stage durations of the current request.
+    """
+
+    def __init__(self, enabled=None):
+        """
+        Args:
+            enabled: Record spans (default: SERVER_TIMING environment variable)
+        """
+        if enabled is None:
+            enabled = os.environ.get('SERVER_TIMING', '').lower() in ('1', 'true', 'yes')
+        self.enabled = enabled
+
+    def init_app(self, app):
+        """Start timings for each request and add the header to responses."""
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def _before_request(self):
+        if self.enabled:
+            g.server_timing_start = time.perf_counter()
+            g.server_timings = []
+
+    def span(self, name):
+        """
+        Context manager timing one stage of the current request.
+
+        Args:
+            name: Stage name (a token: letters, digits, '-', '_')
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        timings = g.get('server_timings')
+        if timings is None:
+            return _NULL_SPAN
+        return _Span(name, timings)
+
+    def get_timings(self):
+        """
+        Stage durations recorded so far for the current request.
+
+        Returns:
+            Dictionary of stage name -> milliseconds (repeated stages are
+            summed), or None when timing is disabled
+        """
+        if not self.enabled or not has_request_context():
+            return None
+        timings = g.get('server_timings')
+        if timings is None:
+            return None
+        stages = {}
+        for name, seconds in timings:
+            stages[name] = stages.get(name, 0.0) + seconds * 1000
+        return {name: round(ms, 3) for name, ms in stages.items()}
+
+    def _after_request(self, response):
+        stages = self.get_timings()
+        if stages is None:
+            return response
+        parts = [f"{name};dur={ms}" for name, ms in stages.items()]
+        total_ms = (time.perf_counter() - g.server_timing_start) * 1000
+        parts.append(f"total;dur={total_ms:.3f}")
+        response.headers.add('Server-Timing', ', '.join(parts))
+        return response
+
+
+# Global instance
+server_timing = ServerTiming()
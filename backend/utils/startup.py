@@ -0,0 +1,98 @@
+"""
+Startup timing for tracking cold-start regressions.
+Records how long each import and initialization step takes, both during
+create_app and for dependencies loaded lazily on first use.
+"""
+
+from contextlib import contextmanager
+import threading
+import time
+
+
+class StartupTimer:
+    """
+    Collects named durations in the order they were recorded.
+    """
+
+    def __init__(self):
+        """Initialize an empty timer."""
+        self._steps = []
+        self._names = set()
+        self._lock = threading.Lock()
+        self.ready = False
+
+    def begin(self):
+        """Start a fresh report for a new application build."""
+        with self._lock:
+            self._steps = []
+            self._names = set()
+            self.ready = False
+
+    def mark_ready(self):
+        """Mark startup finished; later first-use loads count as 'lazy'."""
+        self.ready = True
+
+    def record(self, name, seconds, phase=None):
+        """
+        Record a measured step.
+
+        Args:
+            name: Step or module name
+            seconds: Duration in seconds
+            phase: 'startup' or 'lazy' (default: 'lazy' once mark_ready was called)
+        """
+        if phase is None:
+            phase = 'lazy' if self.ready else 'startup'
+        with self._lock:
+            self._names.add(name)
+            self._steps.append({
+                'name': name,
+                'phase': phase,
+                'duration_ms': round(seconds * 1000, 2)
+            })
+
+    @contextmanager
+    def measure(self, name, phase=None):
+        """
+        Time the enclosed block.
+
+        Example:
+            with startup_timer.measure('backend.routes.ml_routes'):
+                from backend.routes.ml_routes import ml_bp
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, phase)
+
+    @contextmanager
+    def first_use(self, name):
+        """
+        Time the enclosed block only the first time name is seen.
+        Used around lazy imports, which are free after the first call.
+        """
+        if name in self._names:
+            yield
+            return
+        with self.measure(name):
+            yield
+
+    def get_report(self):
+        """
+        Get the startup breakdown.
+
+        Returns:
+            Dictionary with per-step timings and per-phase totals in milliseconds
+        """
+        with self._lock:
+            steps = list(self._steps)
+        return {
+            'startup_total_ms': round(sum(s['duration_ms'] for s in steps if s['phase'] == 'startup'), 2),
+            'lazy_total_ms': round(sum(s['duration_ms'] for s in steps if s['phase'] == 'lazy'), 2),
+            'steps': steps
+        }
+
+
+# Global instance
+startup_timer = StartupTimer()
@@ -0,0 +1,263 @@
+"""
+Write-behind persistence for PredictionHistory.
+Predictions are queued in memory and a background thread writes them in
+batches, so API responses never wait on a database commit.
+"""
+
+from contextlib import nullcontext
+from datetime import datetime
+import atexit
+import os
+import queue
+import threading
+import time
+import traceback
+
+from flask import has_app_context
+
+# Queue markers telling the writer thread to write its partial batch now,
+# or to exit
+_FLUSH = object()
+_STOP = object()
+
+
+class PredictionWriter:
+    """
+    Bounded in-memory queue of prediction rows flushed by a background thread.
+
+    A batch is written when batch_size rows are waiting or flush_interval_ms
+    has passed since the first of them arrived. When the queue is full,
+    submit() blocks for up to block_timeout_ms and then writes the row
+    itself, so a database that cannot keep up slows callers down instead of
+    losing rows. Each batch is one bulk INSERT plus the matching dashboard
+    rollup update, in one transaction.
+    """
+
+    def __init__(self, batch_size=None, flush_interval_ms=None, max_queue=None, block_timeout_ms=None):
+        """
+        Args:
+            batch_size: Rows per insert batch (env PREDICTION_WRITE_BATCH, default 100)
+            flush_interval_ms: Max delay before a partial batch is written
+                (env PREDICTION_WRITE_INTERVAL_MS, default 200)
+            max_queue: Queue capacity in rows (env PREDICTION_WRITE_QUEUE, default 10000)
+            block_timeout_ms: How long submit() waits on a full queue before
+                writing the row itself (env PREDICTION_WRITE_BLOCK_MS, default 50)
+        """
+        self.batch_size = batch_size or int(os.environ.get('PREDICTION_WRITE_BATCH', 100))
+        self.flush_interval = (flush_interval_ms or float(os.environ.get('PREDICTION_WRITE_INTERVAL_MS', 200))) / 1000
+        self.max_queue = max_queue or int(os.environ.get('PREDICTION_WRITE_QUEUE', 10000))
+        block_timeout_ms = block_timeout_ms if block_timeout_ms is not None else \
+            float(os.environ.get('PREDICTION_WRITE_BLOCK_MS', 50))
+        self.block_timeout = block_timeout_ms / 1000
+
+        self._app = None
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._idle = threading.Condition()
+        self._unwritten = 0
+
+        # Counters
+        self.enqueued = 0
+        self.flushed = 0
+        self.overflow = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_flush_ms = 0.0
+
+    def init_app(self, app):
+        """Bind to the application whose database the rows are written to."""
+        self._app = app
+
+    def submit(self, row, synchronous=False):
+        """
+        Queue one PredictionHistory row.
+
+        Args:
+            row: Dictionary of PredictionHistory column values
+            synchronous: Write immediately instead of queueing (used in testing)
+
+        Returns:
+            True once the row is queued or written
+        """
+        return self.submit_many([row], synchronous=synchronous) == 1
+
+    def submit_many(self, rows, synchronous=False):
+        """
+        Queue several rows.
+
+        Returns:
+            Number of rows accepted (all of them)
+        """
+        if synchronous:
+            with self._idle:
+                self.enqueued += len(rows)
+                self._unwritten += len(rows)
+            self._write(list(rows))
+            return len(rows)
+
+        self._ensure_started()
+        overflow = []
+        for row in rows:
+            # Count the row before the writer thread can see it
+            with self._idle:
+                self._unwritten += 1
+            try:
+                self._queue.put(row, timeout=self.block_timeout)
+            except queue.Full:
+                overflow.append(row)
+        with self._idle:
+            self.enqueued += len(rows)
+            self.overflow += len(overflow)
+        if overflow:
+            # Backpressure: the caller waits for the database instead of losing rows
+            self._write(overflow)
+        return len(rows)
+
+    def _ensure_started(self):
+        """Start the writer thread on first use (after any worker fork)."""
+        if self._is_running():
+            return
+        with self._start_lock:
+            if self._is_running():
+                return
+            self._thread = threading.Thread(target=self._run, name='prediction-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            if item is _FLUSH:
+                continue
+
+            # Collect until the batch is full, the interval has passed or a
+            # marker arrives
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _FLUSH or item is _STOP:
+                    stop = item is _STOP
+                    break
+                batch.append(item)
+
+            self._write(batch)
+            if stop:
+                return
+
+    def _is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _drain(self):
+        """Take every queued row (markers are discarded)."""
+        rows = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return rows
+            if item is not _FLUSH and item is not _STOP:
+                rows.append(item)
+
+    def _write(self, rows):
+        """Bulk insert rows in batch_size chunks, one transaction per chunk."""
+        from sqlalchemy import insert
+        from backend import db
+        from backend.models.prediction import PredictionHistory, add_rows_to_rollup
+
+        for start in range(0, len(rows), self.batch_size):
+            # Fix the timestamps here so the rollup day matches the stored rows
+            now = datetime.utcnow()
+            chunk = [{'created_at': now, **row} for row in rows[start:start + self.batch_size]]
+            started = time.perf_counter()
+            # Synchronous writes run inside the caller's app context; the
+            # writer thread pushes one for the bound application
+            context = nullcontext() if has_app_context() else self._app.app_context()
+            with self._write_lock, context:
+                try:
+                    db.session.execute(insert(PredictionHistory), chunk)
+                    add_rows_to_rollup(db.session.connection(), chunk)
+                    db.session.commit()
+                    written, failed = len(chunk), 0
+                except Exception as db_error:
+                    print(f"⚠️ Failed to save {len(chunk)} prediction(s) to database: {db_error}")
+                    traceback.print_exc()
+                    db.session.rollback()
+                    written, failed = 0, len(chunk)
+
+            with self._idle:
+                self.flushed += written
+                self.failed += failed
+                self.batches += 1
+                self.last_flush_ms = (time.perf_counter() - started) * 1000
+                self._unwritten -= len(chunk)
+                self._idle.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Write everything submitted so far and wait until it is written.
+
+        Returns:
+            True if all submitted rows were written (or failed) within timeout
+        """
+        if self._is_running():
+            try:
+                self._queue.put(_FLUSH, timeout=timeout)
+            except queue.Full:
+                return False
+        else:
+            rows = self._drain()
+            if rows:
+                self._write(rows)
+        with self._idle:
+            return self._idle.wait_for(lambda: self._unwritten <= 0, timeout)
+
+    def stop(self, timeout=5.0):
+        """Stop the writer thread and write what is left (called at exit)."""
+        if self._is_running():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        self._thread = None
+        rows = self._drain()
+        if rows and self._app is not None:
+            self._write(rows)
+
+    def get_stats(self):
+        """
+        Get writer counters.
+
+        Returns:
+            Dictionary with queue depth, capacity and row/batch counters
+        """
+        with self._idle:
+            return {
+                'queued': self._queue.qsize(),
+                'max_queue': self.max_queue,
+                'enqueued': self.enqueued,
+                'flushed': self.flushed,
+                'overflow': self.overflow,
+                'failed': self.failed,
+                'batches': self.batches,
+                'last_flush_ms': round(self.last_flush_ms, 2),
+                'batch_size': self.batch_size,
+                'flush_interval_ms': self.flush_interval * 1000,
+                'running': self._is_running()
+            }
+
+
+# Global instance
+prediction_writer = PredictionWriter()
+atexit.register(prediction_writer.stop)